@@ -0,0 +1,273 @@
+"""
+Synthetic .docx scripts for benchmarks, built with python-docx
+"""
+
+from docx import Document
+from docx.shared import Pt, RGBColor
+
+
+def add_character_block(document):
+    """Characters{} block defining E and F, with coloured names"""
+    document.add_paragraph("Characters{")
+    paragraph = document.add_paragraph()
+    run = paragraph.add_run("E")
+    run.font.color.rgb = RGBColor(0x67, 0x8C, 0xD1)
+    paragraph.add_run(" = Ellen,")
+    paragraph = document.add_paragraph()
+    run = paragraph.add_run("F = Felix")
+    run.font.color.rgb = RGBColor(0xC7, 0x78, 0x50)
+    document.add_paragraph("}")
+
+
+def add_scene(document, index):
+    """One labelled scene using every construct the converter handles"""
+    paragraph = document.add_paragraph()
+    run = paragraph.add_run(f"Scene Title {index}")
+    run.font.size = Pt(20)
+    run.bold = True
+    document.add_paragraph(f"== scene_{index} ==")
+
+    paragraph = document.add_paragraph()
+    paragraph.add_run("E: Hello ")
+    paragraph.add_run("there").italic = True
+    paragraph.add_run(" 100% \"quoted\" it's")
+
+    paragraph = document.add_paragraph()
+    paragraph.add_run("Bob").font.color.rgb = RGBColor(0xAB, 0x5B, 0x9A)
+    paragraph.add_run(": I'm bob")
+
+    document.add_paragraph("# a comment")
+    document.add_paragraph("(an aside)")
+    document.add_paragraph("*door slams*")
+
+    paragraph = document.add_paragraph()
+    paragraph.add_run("Narration with ")
+    paragraph.add_run("strike").font.strike = True
+    paragraph.add_run(" small").font.size = Pt(9)
+    document.add_paragraph("")
+
+    document.add_paragraph("F: What now?")
+    document.add_paragraph(f"- Go left == scene_{index + 1}")
+    document.add_paragraph("– Go right == nowhere")
+    document.add_paragraph("- Stay")
+
+    paragraph = document.add_paragraph()
+    paragraph.add_run("Underlined back\\slash").underline = True
+
+
+def build_script_document(path, scenes):
+    """
+    Write a script of `scenes` scenes to path
+
+    Args:
+        path: Destination .docx path
+        scenes: Number of scenes (about 14 paragraphs each)
+    """
+    document = Document()
+    add_character_block(document)
+    for index in range(scenes):
+        add_scene(document, index)
+    document.save(path)
+
+
+def build_styles_document(path):
+    """Run styling of every kind, with 12pt body text as the baseline"""
+    document = Document()
+    paragraph = document.add_paragraph()
+    paragraph.add_run("Body text at the usual size, ").font.size = Pt(12)
+    paragraph.add_run("bold").bold = True
+    paragraph.add_run(", ")
+    paragraph.add_run("italic").italic = True
+    paragraph.add_run(", ")
+    paragraph.add_run("underlined").underline = True
+    paragraph.add_run(" and ")
+    paragraph.add_run("struck").font.strike = True
+
+    paragraph = document.add_paragraph()
+    run = paragraph.add_run("Everything at once")
+    run.bold = run.italic = run.underline = True
+    run.font.strike = True
+    run.font.size = Pt(18)
+    run.font.color.rgb = RGBColor(0x12, 0x34, 0x56)
+
+    for size in (8, 12, 12, 14, 30):
+        paragraph = document.add_paragraph()
+        paragraph.add_run(f"Text at {size} points").font.size = Pt(size)
+
+    paragraph = document.add_paragraph()
+    paragraph.add_run("E").font.color.rgb = RGBColor(0xFF, 0x00, 0x00)
+    paragraph.add_run(": a styled speaker with ")
+    paragraph.add_run("green").font.color.rgb = RGBColor(0x00, 0x80, 0x00)
+    paragraph.add_run(" words")
+    document.save(path)
+
+
+def build_characters_document(path):
+    """Characters{} block, then known and unknown speakers"""
+    document = Document()
+    document.add_paragraph("Characters{")
+    paragraph = document.add_paragraph()
+    paragraph.add_run("E").font.color.rgb = RGBColor(0x67, 0x8C, 0xD1)
+    paragraph.add_run(" = Ellen,")
+    paragraph = document.add_paragraph()
+    paragraph.add_run("F = ")
+    paragraph.add_run("Felix").font.color.rgb = RGBColor(0xC7, 0x78, 0x50)
+    paragraph.add_run(",")
+    paragraph = document.add_paragraph()
+    paragraph.add_run("G = Gus").font.color.rgb = RGBColor(0x00, 0x00, 0x00)
+    document.add_paragraph("}")
+    document.add_paragraph("E: Defined speakers use their short name.")
+    document.add_paragraph("F: So does Felix.")
+    document.add_paragraph("Stranger: Undefined speakers keep their full name.")
+    paragraph = document.add_paragraph()
+    paragraph.add_run("Boss").bold = True
+    paragraph.add_run(": Styled undefined speaker.")
+    document.save(path)
+
+
+def build_menus_document(path):
+    """Menus with jumps, dash styles, indentation and a menu ending the file"""
+    document = Document()
+    document.add_paragraph("== intro ==")
+    document.add_paragraph("E: Where to?")
+    document.add_paragraph("- North == north")
+    document.add_paragraph("– South == south")
+    document.add_paragraph("    - East")
+    document.add_paragraph("\t- West == west")
+    document.add_paragraph("== north ==")
+    document.add_paragraph("Cold up here.")
+    document.add_paragraph("== south ==")
+    document.add_paragraph("F: Every choice jumps?")
+    document.add_paragraph("- Yes == north")
+    document.add_paragraph("- Also yes == south")
+    document.add_paragraph("== west ==")
+    document.add_paragraph("- A choice with no prompt")
+    document.add_paragraph("E: Last menu")
+    document.add_paragraph("- The end == intro")
+    document.save(path)
+
+
+def build_comments_document(path):
+    """Both comment styles between lines"""
+    document = Document()
+    document.add_paragraph("# hash comment")
+    document.add_paragraph("E: Line between comments")
+    document.add_paragraph("(parenthesised comment)")
+    document.add_paragraph("  # indented hash comment")
+    document.add_paragraph("(not a comment: no closing bracket")
+    document.add_paragraph("Text (with brackets) inside")
+    document.save(path)
+
+
+def build_escapes_document(path):
+    """Characters Ren'Py needs escaped"""
+    document = Document()
+    document.add_paragraph("Back\\slash, \"double\", 'single' and 100% done")
+    document.add_paragraph("E: She said \"it's 50%\" \\o/")
+    paragraph = document.add_paragraph()
+    paragraph.add_run("Styled ").bold = True
+    paragraph.add_run("\"quote\" 10%").italic = True
+    document.add_paragraph("Colons: in: narration: stay")
+    document.save(path)
+
+
+def build_sound_document(path):
+    """Sound lines and multi-paragraph-looking text"""
+    document = Document()
+    document.add_paragraph("*thunder*")
+    document.add_paragraph("E: *whispers* quietly")
+    document.add_paragraph("Rain *patters* on the roof")
+    document.add_paragraph("")
+    document.add_paragraph("   ")
+    document.add_paragraph("*door creaks*  ")
+    document.save(path)
+
+
+def build_empty_document(path):
+    """A document with no text at all"""
+    Document().save(path)
+
+
+# Fixture name -> builder(path), covering every construct the converter handles
+FIXTURES = {
+    "styles": build_styles_document,
+    "characters": build_characters_document,
+    "menus": build_menus_document,
+    "comments": build_comments_document,
+    "escapes": build_escapes_document,
+    "sound": build_sound_document,
+    "empty": build_empty_document,
+    "script": lambda path: build_script_document(path, 5),
+}
+
+
+RANDOM_WORDS = [
+    "rain", "door", "Ellen", "100%", "\"hey\"", "it's", "back\\slash", "(aside)",
+    "*thud*", "==", "-", "–", "#", ":", "{", "}", "menu", "label", "é", "日本",
+]
+RANDOM_SPEAKERS = ["E", "F", "Bob", "Mystery Voice", ""]
+RANDOM_SIZES = [None, None, None, 9, 11, 12, 14, 20]
+RANDOM_COLORS = [None, None, None, RGBColor(0, 0, 0), RGBColor(0xAB, 0x5B, 0x9A), RGBColor(0x67, 0x8C, 0xD1)]
+
+
+def _random_text(rng, words):
+    return " ".join(rng.choice(RANDOM_WORDS) for _ in range(words))
+
+
+def _add_random_runs(rng, paragraph, text):
+    """Split text into runs with random styling"""
+    while text:
+        cut = rng.randint(1, len(text))
+        run = paragraph.add_run(text[:cut])
+        text = text[cut:]
+        run.bold = rng.random() < 0.2
+        run.italic = rng.random() < 0.2
+        run.underline = rng.random() < 0.1
+        run.font.strike = rng.random() < 0.05
+        size = rng.choice(RANDOM_SIZES)
+        if size:
+            run.font.size = Pt(size)
+        color = rng.choice(RANDOM_COLORS)
+        if color is not None:
+            run.font.color.rgb = color
+
+
+def build_random_document(path, rng, paragraphs=60):
+    """
+    Write a random but script-like document for differential runs
+
+    Args:
+        path: Destination .docx path
+        rng: random.Random instance, so runs are reproducible from a seed
+        paragraphs: Approximate number of paragraphs
+    """
+    document = Document()
+    if rng.random() < 0.5:
+        add_character_block(document)
+
+    for index in range(paragraphs):
+        kind = rng.random()
+        if kind < 0.35:
+            speaker = rng.choice(RANDOM_SPEAKERS)
+            text = f"{speaker}: {_random_text(rng, rng.randint(1, 8))}" if speaker else _random_text(rng, 5)
+            _add_random_runs(rng, document.add_paragraph(), text)
+        elif kind < 0.55:
+            _add_random_runs(rng, document.add_paragraph(), _random_text(rng, rng.randint(1, 10)))
+        elif kind < 0.65:
+            document.add_paragraph(f"{rng.choice(RANDOM_SPEAKERS) or 'E'}: {_random_text(rng, 3)}")
+            for _ in range(rng.randint(1, 4)):
+                dash = rng.choice(["- ", "– ", "    - ", "\t– "])
+                jump = f" == label_{rng.randint(0, 5)}" if rng.random() < 0.7 else ""
+                document.add_paragraph(f"{dash}{_random_text(rng, 2)}{jump}")
+        elif kind < 0.72:
+            document.add_paragraph(f"== label_{index % 7} ==")
+        elif kind < 0.8:
+            document.add_paragraph(rng.choice(["# ", "("]) + _random_text(rng, 3) + rng.choice(["", ")"]))
+        elif kind < 0.88:
+            document.add_paragraph(f"*{_random_text(rng, 2)}*")
+        elif kind < 0.94:
+            document.add_paragraph(rng.choice(["", " ", "\t"]))
+        else:
+            _add_random_runs(rng, document.add_paragraph(), _random_text(rng, 1))
+
+    document.save(path)
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Differential check of the converter's alternate engines
+
+Every fixture in corpus.FIXTURES is converted by the reference path
+(python-docx Document -> Consolidate -> ConvertToRenpy) and the result is
+compared with the golden output in benchmarks/golden/. Each engine in
+ENGINES must then produce byte-identical output for the same document.
+With --random, randomly generated documents are compared the same way
+(against the reference only; they have no golden files).
+
+Exits with status 1 on any difference.
+
+Usage:
+    python benchmarks/differential.py
+    python benchmarks/differential.py --random 200 --seed 7
+    python benchmarks/differential.py --update-golden
+"""
+
+import argparse
+import difflib
+import os
+import random
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+BENCHMARKS_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCHMARKS_DIR.parent))
+sys.path.insert(0, str(BENCHMARKS_DIR))
+
+from docx import Document
+
+from corpus import FIXTURES, build_random_document
+from renpy_doc_convert.api import convert, parse, render
+from renpy_doc_convert.consolidate import Consolidate
+from renpy_doc_convert.ir import IR_FORMAT_VERSION, DocumentIR
+from renpy_doc_convert.parallel import parse_parallel
+from renpy_doc_convert.preview import PreviewStream
+from renpy_doc_convert.store import ConversionStore
+from renpy_doc_convert.to_renpy import ConvertToRenpy, get_document_default_size
+
+GOLDEN_DIR = BENCHMARKS_DIR / "golden"
+
+# Lines of unified diff shown per mismatch
+DIFF_LINES = 20
+
+
+def reference_engine(docx_path, rpy_path):
+    """The original pipeline, straight from python-docx objects"""
+    document = Document(docx_path)
+    obj = Consolidate(document)
+    obj.consolidate_paragraphs()
+    ConvertToRenpy(document, obj.text_chunks, rpy_path,
+                   font_histogram=obj.font_histogram).output_renpy_text()
+
+
+def ir_engine(docx_path, rpy_path):
+    """api.convert: parse to a DocumentIR, render from it"""
+    convert(docx_path, rpy_path)
+
+
+def ir_roundtrip_engine(docx_path, rpy_path):
+    """Render from an IR that went through its binary serialization"""
+    ir = parse(docx_path)
+    render(DocumentIR.from_bytes(ir.to_bytes()), rpy_path)
+
+
+def cached_engine(docx_path, rpy_path):
+    """Render from the IR stored by an earlier conversion"""
+    with tempfile.TemporaryDirectory() as store_dir:
+        store = ConversionStore(store_dir)
+        parse(docx_path, store)
+        convert(docx_path, rpy_path, store=store)
+        store.flush()
+
+
+def truncated_cache_engine(docx_path, rpy_path):
+    """Stored IRs cut short at several points must be ignored and the document parsed again"""
+    with tempfile.TemporaryDirectory() as store_dir:
+        store = ConversionStore(store_dir)
+        parse(docx_path, store)
+        key = store.ir_key(store.digest(docx_path), IR_FORMAT_VERSION)
+        blob = store.read("ir", key)
+        outputs = set()
+        for length in (0, 5, len(blob) // 3, len(blob) // 2, len(blob) - 1):
+            store.write("ir", key, blob[:length])
+            convert(docx_path, rpy_path, store=store)
+            with open(rpy_path, "rb") as f:
+                outputs.add(f.read())
+        store.flush()
+        if len(outputs) != 1:
+            raise AssertionError("output depends on where the stored IR was cut")
+
+
+def parallel_engine(docx_path, rpy_path):
+    """Paragraph ranges consolidated in worker processes, however small the document"""
+    document = Document(docx_path)
+    ir = parse_parallel(docx_path, len(document.paragraphs), get_document_default_size(document),
+                        workers=2, min_paragraphs=1)
+    render(ir if ir is not None else parse(docx_path), rpy_path)
+
+
+def preview_engine(docx_path, rpy_path):
+    """IR indexed while streaming previews, one preview per paragraph"""
+    preview = PreviewStream(rpy_path, lambda text, replace: None, first_paragraphs=1)
+    render(parse(docx_path, preview=preview), rpy_path)
+
+
+# Engine name -> engine(docx_path, rpy_path); each must match reference_engine
+ENGINES = {
+    "ir": ir_engine,
+    "ir_roundtrip": ir_roundtrip_engine,
+    "cached": cached_engine,
+    "truncated_cache": truncated_cache_engine,
+    "parallel": parallel_engine,
+    "preview": preview_engine,
+}
+
+
+def run_engine(engine, docx_path, name, directory):
+    """Convert with an engine; the output is named so its label is `name`"""
+    engine_dir = os.path.join(directory, engine.__name__)
+    os.makedirs(engine_dir, exist_ok=True)
+    rpy_path = os.path.join(engine_dir, name + ".rpy")
+    engine(docx_path, rpy_path)
+    with open(rpy_path, "rb") as f:
+        return f.read()
+
+
+def show_diff(expected, actual, expected_name, actual_name):
+    diff = difflib.unified_diff(
+        expected.decode("utf-8", "replace").splitlines(),
+        actual.decode("utf-8", "replace").splitlines(),
+        expected_name, actual_name, lineterm=""
+    )
+    for index, line in enumerate(diff):
+        if index == DIFF_LINES:
+            print("      ...")
+            break
+        print("      " + line)
+
+
+def compare_document(docx_path, name, engines, directory, golden=None):
+    """Compare every engine with the reference on one document; returns the mismatch count"""
+    expected = run_engine(reference_engine, docx_path, name, directory)
+    failures = 0
+
+    if golden is not None and golden != expected:
+        failures += 1
+        print(f"  {name}: reference output differs from golden file")
+        show_diff(golden, expected, "golden", "reference")
+
+    for engine_name, engine in engines.items():
+        try:
+            actual = run_engine(engine, docx_path, name, directory)
+        except Exception as e:
+            failures += 1
+            print(f"  {name}: {engine_name} failed: {type(e).__name__}: {e}")
+            continue
+        if actual != expected:
+            failures += 1
+            print(f"  {name}: {engine_name} differs from reference")
+            show_diff(expected, actual, "reference", engine_name)
+
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare converter engines byte for byte.")
+    parser.add_argument("--engine", action="append", choices=sorted(ENGINES),
+                        help="only check this engine (repeatable)")
+    parser.add_argument("--random", type=int, default=0, metavar="N",
+                        help="also compare N randomly generated documents")
+    parser.add_argument("--seed", type=int, default=0, help="seed for --random (default: 0)")
+    parser.add_argument("--paragraphs", type=int, default=60,
+                        help="paragraphs per random document (default: 60)")
+    parser.add_argument("--keep", metavar="DIR", help="copy documents that fail into DIR")
+    parser.add_argument("--update-golden", action="store_true",
+                        help="rewrite the golden files from the reference engine")
+    args = parser.parse_args(argv)
+
+    engines = {name: ENGINES[name] for name in (args.engine or ENGINES)}
+    failures = 0
+    failed_documents = []
+
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"Fixtures ({', '.join(engines)})")
+        for name, build in FIXTURES.items():
+            docx_path = os.path.join(directory, name + ".docx")
+            build(docx_path)
+            golden_path = GOLDEN_DIR / (name + ".rpy")
+
+            if args.update_golden:
+                GOLDEN_DIR.mkdir(exist_ok=True)
+                golden_path.write_bytes(run_engine(reference_engine, docx_path, name, directory))
+                print(f"  {name}: golden file written")
+                continue
+
+            golden = golden_path.read_bytes() if golden_path.exists() else None
+            if golden is None:
+                print(f"  {name}: no golden file, run with --update-golden")
+            count = compare_document(docx_path, name, engines, directory, golden)
+            failures += count
+            if count:
+                failed_documents.append(docx_path)
+            else:
+                print(f"  {name}: ok")
+
+        if args.random:
+            print(f"Random documents (seed {args.seed})")
+            rng = random.Random(args.seed)
+            identical = 0
+            for index in range(args.random):
+                name = f"random_{args.seed}_{index}"
+                docx_path = os.path.join(directory, name + ".docx")
+                build_random_document(docx_path, rng, args.paragraphs)
+                count = compare_document(docx_path, name, engines, directory)
+                failures += count
+                if count:
+                    failed_documents.append(docx_path)
+                else:
+                    identical += 1
+            print(f"  {identical}/{args.random} identical")
+
+        if args.keep and failed_documents:
+            os.makedirs(args.keep, exist_ok=True)
+            for docx_path in failed_documents:
+                shutil.copy(docx_path, args.keep)
+            print(f"Copied {len(failed_documents)} failing document(s) to {args.keep}")
+
+    if failures:
+        print(f"{failures} difference(s) found")
+        return 1
+    print("All engines match the reference")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
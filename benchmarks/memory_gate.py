@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Memory regression gate for the converter
+
+Converts synthetic scripts of several sizes, each in a fresh process, and
+compares peak memory per MB of input against memory_thresholds.json:
+
+- peak_bytes_per_input_mb: peak Python heap traced by tracemalloc
+- rss_growth_bytes_per_input_mb: growth of the process RSS high-water mark,
+  which also covers memory allocated by lxml (Unix only)
+
+Exits with status 1 when any case goes over its threshold.
+
+Usage:
+    python benchmarks/memory_gate.py             # check
+    python benchmarks/memory_gate.py --update    # re-record thresholds
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+BENCHMARKS_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCHMARKS_DIR.parent))
+sys.path.insert(0, str(BENCHMARKS_DIR))
+
+from corpus import build_script_document
+from renpy_doc_convert.api import convert
+from renpy_doc_convert.memory import MB, MemoryTracker, rss_high_water
+
+THRESHOLDS_FILE = BENCHMARKS_DIR / "memory_thresholds.json"
+
+# Case name -> number of scenes in the synthetic script
+CASES = {
+    "scenes_100": 100,
+    "scenes_500": 500,
+}
+
+# Margin recorded on top of measured values by --update
+DEFAULT_HEADROOM = 1.25
+
+METRICS = ["peak_bytes_per_input_mb", "rss_growth_bytes_per_input_mb"]
+
+
+def measure_case(scenes):
+    """Build and convert one script in this (fresh) process; returns its metrics"""
+    with tempfile.TemporaryDirectory() as directory:
+        docx_path = os.path.join(directory, "script.docx")
+        build_script_document(docx_path, scenes)
+
+        rss_before = rss_high_water()
+        tracker = MemoryTracker(docx_path)
+        convert(docx_path, os.path.join(directory, "script.rpy"), memory=tracker)
+        rss_after = rss_high_water()
+
+    input_mb = tracker.input_bytes / MB
+    metrics = {
+        "input_bytes": tracker.input_bytes,
+        "peak_bytes": tracker.peak_bytes,
+        "peak_bytes_per_input_mb": tracker.peak_per_input_mb(),
+        "rss_growth_bytes_per_input_mb": None,
+        "stages": [stage.to_dict() for stage in tracker.stages],
+    }
+    if rss_before is not None and rss_after is not None:
+        metrics["rss_growth_bytes_per_input_mb"] = (rss_after - rss_before) / input_mb
+    return metrics
+
+
+def run_case(scenes):
+    """Measure a case in a new interpreter so earlier cases do not skew RSS"""
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+        return pool.submit(measure_case, scenes).result()
+
+
+def load_thresholds(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_thresholds(path, results, headroom):
+    """Record measured values plus headroom, keeping cases that were not run"""
+    thresholds = load_thresholds(path) if os.path.exists(path) else {"cases": {}}
+    thresholds["headroom"] = headroom
+    for name, result in results.items():
+        thresholds["cases"][name] = {
+            metric: round(result[metric] * headroom)
+            for metric in METRICS
+            if result[metric] is not None
+        }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(thresholds, f, indent=2)
+        f.write("\n")
+
+
+def check(results, thresholds):
+    """Print each metric against its threshold; returns the number over"""
+    failures = 0
+    for name, result in results.items():
+        limits = thresholds.get("cases", {}).get(name, {})
+        for metric in METRICS:
+            value = result[metric]
+            limit = limits.get(metric)
+            if value is None or limit is None:
+                shown = "n/a" if value is None else f"{value / MB:.1f} MB"
+                print(f"  {name:<12} {metric:<32} {shown:>11}  (not checked)")
+                continue
+            over = value > limit
+            failures += over
+            print(f"  {name:<12} {metric:<32} {value / MB:8.1f} MB / {limit / MB:8.1f} MB"
+                  f"  {'FAIL' if over else 'ok'}")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check converter memory use against stored thresholds.")
+    parser.add_argument("--thresholds", default=str(THRESHOLDS_FILE), help="thresholds JSON file")
+    parser.add_argument("--update", action="store_true", help="record new thresholds instead of checking")
+    parser.add_argument("--headroom", type=float, default=DEFAULT_HEADROOM,
+                        help="margin over measured values when updating (default: %(default)s)")
+    parser.add_argument("--case", action="append", choices=sorted(CASES),
+                        help="only run this case (repeatable)")
+    args = parser.parse_args(argv)
+
+    names = args.case or list(CASES)
+    results = {}
+    for name in names:
+        print(f"Measuring {name}...", flush=True)
+        results[name] = run_case(CASES[name])
+
+    if args.update:
+        save_thresholds(args.thresholds, results, args.headroom)
+        print(f"Wrote thresholds for {len(results)} case(s) to {args.thresholds}")
+        return 0
+
+    failures = check(results, load_thresholds(args.thresholds))
+    if failures:
+        print(f"{failures} memory threshold(s) exceeded")
+        return 1
+    print("Memory use within thresholds")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -34,6 +34,35 @@ class Footer(ctk.CTkFrame):
             anchor="e"
         )
         self.status_indicator.pack(side="right", padx=20, pady=8)
+        
+        # Shown only while a conversion is running
+        self.cancel_button = ctk.CTkButton(
+            self,
+            text="Cancel",
+            width=80,
+            height=26,
+            font=ctk.CTkFont(size=12),
+            fg_color=COLORS['danger'],
+            hover_color=COLORS['danger_hover'],
+            corner_radius=6
+        )
+        self.progress_bar = ctk.CTkProgressBar(self, width=180)
+    
+    def show_progress(self, on_cancel):
+        """Show the progress bar and a Cancel button that calls on_cancel"""
+        self.progress_bar.set(0)
+        self.cancel_button.configure(command=on_cancel, state="normal")
+        self.cancel_button.pack(side="right", padx=(0, 10), pady=8)
+        self.progress_bar.pack(side="right", padx=10, pady=8)
+    
+    def set_progress(self, fraction):
+        """Update the progress bar (0.0 - 1.0)"""
+        self.progress_bar.set(fraction)
+    
+    def hide_progress(self):
+        """Remove the progress bar and Cancel button"""
+        self.progress_bar.pack_forget()
+        self.cancel_button.pack_forget()
     
     def set_status(self, message, status_type='ready'):
         """Update status message and indicator"""
@@ -5,7 +5,7 @@ Main content area with tabbed interface
 
 import customtkinter as ctk
 from gui.utils.constants import COLORS, BUTTON_HEIGHTS
-from gui.tabs import OutputTab, HelpTab, AboutTab
+from gui.tabs import OutputTab, HelpTab, AboutTab, SearchTab, StatsTab, PerformanceTab
 
 
 class MainArea(ctk.CTkFrame):
@@ -64,11 +64,20 @@ class MainArea(ctk.CTkFrame):
         
         # Add tabs
         self.tabview.add("📄 Output")
+        self.tabview.add("🔎 Search")
+        self.tabview.add("📊 Stats")
+        self.tabview.add("⏱ Performance")
         self.tabview.add("📖 Help")
         self.tabview.add("⁉️ About")
         
         # Create tab content
-        self.output_tab = OutputTab(self.tabview.tab("📄 Output"))
+        self.output_tab = OutputTab(
+            self.tabview.tab("📄 Output"),
+            on_source_selected=self.callbacks.get('show_source')
+        )
+        self.search_tab = SearchTab(self.tabview.tab("🔎 Search"), self.callbacks)
+        self.stats_tab = StatsTab(self.tabview.tab("📊 Stats"), self.callbacks)
+        self.performance_tab = PerformanceTab(self.tabview.tab("⏱ Performance"), self.callbacks)
         self.help_tab = HelpTab(self.tabview.tab("📖 Help"))
         self.about_tab = AboutTab(self.tabview.tab("⁉️ About"))
     
@@ -76,6 +85,39 @@ class MainArea(ctk.CTkFrame):
         """Get the output text widget"""
         return self.output_tab.text_widget
     
+    def set_output(self, content, source_map=None):
+        """Show a script, and optionally its SourceMap, in the output tab"""
+        self.output_tab.set_content(content, source_map)
+    
+    def show_file_output(self, filepath, content, source_map=None, patch=False):
+        """Show a file's script in the output tab, reusing its view if it was shown recently"""
+        self.output_tab.show_file(filepath, content, source_map, patch)
+    
+    def append_output(self, text):
+        """Add text to the end of the output tab"""
+        self.output_tab.append_content(text)
+    
+    def clear_output(self, forget_files=False):
+        """Clear the output tab; with forget_files, also drop the views kept for recent files"""
+        self.output_tab.clear(forget_files)
+    
+    def refresh_colors(self):
+        """Re-apply appearance-dependent colours"""
+        self.output_tab.refresh_colors()
+    
+    def show_output_line(self, line_number):
+        """Scroll the output tab to a line and highlight it"""
+        self.switch_to_output_tab()
+        self.output_tab.show_line(line_number)
+    
+    def show_stats(self, selected_stats, total_stats, file_count):
+        """Update the statistics tab"""
+        self.stats_tab.show(selected_stats, total_stats, file_count)
+    
+    def show_performance(self, timings_list, profiles=None):
+        """Update the performance tab"""
+        self.performance_tab.show(timings_list, profiles)
+    
     def switch_to_output_tab(self):
         """Switch to the output tab"""
         self.tabview.set("📄 Output")
@@ -83,3 +125,7 @@ class MainArea(ctk.CTkFrame):
     def update_copy_button(self, text):
         """Update copy button text"""
         self.copy_button.configure(text=text)
+    
+    def set_copy_enabled(self, enabled):
+        """Enable or disable the copy button"""
+        self.copy_button.configure(state="normal" if enabled else "disabled")
@@ -207,6 +207,15 @@ class Sidebar(ctk.CTkScrollableFrame):
             hover_color=COLORS['danger_hover'],
             corner_radius=8
         ).pack(padx=20, pady=4, fill="x")
+        
+        # Convert files only when they are needed
+        self.lazy_switch = ctk.CTkSwitch(
+            self,
+            text="Convert on demand",
+            command=lambda: self.callbacks['toggle_lazy'](bool(self.lazy_switch.get())),
+            font=ctk.CTkFont(size=13)
+        )
+        self.lazy_switch.pack(padx=20, pady=(10, 4), anchor="w")
     
     def _create_support_section(self):
         """Create support section"""
@@ -302,4 +311,8 @@ class Sidebar(ctk.CTkScrollableFrame):
     def disable_save_buttons(self):
         """Disable save buttons"""
         self.save_button.configure(state="disabled")
-        self.save_all_button.configure(state="disabled")
\ No newline at end of file
+        self.save_all_button.configure(state="disabled")
+    
+    def set_save_output_enabled(self, enabled):
+        """Enable or disable saving the selected file only"""
+        self.save_button.configure(state="normal" if enabled else "disabled")
\ No newline at end of file
@@ -5,13 +5,25 @@ Main application class for Docx to Renpy Converter
 import customtkinter as ctk
 from tkinter import filedialog, messagebox
 from pathlib import Path
+import os
+import queue
 import sys
+import threading
+import time
 
 from gui.components import Sidebar, MainArea, Footer
 from gui.user import Settings, ThemeManager, SessionManager
-from gui.utils import FileHandler
+from gui.utils import FileHandler, ConversionQueue
 from gui.utils.constants import *
+from gui.utils.conversion_queue import PRIORITY_BACKGROUND, PRIORITY_NEIGHBOR, PRIORITY_SELECTED
+from renpy_doc_convert.analytics import aggregate, write_report
 from renpy_doc_convert.api import DOC_TO_RENPY_VERSION
+from renpy_doc_convert.progress import (
+    CancellationToken, ConversionCancelled, eta_seconds, format_eta, overall_fraction
+)
+from renpy_doc_convert.profiling import PROFILE_MODES
+from renpy_doc_convert.schedule import BatchEstimate, expected_work
+from renpy_doc_convert.timings import write_timings_report
 
 
 def resource_path(relative_path):
@@ -52,8 +64,37 @@ class DocxToRenpyApp(ctk.CTk):
         self.grid_columnconfigure(1, weight=1)
         self.grid_rowconfigure(0, weight=1)
         
+        # Work finished on background threads is handed back to Tk here
+        self._ui_queue = queue.Queue()
+        
+        # Token of the conversion started by open_files, while it runs
+        self._conversion_token = None
+        
+        # On-demand mode: files registered but not converted yet
+        self._pending_files = set()
+        self._deferred_save_directory = None
+        self.conversion_queue = ConversionQueue(
+            lambda filepath, token: self.file_handler.convert_docx_to_renpy(
+                filepath, cancel_token=token, on_preview=self._preview_callback(filepath)
+            ),
+            lambda *result: self.run_on_ui(self._on_queued_conversion, *result)
+        )
+        
+        # File whose conversion is streamed into the output pane, if any,
+        # and the preview text so far of each file being converted
+        self._preview_file = None
+        self._previews = {}
+        self._file_buttons = []
+        
         # Create UI components
         self._create_ui()
+        self._poll_ui_queue()
+        
+        # Bring back the files from the previous launch
+        self._restore_session()
+        
+        # Drop stored conversions of files not opened in a long time
+        threading.Thread(target=self.file_handler.store.prune, daemon=True).start()
     
     def _create_ui(self):
         """Create all UI components"""
@@ -66,6 +107,13 @@ class DocxToRenpyApp(ctk.CTk):
             'change_theme': self.change_theme,
             'copy_to_clipboard': self.copy_to_clipboard,
             'select_file': self.select_file,
+            'search': self.search_scripts,
+            'open_search_result': self.open_search_result,
+            'export_stats': self.export_stats,
+            'export_performance': self.export_performance,
+            'show_source': self.show_source_paragraph,
+            'toggle_lazy': self.toggle_lazy_conversion,
+            'set_profile_mode': self.set_profile_mode,
         }
         
         # Create components
@@ -81,9 +129,96 @@ class DocxToRenpyApp(ctk.CTk):
         # Apply saved theme
         saved_theme = self.settings.get('theme', DEFAULT_THEME)
         self.sidebar.theme_menu.set(saved_theme)
+        
+        if self.settings.get('lazy_conversion', True):
+            self.sidebar.lazy_switch.select()
+        else:
+            self.sidebar.lazy_switch.deselect()
+        
+        profile_mode = self.settings.get('profile_mode')
+        if profile_mode not in PROFILE_MODES:
+            profile_mode = None
+        self.file_handler.profile_mode = profile_mode
+        self.main_area.performance_tab.set_profile_mode(profile_mode)
+    
+    def run_on_ui(self, callback, *args):
+        """Run a callback on the Tk thread; safe to call from worker threads"""
+        self._ui_queue.put((callback, args))
+    
+    def _poll_ui_queue(self):
+        """Run callbacks queued by worker threads"""
+        try:
+            while True:
+                callback, args = self._ui_queue.get_nowait()
+                callback(*args)
+        except queue.Empty:
+            pass
+        self.after(UI_POLL_INTERVAL_MS, self._poll_ui_queue)
+    
+    def _save_session_state(self):
+        """Remember loaded files and selection for the next launch"""
+        self.settings.update(self.session.get_state())
+    
+    def _restore_session(self):
+        """Reload the previous session from the conversion store"""
+        filepaths = [f for f in self.settings.get('session_files', []) if not self.session.has_file(f)]
+        if not filepaths:
+            return
+        
+        # Show stored outputs straight away; anything missing from the
+        # store is converted by the background check below
+        for filepath in filepaths:
+            content = self.file_handler.restore_cached(filepath)
+            self.session.add_file(filepath, content if content is not None else "")
+        
+        self._update_file_list()
+        self.sidebar.enable_save_buttons()
+        
+        selected = self.settings.get('session_selected')
+        if selected is None or not 0 <= selected < self.session.file_count():
+            selected = 0
+        self.select_file(selected)
+        self.footer.set_status(f"↻ Restored {len(filepaths)} file(s) from last session", 'ready')
+        
+        threading.Thread(
+            target=self._validate_restored_files,
+            args=(filepaths,),
+            daemon=True
+        ).start()
+    
+    def _validate_restored_files(self, filepaths):
+        """Reconvert restored files that changed on disk (worker thread)"""
+        for filepath in filepaths:
+            if not os.path.exists(filepath):
+                continue
+            if self.file_handler.restore_cached(filepath) is not None:
+                if not self.file_handler.needs_reconvert(filepath):
+                    continue
+            
+            success, content, error = self.file_handler.convert_docx_to_renpy(filepath)
+            self.run_on_ui(self._on_background_conversion, filepath, success, content, error)
+    
+    def _on_background_conversion(self, filepath, success, content, error):
+        """Apply a conversion finished on a worker thread"""
+        if not self.session.has_file(filepath):
+            return
+        
+        if not success:
+            self.footer.set_status(f"✗ {error.splitlines()[0]}", 'error')
+            return
+        
+        self.session.set_content(filepath, content)
+        if self.session.get_selected_file() == filepath:
+            self._show_file_output(filepath, patch=True)
+        self._update_stats()
+        self.footer.set_status(f"↻ Updated changed file: {Path(filepath).name}", 'ready')
     
     def open_files(self):
-        """Open file dialog and load multiple DOCX files"""
+        """Open file dialog and convert the chosen DOCX files in the background"""
+        if self._conversion_token is not None:
+            self.footer.set_status("⏳ Still converting - cancel it or wait for it to finish", 'processing')
+            return
+        
         filenames = filedialog.askopenfilenames(
             title="Select DOCX Files",
             filetypes=SUPPORTED_FILE_TYPES,
@@ -96,33 +231,218 @@ class DocxToRenpyApp(ctk.CTk):
         # Save last directory
         self.settings.set('last_directory', str(Path(filenames[0]).parent))
         
+        new_files = [f for f in filenames if not self.session.has_file(f)]
+        
+        if self.settings.get('lazy_conversion', True):
+            self._open_files_on_demand(new_files)
+            return
+        
+        self._conversion_token = CancellationToken()
+        if new_files:
+            self._set_preview(new_files[0])
+        self.footer.show_progress(self.cancel_conversion)
         self.footer.set_status("⏳ Converting files...", 'processing')
-        self.update()
         
-        new_files = [f for f in filenames if not self.session.has_file(f)]
+        threading.Thread(
+            target=self._convert_files,
+            args=(new_files, self._conversion_token),
+            daemon=True
+        ).start()
+    
+    def _open_files_on_demand(self, filenames):
+        """
+        Register files straight away and convert them in the background
         
-        # Auto-convert all new files
-        success_count = 0
-        for filename in new_files:
-            success, content, error = self.file_handler.convert_docx_to_renpy(filename)
-            if success:
-                self.session.add_file(filename, content)
+        Unchanged files are shown from the conversion store. The rest are
+        queued at low priority; selecting one converts it first and its
+        neighbours in the list next.
+        """
+        with self.settings.transaction():
+            for filename in filenames:
+                content = self.file_handler.restore_fresh(filename)
+                self.session.add_file(filename, content if content is not None else "")
                 self.settings.add_recent_file(filename)
-                success_count += 1
+                if content is None:
+                    self._pending_files.add(filename)
+                    self.conversion_queue.request(filename, PRIORITY_BACKGROUND)
+            self._save_session_state()
+        
+        self._update_file_list()
+        if not filenames:
+            self.footer.set_status("✗ No files were converted", 'error')
+            return
+        
+        self.sidebar.enable_save_buttons()
+        self.select_file(self.session.current_files.index(filenames[0]))
+    
+    def _prefetch_neighbors(self, index):
+        """Convert the files next to the selected one ahead of the rest"""
+        for distance in range(1, PREFETCH_NEIGHBORS + 1):
+            for neighbor in (index + distance, index - distance):
+                filepath = self.session.get_file(neighbor)
+                if filepath in self._pending_files:
+                    self.conversion_queue.request(filepath, PRIORITY_NEIGHBOR)
+    
+    def _on_queued_conversion(self, filepath, success, content, error):
+        """Apply a conversion finished by the conversion queue"""
+        if filepath not in self._pending_files:
+            return
+        self._pending_files.discard(filepath)
+        self._previews.pop(filepath, None)
+        selected = self.session.get_selected_file() == filepath
+        
+        if success:
+            self.session.set_content(filepath, content)
+            if selected:
+                self._show_file_output(filepath, patch=True)
+                self.footer.set_status(f"📄 Viewing: {Path(filepath).name}", 'viewing')
+            self._update_stats()
+        else:
+            self.session.set_error(filepath, error)
+        if selected:
+            self._set_preview(None)
+            if not success:
+                self._show_conversion_error(filepath)
+        
+        if filepath in self.session.current_files:
+            self._refresh_file_button(self.session.current_files.index(filepath))
+        
+        if not self._pending_files:
+            self.file_handler.store.flush()
+        
+        if self._deferred_save_directory is not None and not self._pending_files:
+            directory = self._deferred_save_directory
+            self._deferred_save_directory = None
+            self._save_all_to(directory)
+    
+    def toggle_lazy_conversion(self, enabled):
+        """Switch between converting on demand and converting everything up front"""
+        self.settings.set('lazy_conversion', enabled)
+        if not enabled:
+            # Finish what was left for later
+            for filepath in self.session.current_files:
+                if filepath in self._pending_files:
+                    self.conversion_queue.request(filepath, PRIORITY_NEIGHBOR)
+    
+    def set_profile_mode(self, mode):
+        """Profile new conversions with cProfile or by sampling, or stop profiling"""
+        self.settings.set('profile_mode', mode)
+        self.file_handler.profile_mode = mode
+        if mode is None:
+            self.footer.set_status("Profiling off", 'ready')
+        else:
+            self.footer.set_status(f"Profiling ({mode}) files opened or edited from now on", 'ready')
+    
+    def _convert_files(self, filenames, token):
+        """Convert newly opened files, reporting progress (worker thread)"""
+        results = []
+        started = time.monotonic()
+        # Weight progress by document size so one large file does not throw the ETA off
+        estimate = BatchEstimate([expected_work(filename) for filename in filenames])
+        
+        for index, filename in enumerate(filenames):
+            def on_progress(stage, done, total, index=index, filename=filename):
+                fraction = estimate.fraction(index, overall_fraction(stage, done, total))
+                eta = eta_seconds(time.monotonic() - started, fraction)
+                self.run_on_ui(self._on_conversion_progress, filename, fraction, eta)
+            
+            try:
+                success, content, error = self.file_handler.convert_docx_to_renpy(
+                    filename, on_progress, token, self._preview_callback(filename)
+                )
+            except ConversionCancelled:
+                break
+            estimate.finish(index)
+            results.append((filename, success, content, error))
+        
+        self.file_handler.store.flush()
+        self.run_on_ui(self._on_files_converted, token, results)
+    
+    def _on_conversion_progress(self, filename, fraction, eta):
+        """Show the progress of the running conversion"""
+        if self._conversion_token is None or self._conversion_token.cancelled:
+            return
+        self.footer.set_progress(fraction)
+        self.footer.set_status(
+            f"⏳ Converting {Path(filename).name}... {fraction:.0%} ({format_eta(eta)})",
+            'processing'
+        )
+    
+    def _preview_callback(self, filepath):
+        """on_preview callback for converting filepath (worker thread)"""
+        return lambda text, replace: self.run_on_ui(self._on_conversion_preview, filepath, text, replace)
+    
+    def _on_conversion_preview(self, filepath, text, replace):
+        """Collect part of a conversion, streaming it into the output pane if it shows that file"""
+        self._previews[filepath] = text if replace else self._previews.get(filepath, "") + text
+        if filepath != self._preview_file:
+            return
+        if replace:
+            self.main_area.set_output(text)
+        else:
+            self.main_area.append_output(text)
+    
+    def _set_preview(self, filepath):
+        """
+        Let the conversion of filepath stream into the output pane, or stop
+        with None. Save and Copy stay disabled while a preview is shown.
+        """
+        self._preview_file = filepath
+        if filepath is not None:
+            self.main_area.set_output(self._previews.get(filepath, ""))
+        complete = filepath is None
+        self.main_area.set_copy_enabled(complete)
+        self.sidebar.set_save_output_enabled(complete and self.session.has_files())
+    
+    def cancel_conversion(self):
+        """Stop the running conversion; files already converted are kept"""
+        if self._conversion_token is not None:
+            self._conversion_token.cancel()
+            self.footer.set_status("⏹ Cancelling...", 'processing')
+    
+    def _on_files_converted(self, token, results):
+        """Add the files converted by _convert_files to the session"""
+        if token is not self._conversion_token:
+            # Cleared while converting
+            return
+        cancelled = token.cancelled
+        self._conversion_token = None
+        self.footer.hide_progress()
+        self._previews.clear()
+        if self._preview_file is not None:
+            # Replace the preview with the selected file, or a new one below
+            self._set_preview(None)
+            selected = self.session.get_selected_file()
+            if selected is not None:
+                self._show_file_output(selected)
             else:
-                messagebox.showerror("Conversion Error", error)
+                self.main_area.clear_output()
+        
+        converted = []
+        with self.settings.transaction():
+            for filename, success, content, error in results:
+                if success:
+                    self.session.add_file(filename, content)
+                    self.settings.add_recent_file(filename)
+                    converted.append(filename)
+                else:
+                    messagebox.showerror("Conversion Error", error)
+            self._save_session_state()
         
         # Update UI
         self._update_file_list()
         
-        if success_count > 0:
+        if converted:
             self.sidebar.enable_save_buttons()
-            self.footer.set_status(f"✓ Converted {success_count} file(s) successfully", 'ready')
             
             # Select the first new file
-            if new_files:
-                first_new_index = self.session.current_files.index(new_files[0])
-                self.select_file(first_new_index)
+            first_new_index = self.session.current_files.index(converted[0])
+            self.select_file(first_new_index)
+        
+        if cancelled:
+            self.footer.set_status(f"⏹ Conversion cancelled - {len(converted)} file(s) converted", 'ready')
+        elif converted:
+            self.footer.set_status(f"✓ Converted {len(converted)} file(s) successfully", 'ready')
         else:
             self.footer.set_status("✗ No files were converted", 'error')
     
@@ -131,6 +451,7 @@ class DocxToRenpyApp(ctk.CTk):
         # Clear existing buttons
         for widget in self.sidebar.files_frame.winfo_children():
             widget.destroy()
+        self._file_buttons = []
         
         # Update count
         self.sidebar.update_file_count(self.session.file_count())
@@ -140,13 +461,29 @@ class DocxToRenpyApp(ctk.CTk):
             filename = self.session.get_file_name(i)
             self._create_file_button(filename, i)
     
+    def _file_button_text(self, index):
+        """File list label, marking files that are still waiting to convert or failed to"""
+        filepath = self.session.get_file(index)
+        if filepath in self._pending_files:
+            icon = "⏳"
+        elif self.session.get_error(filepath) is not None:
+            icon = "✗"
+        else:
+            icon = "📄"
+        return f"{icon}  {self.session.get_file_name(index)}"
+    
+    def _refresh_file_button(self, index):
+        """Update one file list label without rebuilding the list"""
+        if 0 <= index < len(self._file_buttons):
+            self._file_buttons[index].configure(text=self._file_button_text(index))
+    
     def _create_file_button(self, filename, index):
         """Create a clickable button for each file"""
         is_selected = (index == self.session.selected_file_index)
         
         btn = ctk.CTkButton(
             self.sidebar.files_frame,
-            text=f"📄  {filename}",
+            text=self._file_button_text(index),
             command=lambda: self.select_file(index),
             anchor="w",
             height=40,
@@ -156,6 +493,7 @@ class DocxToRenpyApp(ctk.CTk):
             hover_color=COLORS['primary_hover']
         )
         btn.pack(fill="x", pady=3, padx=5)
+        self._file_buttons.append(btn)
     
     def select_file(self, index):
         """Select a file and display its output"""
@@ -165,16 +503,139 @@ class DocxToRenpyApp(ctk.CTk):
             
             # Update file list to show selection
             self._update_file_list()
+            self._save_session_state()
             
             # Display content
-            content = self.session.get_content(filepath)
-            output_widget = self.main_area.get_output_text_widget()
-            output_widget.delete("1.0", "end")
-            output_widget.insert("1.0", content)
+            self._show_file_output(filepath)
+            self._update_stats()
             
-            self.footer.set_status(f"📄 Viewing: {Path(filepath).name}", 'viewing')
+            if filepath in self._pending_files:
+                self._set_preview(filepath)
+                self.conversion_queue.request(filepath, PRIORITY_SELECTED)
+                self.footer.set_status(f"⏳ Converting {Path(filepath).name}...", 'processing')
+            elif self.session.get_error(filepath) is not None:
+                self._set_preview(None)
+                self._show_conversion_error(filepath)
+            else:
+                self._set_preview(None)
+                self.footer.set_status(f"📄 Viewing: {Path(filepath).name}", 'viewing')
+            self._prefetch_neighbors(index)
             self.main_area.switch_to_output_tab()
     
+    def _show_file_output(self, filepath, patch=False):
+        """
+        Show a file's script with its source map; a recently viewed file comes
+        back as it was left. With patch, a file not viewed recently rewrites
+        only the lines that differ from the script on screen (its preview).
+        """
+        content = self.session.get_content(filepath)
+        source_map = self.file_handler.get_source_map(filepath)
+        self.main_area.show_file_output(filepath, content, source_map, patch)
+    
+    def _show_conversion_error(self, filepath):
+        """Show why a file failed to convert in place of its script"""
+        error = self.session.get_error(filepath)
+        self.main_area.set_output(
+            "".join(f"# {line}\n" for line in error.splitlines()) or "# Conversion failed\n"
+        )
+        self.main_area.set_copy_enabled(False)
+        self.footer.set_status(f"✗ {(error.splitlines() or ['Conversion failed'])[0]}", 'error')
+    
+    def show_source_paragraph(self, line_number, paragraph_index):
+        """Show which document paragraph an output line came from"""
+        filepath = self.session.get_selected_file()
+        if filepath is None or self._preview_file is not None:
+            return
+        self.footer.set_status(
+            f"📄 {Path(filepath).name}: line {line_number} is from paragraph {paragraph_index + 1}",
+            'viewing'
+        )
+    
+    def search_scripts(self, query):
+        """Search all loaded scripts"""
+        return self.session.search(query)
+    
+    def open_search_result(self, filepath, line_number):
+        """Show the file a search result is in, scrolled to its line"""
+        if not self.session.has_file(filepath):
+            return
+        self.select_file(self.session.current_files.index(filepath))
+        self.main_area.show_output_line(line_number)
+    
+    def _collect_stats(self):
+        """Statistics of every loaded file that has them"""
+        stats_list = []
+        for filepath in self.session.current_files:
+            stats = self.file_handler.get_stats(filepath)
+            if stats is not None:
+                stats_list.append(stats)
+        return stats_list
+    
+    def _update_stats(self):
+        """Refresh the statistics and performance tabs"""
+        stats_list = self._collect_stats()
+        selected = self.session.get_selected_file()
+        selected_stats = next((s for s in stats_list if s.source == selected), None)
+        total = aggregate(stats_list) if stats_list else None
+        self.main_area.show_stats(selected_stats, total, len(stats_list))
+        profiles = {
+            filepath: self.file_handler.profiles[filepath]
+            for filepath in self.session.current_files if filepath in self.file_handler.profiles
+        }
+        self.main_area.show_performance(self._collect_timings(), profiles)
+    
+    def _collect_timings(self):
+        """Timings of every loaded file converted this session"""
+        timings = self.file_handler.timings
+        return [timings[filepath] for filepath in self.session.current_files if filepath in timings]
+    
+    def export_stats(self, extension):
+        """Export statistics of all loaded files as JSON or CSV"""
+        stats_list = self._collect_stats()
+        if not stats_list:
+            messagebox.showwarning("Warning", "No statistics to export")
+            return
+        
+        filetypes = [("CSV", "*.csv")] if extension == ".csv" else [("JSON", "*.json")]
+        report_filename = filedialog.asksaveasfilename(
+            title="Export Script Statistics",
+            defaultextension=extension,
+            initialfile="script_stats" + extension,
+            filetypes=filetypes + [("All Files", "*.*")],
+            initialdir=self.settings.get('last_directory', str(Path.home()))
+        )
+        if not report_filename:
+            return
+        
+        try:
+            write_report(stats_list, report_filename)
+            self.footer.set_status(f"✓ Exported statistics: {Path(report_filename).name}", 'ready')
+        except Exception as e:
+            messagebox.showerror("Export Error", f"Error: {e}")
+    
+    def export_performance(self):
+        """Export conversion timings of all loaded files as JSON"""
+        timings_list = self._collect_timings()
+        if not timings_list:
+            messagebox.showwarning("Warning", "No timings to export")
+            return
+        
+        report_filename = filedialog.asksaveasfilename(
+            title="Export Conversion Timings",
+            defaultextension=".json",
+            initialfile="conversion_timings.json",
+            filetypes=[("JSON", "*.json"), ("All Files", "*.*")],
+            initialdir=self.settings.get('last_directory', str(Path.home()))
+        )
+        if not report_filename:
+            return
+        
+        try:
+            write_timings_report(timings_list, report_filename, DOC_TO_RENPY_VERSION)
+            self.footer.set_status(f"✓ Exported timings: {Path(report_filename).name}", 'ready')
+        except Exception as e:
+            messagebox.showerror("Export Error", f"Error: {e}")
+    
     def save_output(self):
         """Save current output to .rpy file"""
         if self.session.selected_file_index is None:
@@ -184,6 +645,10 @@ class DocxToRenpyApp(ctk.CTk):
         filepath = self.session.get_selected_file()
         content = self.session.get_selected_content()
         
+        if filepath in self._pending_files:
+            messagebox.showinfo("Please Wait", f"{Path(filepath).name} is still being converted")
+            return
+        
         if not content:
             messagebox.showwarning("Warning", "No content to save")
             return
@@ -216,21 +681,59 @@ class DocxToRenpyApp(ctk.CTk):
             initialdir=self.settings.get('last_directory', str(Path.home()))
         )
         
-        if directory:
-            saved_count, error = self.file_handler.save_multiple_files(
-                self.session.output_contents,
-                directory
+        if not directory:
+            return
+        
+        pending = [f for f in self.session.current_files if f in self._pending_files]
+        if pending:
+            # Convert what is left first; _on_queued_conversion saves afterwards
+            self._deferred_save_directory = directory
+            for filepath in pending:
+                self.conversion_queue.request(filepath, PRIORITY_NEIGHBOR)
+            self.footer.set_status(
+                f"⏳ Converting {len(pending)} remaining file(s) before saving...",
+                'processing'
             )
-            
-            if error:
-                messagebox.showerror("Save Error", f"Error: {error}")
-            else:
-                self.settings.set('last_directory', directory)
-                self.footer.set_status(
-                    f"✓ Saved {saved_count} file(s) to {Path(directory).name}",
-                    'ready'
+            return
+        
+        self._save_all_to(directory)
+    
+    def _save_all_to(self, directory):
+        """Save all outputs to a directory and report the result"""
+        summary = self.file_handler.save_multiple_files(
+            self.session.output_contents,
+            directory
+        )
+        written = len(summary['written'])
+        skipped = len(summary['skipped'])
+        failed = summary['failed']
+        # Files that failed to convert have no script to save
+        for filepath in self.session.current_files:
+            error = self.session.get_error(filepath)
+            if error is not None:
+                failed[filepath] = "not converted - " + (error.splitlines() or [""])[-1]
+        
+        if failed:
+            details = "\n".join(
+                f"{Path(path).name}: {error}" for path, error in failed.items()
+            )
+            messagebox.showerror(
+                "Save Error",
+                f"Failed to save {len(failed)} file(s):\n{details}"
+            )
+        
+        if written or skipped:
+            self.settings.set('last_directory', directory)
+            self.footer.set_status(
+                f"✓ Saved {written} file(s), {skipped} unchanged, to {Path(directory).name}",
+                'ready' if not failed else 'error'
+            )
+            if not failed:
+                messagebox.showinfo(
+                    "Success",
+                    f"Saved {written} file(s) successfully!\n"
+                    f"{skipped} file(s) were already up to date."
                 )
-                messagebox.showinfo("Success", f"Saved {saved_count} file(s) successfully!")
     
     def clear_all(self):
         """Clear all loaded files"""
@@ -238,9 +741,20 @@ class DocxToRenpyApp(ctk.CTk):
             return
         
         if messagebox.askyesno("Clear All", "Clear all loaded files and outputs?"):
+            if self._conversion_token is not None:
+                self._conversion_token.cancel()
+                self._conversion_token = None
+                self.footer.hide_progress()
+            self.conversion_queue.clear()
+            self._pending_files.clear()
+            self._deferred_save_directory = None
             self.session.clear_all()
+            self._save_session_state()
             self._update_file_list()
-            self.main_area.get_output_text_widget().delete("1.0", "end")
+            self._previews.clear()
+            self._set_preview(None)
+            self.main_area.clear_output(forget_files=True)
+            self._update_stats()
             self.sidebar.disable_save_buttons()
             self.footer.set_status("✓ Ready - Select DOCX files to begin", 'ready')
     
@@ -262,7 +776,11 @@ class DocxToRenpyApp(ctk.CTk):
     def change_theme(self, new_theme):
         """Change UI appearance mode"""
         self.theme_manager.change_theme(new_theme)
+        self.main_area.refresh_colors()
     
     def run(self):
         """Start the application"""
-        self.mainloop()
\ No newline at end of file
+        try:
+            self.mainloop()
+        finally:
+            self.settings.flush()
\ No newline at end of file
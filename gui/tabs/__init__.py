@@ -5,5 +5,8 @@ Tab content modules
 from .output_tab import OutputTab
 from .help_tab import HelpTab
 from .about_tab import AboutTab
+from .search_tab import SearchTab
+from .stats_tab import StatsTab
+from .performance_tab import PerformanceTab
 
-__all__ = ['OutputTab', 'HelpTab', 'AboutTab']
+__all__ = ['OutputTab', 'HelpTab', 'AboutTab', 'SearchTab', 'StatsTab', 'PerformanceTab']
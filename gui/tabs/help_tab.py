@@ -15,9 +15,18 @@ class HelpTab:
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 
 1. Click "📁 Open DOCX Files" to select Word documents
+   (plain-text .txt and Markdown .md drafts work too)
 2. Files are automatically converted upon loading
+   (the status bar shows progress; "Cancel" stops a long conversion)
+   With "Convert on demand" on, files are listed at once and
+   converted in the background, the selected file first
 3. Click on files in the sidebar to view their output
+   (recently viewed files come back instantly, where you left them)
 4. Review the converted Renpy script in the Output tab
+   (a file still converting is shown as it is parsed; Save and
+   Copy are available once it is done). Click a line to highlight
+   the lines its document paragraph produced; the status bar
+   shows the paragraph number
 5. Use "💾 Save Current" or "💾 Save All" to export
 
 
@@ -57,11 +66,13 @@ Menu System:
 • Multiple file batch processing
 • Character definitions with hex colors
 • Text styling (bold, italic, underline, colors)
+• Markdown drafts: **bold**, *italic* and ~~strike~~ are styled too
 • Interactive menu system with choices
 • Label markers for scene navigation
 • Comment preservation
 • Character name color styling
 • Preview before saving
+• Search speakers, labels, jumps and words across all loaded files
 
 
 💡 PRO TIPS
@@ -84,6 +95,9 @@ Menu System:
 • Check for special characters that may need escaping
 • Verify menu options have proper formatting
 • Test output in Renpy before full conversion
+• Slow conversion? Pick "cProfile" or "Sampling" in the Performance
+  tab, open the file again and share the saved profile files; they
+  name functions only, not your script's text
 """
     
     def __init__(self, parent):
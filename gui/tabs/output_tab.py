@@ -1,16 +1,21 @@
-
 """
 Output display tab
 """
 
+from collections import OrderedDict
+
 import customtkinter as ctk
-from gui.utils.constants import COLORS
+from gui.utils.constants import (
+    COLORS, SEARCH_HIT_COLOR, SOURCE_BLOCK_COLOR, OUTPUT_VIEW_CACHE_CHARS, OUTPUT_VIEW_CACHE_FILES
+)
+from gui.utils.syntax_highlighter import SyntaxHighlighter
+from renpy_doc_convert.sourcemap import NO_SOURCE, line_patches
 
 
-class OutputTab:
-    """Output text display tab"""
+class OutputView:
+    """One text widget of the output tab, with its highlighting and source map"""
     
-    def __init__(self, parent):
+    def __init__(self, parent, on_cursor_moved):
         self.text_widget = ctk.CTkTextbox(
             parent,
             font=ctk.CTkFont(family="Consolas", size=13),
@@ -18,18 +23,222 @@ class OutputTab:
             border_width=1,
             border_color=COLORS['border']
         )
-        self.text_widget.pack(fill="both", expand=True, padx=15, pady=15)
+        self.highlighter = SyntaxHighlighter(self.text_widget)
+        self.apply_colors()
+        self.text_widget.tag_lower("source_block")
+        self.text_widget.bind("<ButtonRelease-1>", on_cursor_moved, add=True)
+        self.text_widget.bind("<KeyRelease>", on_cursor_moved, add=True)
+        
+        # SourceMap of the content, None if it has none (e.g. a preview)
+        self.source_map = None
+        # Script last put in the widget, to tell whether it is still current
+        self.content = ""
+    
+    def apply_colors(self):
+        """Set highlight colours for the current appearance mode"""
+        self.highlighter.apply_colors()
+        self.text_widget.tag_config(
+            "search_hit",
+            background=self.text_widget._apply_appearance_mode(SEARCH_HIT_COLOR)
+        )
+        self.text_widget.tag_config(
+            "source_block",
+            background=self.text_widget._apply_appearance_mode(SOURCE_BLOCK_COLOR)
+        )
     
-    def set_content(self, content):
-        """Set the text content"""
+    def shows(self, content):
+        """True if the widget holds content, unedited"""
+        if self.text_widget.edit_modified():
+            return False
+        return self.content is content or self.content == content
+    
+    def set_content(self, content, source_map=None):
         self.text_widget.delete("1.0", "end")
         self.text_widget.insert("1.0", content)
+        self.text_widget.edit_modified(False)
+        self.source_map = source_map
+        self.content = content
+        self.highlighter.reset()
+    
+    def patch_content(self, content, source_map=None):
+        """
+        Replace the content, rewriting only the lines that changed
+        
+        The scroll position is kept and lines outside the changed ranges
+        keep their highlighting. With the source maps of the old and new
+        content, whole paragraph blocks are compared. An edited widget is
+        refilled instead.
+        """
+        if self.text_widget.edit_modified():
+            self.set_content(content, source_map)
+            return
+        patches = line_patches(self.content, content, self.source_map, source_map)
+        self.source_map = source_map
+        self.content = content
+        if not patches:
+            return
+        
+        top = self.text_widget.yview()[0]
+        self.text_widget.tag_remove("source_block", "1.0", "end")
+        for patch in reversed(patches):
+            start = f"{patch.start + 1}.0"
+            self.text_widget.delete(start, f"{patch.end + 1}.0")
+            self.text_widget.insert(start, patch.text)
+        self.text_widget.edit_modified(False)
+        self.text_widget.yview_moveto(top)
+        self.highlighter.invalidate_from(patches[0].start + 1)
+    
+    def append_content(self, content):
+        self.text_widget.insert("end-1c", content)
+        self.text_widget.edit_modified(False)
+        self.content += content
+    
+    def destroy(self):
+        self.text_widget.destroy()
+
+
+class OutputTab:
+    """
+    Output text display tab
+    
+    Each recently viewed file keeps its own text widget, so switching back
+    to it only swaps widgets: the text, scroll position, cursor and
+    highlighting are already there. The least recently viewed widgets are
+    dropped beyond OUTPUT_VIEW_CACHE_FILES files or OUTPUT_VIEW_CACHE_CHARS
+    characters. Previews and other content not tied to a file share one
+    scratch widget.
+    """
+    
+    def __init__(self, parent, on_source_selected=None):
+        """
+        Args:
+            parent: Tab frame
+            on_source_selected: Optional callback(line_number, paragraph_index)
+                when the cursor moves to a line with a known source paragraph
+        """
+        self.parent = parent
+        self.on_source_selected = on_source_selected
+        # File path -> its OutputView, least recently shown first
+        self._file_views = OrderedDict()
+        self._scratch = None
+        self.view = None
+        self._show_view(self._scratch_view())
+    
+    @property
+    def text_widget(self):
+        """Text widget on screen"""
+        return self.view.text_widget
+    
+    @property
+    def highlighter(self):
+        return self.view.highlighter
+    
+    @property
+    def source_map(self):
+        """SourceMap of the content on screen, None if it has none"""
+        return self.view.source_map
+    
+    def _new_view(self):
+        return OutputView(self.parent, self._on_cursor_moved)
+    
+    def _scratch_view(self):
+        if self._scratch is None:
+            self._scratch = self._new_view()
+        return self._scratch
+    
+    def _show_view(self, view):
+        if view is self.view:
+            return
+        if self.view is not None:
+            self.view.text_widget.pack_forget()
+        view.text_widget.pack(fill="both", expand=True, padx=15, pady=15)
+        self.view = view
+    
+    def _evict(self):
+        """Drop the least recently shown file views beyond the cache limits"""
+        total_chars = sum(len(view.content) for view in self._file_views.values())
+        while len(self._file_views) > 1 and (
+            len(self._file_views) > OUTPUT_VIEW_CACHE_FILES or total_chars > OUTPUT_VIEW_CACHE_CHARS
+        ):
+            filepath, view = next(iter(self._file_views.items()))
+            if view is self.view:
+                break
+            del self._file_views[filepath]
+            total_chars -= len(view.content)
+            view.destroy()
+    
+    def show_file(self, filepath, content, source_map=None, patch=False):
+        """
+        Show a file's script and the SourceMap it was rendered with
+        
+        A file viewed recently comes back as it was left; if its script
+        changed since, only the changed lines are rewritten. With patch, a
+        file not cached takes over the widget on screen (e.g. its preview)
+        and rewrites only the lines that differ from it.
+        """
+        view = self._file_views.get(filepath)
+        if view is not None:
+            self._file_views.move_to_end(filepath)
+            if not view.shows(content):
+                view.patch_content(content, source_map)
+            view.source_map = source_map
+        elif patch and self.view is self._scratch:
+            view = self._scratch
+            self._scratch = None
+            view.patch_content(content, source_map)
+            self._file_views[filepath] = view
+        else:
+            view = self._new_view()
+            view.set_content(content, source_map)
+            self._file_views[filepath] = view
+        self._show_view(view)
+        self._evict()
+    
+    def set_content(self, content, source_map=None):
+        """Show content not tied to a file (e.g. a preview) in the scratch widget"""
+        self._show_view(self._scratch_view())
+        self.view.set_content(content, source_map)
+    
+    def append_content(self, content):
+        """Add text at the end, keeping the scroll position"""
+        self.view.append_content(content)
     
     def get_content(self):
         """Get the text content"""
         return self.text_widget.get("1.0", "end-1c")
     
-    def clear(self):
-        """Clear the text content"""
-        self.text_widget.delete("1.0", "end")
-
+    def clear(self, forget_files=False):
+        """Show an empty widget; with forget_files, also drop every cached file view"""
+        self.set_content("")
+        if forget_files:
+            for view in self._file_views.values():
+                view.destroy()
+            self._file_views.clear()
+    
+    def refresh_colors(self):
+        """Re-apply highlight colours after an appearance mode change"""
+        for view in list(self._file_views.values()) + [self._scratch]:
+            if view is not None:
+                view.apply_colors()
+    
+    def _on_cursor_moved(self, event=None):
+        """Highlight the lines written by the paragraph the cursor's line came from"""
+        self.text_widget.tag_remove("source_block", "1.0", "end")
+        if self.source_map is None:
+            return
+        line = int(self.text_widget.index("insert").split(".")[0]) - 1
+        lines = self.source_map.lines_from(line)
+        if lines is None:
+            return
+        self.text_widget.tag_add("source_block", f"{lines[0] + 1}.0", f"{lines[1] + 1}.0")
+        paragraph = self.source_map.source_at(line)
+        if self.on_source_selected is not None and paragraph != NO_SOURCE:
+            self.on_source_selected(line + 1, paragraph)
+    
+    def show_line(self, line_number):
+        """Scroll to a line, place the cursor on it and highlight it"""
+        start = f"{line_number}.0"
+        self.text_widget.tag_remove("search_hit", "1.0", "end")
+        self.text_widget.tag_add("search_hit", start, f"{line_number}.end")
+        self.text_widget.mark_set("insert", start)
+        self.text_widget.see(start)
@@ -0,0 +1,120 @@
+"""
+Conversion performance tab
+"""
+
+from pathlib import Path
+
+import customtkinter as ctk
+from gui.utils.constants import COLORS, BUTTON_HEIGHTS
+from renpy_doc_convert.profiling import PROFILE_CPROFILE, PROFILE_SAMPLE
+from renpy_doc_convert.timings import STAGES, cache_counts, total_timings
+
+# Column width of each stage's seconds
+STAGE_WIDTH = 16
+
+# Profiling menu label -> profile mode of new conversions
+PROFILE_OPTIONS = {
+    "Profiling off": None,
+    "cProfile": PROFILE_CPROFILE,
+    "Sampling": PROFILE_SAMPLE,
+}
+
+
+def format_timings_row(name, timings, cache):
+    """One ConversionTimings as a table row"""
+    row = f"{name[:27]:<28}{timings.total_seconds:>9.3f}"
+    for stage in STAGES:
+        seconds = timings.stages.get(stage)
+        row += f"{seconds:>{STAGE_WIDTH}.3f}" if seconds is not None else f"{'-':>{STAGE_WIDTH}}"
+    row += (
+        f"{timings.paragraphs:>12}{timings.runs:>10}{timings.chunks:>10}"
+        f"{timings.output_bytes / 1024:>12.1f}  {cache}"
+    )
+    return row
+
+
+def format_timings(timings_list):
+    """Render the timings of every converted file, slowest first, with totals"""
+    header = f"{'File':<28}{'Total s':>9}"
+    header += "".join(f"{stage:>{STAGE_WIDTH}}" for stage in STAGES)
+    header += f"{'Paragraphs':>12}{'Runs':>10}{'Chunks':>10}{'Output KB':>12}  Cache"
+    lines = [header, "━" * len(header)]
+    for timings in sorted(timings_list, key=lambda t: -t.total_seconds):
+        lines.append(format_timings_row(Path(timings.source).name, timings, timings.cache))
+    
+    counts = cache_counts(timings_list)
+    hits = ", ".join(f"{count} {kind}" for kind, count in counts.items())
+    lines += [
+        "━" * len(header),
+        format_timings_row(f"All {len(timings_list)} file(s)", total_timings(timings_list), hits),
+    ]
+    return "\n".join(lines) + "\n"
+
+
+def format_profiles(profiles):
+    """List the profile files saved for each document"""
+    lines = ["Saved profiles (function names only, safe to share):"]
+    for filepath, paths in profiles.items():
+        lines.append(f"  {Path(filepath).name}")
+        lines += [f"    {path}" for path in paths]
+    return "\n".join(lines) + "\n"
+
+
+class PerformanceTab:
+    """Time each stage took for the files converted this session"""
+    
+    def __init__(self, parent, callbacks):
+        self.callbacks = callbacks
+        
+        button_frame = ctk.CTkFrame(parent, fg_color="transparent")
+        button_frame.pack(fill="x", padx=15, pady=(15, 5))
+        
+        ctk.CTkButton(
+            button_frame,
+            text="⬇  Export JSON",
+            command=lambda: self.callbacks['export_performance'](),
+            width=140,
+            height=BUTTON_HEIGHTS['small'],
+            corner_radius=8,
+            font=ctk.CTkFont(size=13)
+        ).pack(side="left", padx=(0, 8))
+        
+        self.profile_menu = ctk.CTkOptionMenu(
+            button_frame,
+            values=list(PROFILE_OPTIONS),
+            command=lambda label: self.callbacks['set_profile_mode'](PROFILE_OPTIONS[label]),
+            width=150,
+            height=BUTTON_HEIGHTS['small'],
+            corner_radius=8,
+            font=ctk.CTkFont(size=13)
+        )
+        self.profile_menu.pack(side="right")
+        
+        self.text_widget = ctk.CTkTextbox(
+            parent,
+            font=ctk.CTkFont(family="Consolas", size=13),
+            wrap="none",
+            border_width=1,
+            border_color=COLORS['border']
+        )
+        self.text_widget.pack(fill="both", expand=True, padx=15, pady=(5, 15))
+        self.text_widget.configure(state="disabled")
+    
+    def set_profile_mode(self, mode):
+        """Show the profile mode without calling back"""
+        label = next(label for label, value in PROFILE_OPTIONS.items() if value == mode)
+        self.profile_menu.set(label)
+    
+    def show(self, timings_list, profiles=None):
+        """Show the timings of each converted file and their totals, then saved profiles"""
+        if timings_list:
+            text = format_timings(timings_list)
+        else:
+            text = "No timings yet - files converted this session are listed here."
+        if profiles:
+            text += "\n" + format_profiles(profiles)
+        
+        self.text_widget.configure(state="normal")
+        self.text_widget.delete("1.0", "end")
+        self.text_widget.insert("1.0", text)
+        self.text_widget.configure(state="disabled")
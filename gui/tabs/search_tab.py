@@ -0,0 +1,94 @@
+"""
+Cross-file search tab
+"""
+
+import time
+from pathlib import Path
+
+import customtkinter as ctk
+from gui.utils.constants import COLORS, BUTTON_HEIGHTS
+
+
+class SearchTab:
+    """Search every loaded script and jump to matching lines"""
+    
+    PLACEHOLDER = "Search words, speaker:E, label:intro, jump:intro, prefix*"
+    
+    def __init__(self, parent, callbacks):
+        self.callbacks = callbacks
+        self.results = []
+        
+        search_frame = ctk.CTkFrame(parent, fg_color="transparent")
+        search_frame.pack(fill="x", padx=15, pady=(15, 5))
+        
+        self.query_entry = ctk.CTkEntry(
+            search_frame,
+            placeholder_text=self.PLACEHOLDER,
+            height=BUTTON_HEIGHTS['small'],
+            font=ctk.CTkFont(size=13)
+        )
+        self.query_entry.pack(side="left", fill="x", expand=True, padx=(0, 8))
+        self.query_entry.bind("<Return>", lambda event: self.run_search())
+        
+        ctk.CTkButton(
+            search_frame,
+            text="🔎  Search",
+            command=self.run_search,
+            width=110,
+            height=BUTTON_HEIGHTS['small'],
+            corner_radius=8,
+            font=ctk.CTkFont(size=13, weight="bold")
+        ).pack(side="right")
+        
+        self.summary_label = ctk.CTkLabel(
+            parent,
+            text="",
+            font=ctk.CTkFont(size=12),
+            text_color=("gray40", "gray60"),
+            anchor="w"
+        )
+        self.summary_label.pack(fill="x", padx=20)
+        
+        self.results_widget = ctk.CTkTextbox(
+            parent,
+            font=ctk.CTkFont(family="Consolas", size=12),
+            wrap="none",
+            border_width=1,
+            border_color=COLORS['border'],
+            cursor="hand2"
+        )
+        self.results_widget.pack(fill="both", expand=True, padx=15, pady=(5, 15))
+        self.results_widget.tag_config("file", foreground="#1f6aa5")
+        self.results_widget.bind("<Button-1>", self._on_result_click)
+        self.results_widget.configure(state="disabled")
+    
+    def run_search(self):
+        """Run the query in the entry and list the results"""
+        query = self.query_entry.get().strip()
+        
+        started = time.perf_counter()
+        self.results = self.callbacks['search'](query) if query else []
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        
+        self.results_widget.configure(state="normal")
+        self.results_widget.delete("1.0", "end")
+        for result in self.results:
+            location = f"{Path(result.filepath).name}:{result.line_number}"
+            self.results_widget.insert("end", location, "file")
+            self.results_widget.insert("end", f"  {result.line_text.strip()}\n")
+        self.results_widget.configure(state="disabled")
+        
+        if query:
+            self.summary_label.configure(
+                text=f"{len(self.results)} result(s) in {elapsed_ms:.1f} ms"
+            )
+        else:
+            self.summary_label.configure(text="")
+    
+    def _on_result_click(self, event):
+        """Open the result under the mouse pointer"""
+        index = self.results_widget.index(f"@{event.x},{event.y}")
+        row = int(index.split(".")[0]) - 1
+        if 0 <= row < len(self.results):
+            result = self.results[row]
+            self.callbacks['open_search_result'](result.filepath, result.line_number)
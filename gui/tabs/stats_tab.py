@@ -0,0 +1,85 @@
+"""
+Script statistics tab
+"""
+
+from pathlib import Path
+
+import customtkinter as ctk
+from gui.utils.constants import COLORS, BUTTON_HEIGHTS
+from renpy_doc_convert.analytics import NARRATION_KEY
+
+
+def format_duration(seconds):
+    """Format seconds as m:ss"""
+    minutes, seconds = divmod(int(round(seconds)), 60)
+    return f"{minutes}:{seconds:02d}"
+
+
+def format_stats(title, stats):
+    """Render one ScriptStats as a plain-text table"""
+    lines = [
+        title,
+        "━" * 60,
+        f"Lines: {stats.total_lines}    Words: {stats.total_words}    "
+        f"Menus: {stats.menus}    Choices: {stats.choices}    "
+        f"Voice-over: {format_duration(stats.voice_over_seconds())}",
+        "",
+        f"{'Character':<24}{'Lines':>8}{'Words':>10}{'VO length':>12}",
+    ]
+    characters = sorted(stats.lines_per_character, key=lambda name: -stats.words_per_character[name])
+    for name in characters:
+        vo = "" if name == NARRATION_KEY else format_duration(stats.voice_over_seconds(name))
+        lines.append(
+            f"{name[:23]:<24}{stats.lines_per_character[name]:>8}"
+            f"{stats.words_per_character[name]:>10}{vo:>12}"
+        )
+    lines += ["", f"{'Label':<24}{'Lines':>8}{'Words':>10}"]
+    for label, count in stats.lines_per_label.items():
+        lines.append(f"{label[:23]:<24}{count:>8}{stats.words_per_label[label]:>10}")
+    return "\n".join(lines) + "\n\n\n"
+
+
+class StatsTab:
+    """Line, word, menu and voice-over statistics of the loaded scripts"""
+    
+    def __init__(self, parent, callbacks):
+        self.callbacks = callbacks
+        
+        button_frame = ctk.CTkFrame(parent, fg_color="transparent")
+        button_frame.pack(fill="x", padx=15, pady=(15, 5))
+        
+        for text, extension in (("⬇  Export JSON", ".json"), ("⬇  Export CSV", ".csv")):
+            ctk.CTkButton(
+                button_frame,
+                text=text,
+                command=lambda ext=extension: self.callbacks['export_stats'](ext),
+                width=140,
+                height=BUTTON_HEIGHTS['small'],
+                corner_radius=8,
+                font=ctk.CTkFont(size=13)
+            ).pack(side="left", padx=(0, 8))
+        
+        self.text_widget = ctk.CTkTextbox(
+            parent,
+            font=ctk.CTkFont(family="Consolas", size=13),
+            wrap="none",
+            border_width=1,
+            border_color=COLORS['border']
+        )
+        self.text_widget.pack(fill="both", expand=True, padx=15, pady=(5, 15))
+        self.text_widget.configure(state="disabled")
+    
+    def show(self, selected_stats, total_stats, file_count):
+        """Show the selected file's statistics and the totals of all files"""
+        text = ""
+        if selected_stats is not None:
+            text += format_stats(f"📄 {Path(selected_stats.source).name}", selected_stats)
+        if total_stats is not None and file_count:
+            text += format_stats(f"📚 All {file_count} loaded file(s)", total_stats)
+        if not text:
+            text = "No statistics yet - open DOCX files to convert them."
+        
+        self.text_widget.configure(state="normal")
+        self.text_widget.delete("1.0", "end")
+        self.text_widget.insert("1.0", text)
+        self.text_widget.configure(state="disabled")
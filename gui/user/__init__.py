@@ -6,6 +6,7 @@ User-related modules (settings, theme, session)
 from .settings import Settings
 from .theme import ThemeManager
 from .session import SessionManager
+from .search_index import SearchIndex
 
-__all__ = ['Settings', 'ThemeManager', 'SessionManager']
+__all__ = ['Settings', 'ThemeManager', 'SessionManager', 'SearchIndex']
 
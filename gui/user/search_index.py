@@ -0,0 +1,186 @@
+"""
+Inverted index over converted scripts for cross-file search
+
+Scripts are indexed from their rendered text rather than from the chunks
+while they are converted: results point at output lines, and scripts
+restored from the conversion store or a previous session are never
+rendered at all.
+"""
+
+import heapq
+import re
+from collections import defaultdict
+
+_LABEL = re.compile(r'^\s*label\s+([\w.]+)\s*:')
+_JUMP = re.compile(r'^\s*(?:jump|call)\s+([\w.]+)')
+_DEFINE = re.compile(r'^\s*define\s+(\w+)\s*=')
+_BARE_SAY = re.compile(r'^\s+([A-Za-z_]\w*)\s+"')
+_QUOTED_SAY = re.compile(r'^\s+"((?:[^"\\]|\\.)*)"\s+"')
+_TEXT_TAG = re.compile(r'\{[^{}]*\}')
+_WORD = re.compile(r'\w+')
+
+# Fields that can be used in a query as field:term
+FIELDS = ('speaker', 'label', 'jump', 'word')
+
+# Maximum number of hits returned by a search
+MAX_RESULTS = 500
+
+
+class SearchResult:
+    """One matching line"""
+    
+    def __init__(self, filepath, line_number, line_text):
+        self.filepath = filepath
+        self.line_number = line_number
+        self.line_text = line_text
+
+
+def index_terms(line):
+    """
+    Get the (field, term) pairs a script line is indexed under
+    
+    Terms are lower-cased so searches are case-insensitive.
+    """
+    terms = set()
+    
+    match = _LABEL.match(line)
+    if match:
+        terms.add(('label', match.group(1).lower()))
+        return terms
+    
+    match = _JUMP.match(line)
+    if match:
+        terms.add(('jump', match.group(1).lower()))
+        return terms
+    
+    if line.lstrip().startswith('#'):
+        text = line
+    else:
+        match = _DEFINE.match(line) or _BARE_SAY.match(line) or _QUOTED_SAY.match(line)
+        if match:
+            speaker = _TEXT_TAG.sub('', match.group(1)).strip().lower()
+            if speaker:
+                terms.add(('speaker', speaker))
+            text = line[match.end():]
+        else:
+            text = line
+    
+    for word in _WORD.findall(_TEXT_TAG.sub(' ', text)):
+        terms.add(('word', word.lower()))
+    
+    return terms
+
+
+def parse_query(query):
+    """
+    Split a query into (field, term, is_prefix) triples
+    
+    Words are searched as 'word' terms; 'speaker:E', 'label:intro' and
+    'jump:intro' restrict a term to a field. A trailing '*' matches any
+    term starting with the given text.
+    """
+    parsed = []
+    for part in query.split():
+        field, sep, term = part.partition(':')
+        if not sep or field.lower() not in FIELDS:
+            field, term = 'word', part
+        term = term.lower()
+        is_prefix = term.endswith('*')
+        term = term.rstrip('*')
+        if term:
+            parsed.append((field.lower(), term, is_prefix))
+    return parsed
+
+
+class SearchIndex:
+    """
+    Maps (field, term) to the lines of every loaded script containing it
+    
+    Files are indexed in one pass over their lines when added and dropped
+    term by term when removed, so the index never needs a full rebuild.
+    """
+    
+    def __init__(self):
+        # (field, term) -> {filepath: [line numbers]}
+        self._postings = defaultdict(dict)
+        # filepath -> keys it contributed, for removal
+        self._file_keys = {}
+        # filepath -> script lines, for showing results
+        self._lines = {}
+    
+    def add_file(self, filepath, content):
+        """Index a script, replacing any previous version of the file"""
+        self.remove_file(filepath)
+        
+        lines = content.splitlines()
+        keys = set()
+        for line_number, line in enumerate(lines, start=1):
+            for key in index_terms(line):
+                self._postings[key].setdefault(filepath, []).append(line_number)
+                keys.add(key)
+        
+        self._file_keys[filepath] = keys
+        self._lines[filepath] = lines
+    
+    def remove_file(self, filepath):
+        """Drop a script from the index"""
+        for key in self._file_keys.pop(filepath, ()):
+            files = self._postings.get(key)
+            if files is not None:
+                files.pop(filepath, None)
+                if not files:
+                    del self._postings[key]
+        self._lines.pop(filepath, None)
+    
+    def clear(self):
+        """Drop every script from the index"""
+        self._postings.clear()
+        self._file_keys.clear()
+        self._lines.clear()
+    
+    def _matches(self, field, term, is_prefix):
+        """Set of (filepath, line number) matching one query term"""
+        if is_prefix:
+            keys = [key for key in self._postings if key[0] == field and key[1].startswith(term)]
+        else:
+            keys = [(field, term)] if (field, term) in self._postings else []
+        
+        hits = set()
+        for key in keys:
+            for filepath, line_numbers in self._postings[key].items():
+                hits.update((filepath, n) for n in line_numbers)
+        return hits
+    
+    def search(self, query, file_order=None, limit=MAX_RESULTS):
+        """
+        Find lines matching every term of a query
+        
+        Args:
+            query: Search text, see parse_query()
+            file_order: Optional list of filepaths to order results by
+            limit: Maximum number of results
+        
+        Returns:
+            list: SearchResult objects ordered by file then line
+        """
+        terms = parse_query(query)
+        if not terms:
+            return []
+        
+        # Intersect starting from the rarest term
+        matches = sorted((self._matches(*term) for term in terms), key=len)
+        hits = matches[0]
+        for other in matches[1:]:
+            if not hits:
+                break
+            hits = hits & other
+        
+        rank = {filepath: i for i, filepath in enumerate(file_order or [])}
+        ordered = heapq.nsmallest(
+            limit, hits, key=lambda hit: (rank.get(hit[0], len(rank)), hit[0], hit[1])
+        )
+        
+        return [
+            SearchResult(filepath, line_number, self._lines[filepath][line_number - 1])
+            for filepath, line_number in ordered
+        ]
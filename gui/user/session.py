@@ -4,6 +4,8 @@ Session and document state management
 
 from pathlib import Path
 
+from .search_index import SearchIndex
+
 
 class SessionManager:
     """Manages the current session state"""
@@ -11,13 +13,17 @@ class SessionManager:
     def __init__(self):
         self.current_files = []
         self.output_contents = {}
+        # filepath -> error of its last conversion, for files that failed to convert
+        self.conversion_errors = {}
         self.selected_file_index = None
+        self.search_index = SearchIndex()
     
     def add_file(self, filepath, content):
         """Add a file to the session"""
         if filepath not in self.current_files:
             self.current_files.append(filepath)
             self.output_contents[filepath] = content
+            self.search_index.add_file(filepath, content)
             return True
         return False
     
@@ -27,6 +33,8 @@ class SessionManager:
             self.current_files.remove(filepath)
             if filepath in self.output_contents:
                 del self.output_contents[filepath]
+            self.conversion_errors.pop(filepath, None)
+            self.search_index.remove_file(filepath)
             
             # Adjust selected index if needed
             if self.selected_file_index is not None:
@@ -60,7 +68,9 @@ class SessionManager:
         """Clear all session data"""
         self.current_files = []
         self.output_contents = {}
+        self.conversion_errors = {}
         self.selected_file_index = None
+        self.search_index.clear()
     
     def has_files(self):
         """Check if any files are loaded"""
@@ -78,4 +88,31 @@ class SessionManager:
         return None
     def has_file(self, filepath):
         """Check if file is already loaded"""
-        return filepath in self.current_files
\ No newline at end of file
+        return filepath in self.current_files
+    
+    def set_content(self, filepath, content):
+        """Replace the output of a loaded file"""
+        if filepath in self.current_files:
+            self.output_contents[filepath] = content
+            self.conversion_errors.pop(filepath, None)
+            self.search_index.add_file(filepath, content)
+    
+    def set_error(self, filepath, error):
+        """Record that a loaded file failed to convert"""
+        if filepath in self.current_files:
+            self.conversion_errors[filepath] = error
+    
+    def get_error(self, filepath):
+        """Get the error of a file that failed to convert, or None"""
+        return self.conversion_errors.get(filepath)
+    
+    def search(self, query):
+        """Search every loaded script, results ordered like the file list"""
+        return self.search_index.search(query, file_order=self.current_files)
+    
+    def get_state(self):
+        """Get the file list and selection for persisting between launches"""
+        return {
+            'session_files': list(self.current_files),
+            'session_selected': self.selected_file_index,
+        }
@@ -1,12 +1,20 @@
-
 """
 User settings management
 """
 
+import atexit
+import copy
 import json
 import os
+import threading
+from contextlib import contextmanager
 from pathlib import Path
 
+from renpy_doc_convert.fileio import atomic_write_text
+
+# Seconds to wait after the last change before writing settings.json
+SAVE_DEBOUNCE_SECONDS = 0.5
+
 
 class Settings:
     """Manages user settings and preferences"""
@@ -15,6 +23,13 @@ class Settings:
         self.config_dir = Path.home() / ".docx_to_renpy"
         self.config_file = self.config_dir / "settings.json"
         self.settings = self.load_settings()
+        
+        self._lock = threading.RLock()
+        self._dirty = False
+        self._save_timer = None
+        self._transaction_depth = 0
+        
+        atexit.register(self.flush)
     
     def load_settings(self):
         """Load settings from config file"""
@@ -23,6 +38,10 @@ class Settings:
             'last_directory': str(Path.home()),
             'window_size': '1300x800',
             'recent_files': [],
+            'session_files': [],
+            'session_selected': None,
+            'lazy_conversion': True,
+            'profile_mode': None,
         }
         
         if self.config_file.exists():
@@ -30,19 +49,33 @@ class Settings:
                 with open(self.config_file, 'r') as f:
                     loaded = json.load(f)
                     default_settings.update(loaded)
-            except Exception:
-                pass
+            except Exception as e:
+                # Keep the unreadable file around instead of overwriting it
+                print(f"Could not load settings: {e}")
+                try:
+                    os.replace(self.config_file, self.config_file.with_suffix(".json.bad"))
+                except OSError:
+                    pass
         
         return default_settings
     
     def save_settings(self):
-        """Save settings to config file"""
-        try:
-            self.config_dir.mkdir(exist_ok=True)
-            with open(self.config_file, 'w') as f:
-                json.dump(self.settings, f, indent=2)
-        except Exception:
-            pass
+        """Save settings to config file immediately"""
+        with self._lock:
+            self._cancel_pending_save()
+            self._dirty = False
+            try:
+                self.config_dir.mkdir(exist_ok=True)
+                atomic_write_text(str(self.config_file), json.dumps(self.settings, indent=2))
+            except Exception:
+                pass
+    
+    def flush(self):
+        """Write pending changes now, if there are any"""
+        with self._lock:
+            if not self._dirty:
+                return
+        self.save_settings()
     
     def get(self, key, default=None):
         """Get a setting value"""
@@ -50,15 +83,65 @@ class Settings:
     
     def set(self, key, value):
         """Set a setting value"""
-        self.settings[key] = value
-        self.save_settings()
+        with self._lock:
+            self.settings[key] = value
+            self._mark_dirty()
+    
+    def update(self, values):
+        """Set several setting values at once"""
+        with self._lock:
+            self.settings.update(values)
+            self._mark_dirty()
+    
+    @contextmanager
+    def transaction(self):
+        """
+        Group several changes into one save
+        
+        Changes made inside the block are written together once it exits.
+        If the block raises, every change made inside it is rolled back.
+        """
+        with self._lock:
+            snapshot = copy.deepcopy(self.settings)
+            was_dirty = self._dirty
+            self._transaction_depth += 1
+        try:
+            yield self
+        except BaseException:
+            with self._lock:
+                self.settings = snapshot
+                self._dirty = was_dirty
+            raise
+        finally:
+            with self._lock:
+                self._transaction_depth -= 1
+                if self._transaction_depth == 0 and self._dirty:
+                    self._schedule_save()
     
     def add_recent_file(self, filepath):
         """Add a file to recent files list"""
-        recent = self.settings.get('recent_files', [])
+        recent = list(self.settings.get('recent_files', []))
         if filepath in recent:
             recent.remove(filepath)
         recent.insert(0, filepath)
         recent = recent[:10]  # Keep only last 10
         self.set('recent_files', recent)
-
+    
+    def _mark_dirty(self):
+        """Record a change and (re)start the debounce timer"""
+        self._dirty = True
+        if self._transaction_depth == 0:
+            self._schedule_save()
+    
+    def _schedule_save(self):
+        """Restart the debounce timer"""
+        self._cancel_pending_save()
+        self._save_timer = threading.Timer(SAVE_DEBOUNCE_SECONDS, self.flush)
+        self._save_timer.daemon = True
+        self._save_timer.start()
+    
+    def _cancel_pending_save(self):
+        """Stop the debounce timer if it is running"""
+        if self._save_timer is not None:
+            self._save_timer.cancel()
+            self._save_timer = None
@@ -4,5 +4,6 @@ Utility modules for the GUI
 
 from .constants import *
 from .file_handler import FileHandler
+from .conversion_queue import ConversionQueue
 
-__all__ = ['FileHandler']
\ No newline at end of file
+__all__ = ['FileHandler', 'ConversionQueue']
\ No newline at end of file
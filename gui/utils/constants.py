@@ -8,6 +8,12 @@ WINDOW_TITLE_PREFIX = "Docx to Renpy Converter"
 DEFAULT_WINDOW_SIZE = "1300x800"
 MIN_WINDOW_SIZE = (1100, 700)
 
+# How often work finished on background threads is applied to the UI (ms)
+UI_POLL_INTERVAL_MS = 50
+
+# Files on each side of the selected one converted ahead in on-demand mode
+PREFETCH_NEIGHBORS = 2
+
 # Sidebar Configuration
 SIDEBAR_WIDTH = 320
 
@@ -40,6 +46,31 @@ STATUS_COLORS = {
     'viewing': ("#1f6aa5", "#1f6aa5"),
 }
 
+# Syntax highlighting colours for the output preview (light, dark)
+SYNTAX_COLORS = {
+    'keyword': ("#0033b3", "#569cd6"),
+    'label': ("#795e26", "#dcdcaa"),
+    'speaker': ("#871094", "#c586c0"),
+    'string': ("#067d17", "#ce9178"),
+    'text_tag': ("#0e7490", "#4ec9b0"),
+    'comment': ("#8c8c8c", "#6a9955"),
+}
+
+# Background of the line a search result jumped to (light, dark)
+SEARCH_HIT_COLOR = ("#fff3b0", "#4b4400")
+
+# Background of the lines written by the same paragraph as the clicked line (light, dark)
+SOURCE_BLOCK_COLOR = ("#e8f0fe", "#263445")
+
+# Lines tokenized per idle callback, and size of the per-line token cache
+HIGHLIGHT_SLICE_LINES = 150
+HIGHLIGHT_CACHE_LINES = 20000
+
+# Recently viewed files whose output widget is kept for instant switching,
+# and the most characters those widgets may hold between them
+OUTPUT_VIEW_CACHE_FILES = 6
+OUTPUT_VIEW_CACHE_CHARS = 8_000_000
+
 # Button Sizes
 BUTTON_HEIGHTS = {
     'primary': 48,
@@ -49,7 +80,12 @@ BUTTON_HEIGHTS = {
 }
 
 # File Types
-SUPPORTED_FILE_TYPES = [("Word Documents", "*.docx"), ("All Files", "*.*")]
+SUPPORTED_FILE_TYPES = [
+    ("Scripts", "*.docx *.txt *.md *.markdown"),
+    ("Word Documents", "*.docx"),
+    ("Text and Markdown Drafts", "*.txt *.md *.markdown"),
+    ("All Files", "*.*")
+]
 RENPY_FILE_TYPES = [("Renpy Script", "*.rpy"), ("All Files", "*.*")]
 
 # URLs
@@ -0,0 +1,130 @@
+"""
+Background conversion of loaded files in priority order
+"""
+
+import heapq
+import itertools
+import threading
+
+from renpy_doc_convert.progress import CancellationToken, ConversionCancelled
+
+# Lower numbers are converted first
+PRIORITY_SELECTED = 0
+PRIORITY_NEIGHBOR = 1
+PRIORITY_BACKGROUND = 2
+
+
+class _Job:
+    """The conversion the worker thread is running"""
+    
+    def __init__(self, filepath, priority, order):
+        self.filepath = filepath
+        self.priority = priority
+        self.order = order
+        self.token = CancellationToken()
+        self.dropped = False
+
+
+class ConversionQueue:
+    """
+    Converts files one at a time on a worker thread, most urgent first
+    
+    Requesting a file again with a more urgent priority moves it up the
+    queue. A request for the selected file pre-empts a less urgent
+    conversion in progress, which is cancelled and queued again.
+    """
+    
+    def __init__(self, convert, on_done):
+        """
+        Args:
+            convert: convert(filepath, cancel_token) -> (success, content, error);
+                may raise ConversionCancelled
+            on_done: on_done(filepath, success, content, error), called on the
+                worker thread
+        """
+        self._convert = convert
+        self._on_done = on_done
+        self._condition = threading.Condition()
+        self._heap = []
+        self._priorities = {}
+        self._order = itertools.count()
+        self._running = None
+        self._thread = None
+    
+    def request(self, filepath, priority=PRIORITY_BACKGROUND):
+        """Queue a file, or move it up if it is already queued less urgently"""
+        with self._condition:
+            running = self._running
+            if running is not None and running.filepath == filepath:
+                running.priority = min(running.priority, priority)
+                return
+            
+            current = self._priorities.get(filepath)
+            if current is not None and current <= priority:
+                return
+            
+            self._priorities[filepath] = priority
+            heapq.heappush(self._heap, (priority, next(self._order), filepath))
+            
+            if (running is not None and priority == PRIORITY_SELECTED
+                    and running.priority > PRIORITY_SELECTED):
+                running.token.cancel()
+            
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+            self._condition.notify()
+    
+    def clear(self):
+        """Forget every queued file and cancel the conversion in progress"""
+        with self._condition:
+            self._heap = []
+            self._priorities = {}
+            if self._running is not None:
+                self._running.dropped = True
+                self._running.token.cancel()
+    
+    def pending_count(self):
+        """Number of files queued or being converted"""
+        with self._condition:
+            return len(self._priorities) + (1 if self._running is not None else 0)
+    
+    def _next_job(self):
+        """Pop the most urgent queued file, skipping superseded heap entries"""
+        while self._heap:
+            priority, order, filepath = heapq.heappop(self._heap)
+            if self._priorities.get(filepath) == priority:
+                del self._priorities[filepath]
+                return _Job(filepath, priority, order)
+        return None
+    
+    def _run(self):
+        while True:
+            with self._condition:
+                job = self._next_job()
+                while job is None:
+                    self._condition.wait()
+                    job = self._next_job()
+                self._running = job
+            
+            try:
+                success, content, error = self._convert(job.filepath, job.token)
+            except ConversionCancelled:
+                with self._condition:
+                    self._running = None
+                    if not job.dropped:
+                        self._requeue(job)
+                continue
+            
+            with self._condition:
+                self._running = None
+                if job.dropped:
+                    continue
+            self._on_done(job.filepath, success, content, error)
+    
+    def _requeue(self, job):
+        """Put a pre-empted job back in its old place, unless it was requested again meanwhile"""
+        current = self._priorities.get(job.filepath)
+        if current is None or job.priority < current:
+            self._priorities[job.filepath] = job.priority
+            heapq.heappush(self._heap, (job.priority, job.order, job.filepath))
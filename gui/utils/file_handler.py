@@ -4,34 +4,111 @@ File handling operations for the application
 """
 
 import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from tkinter import messagebox
+from renpy_doc_convert.analytics import ScriptStats
 from renpy_doc_convert.api import convert
+from renpy_doc_convert.fileio import atomic_write_text, write_text_if_changed
+from renpy_doc_convert.profiling import ConversionProfiler, profile_prefix
+from renpy_doc_convert.progress import ConversionCancelled
+from renpy_doc_convert.sourcemap import SourceMap
+from renpy_doc_convert.store import ConversionStore
+from renpy_doc_convert.timings import CACHE_OUTPUT, STAGE_LOOKUP, ConversionTimings
+
+SAVE_WORKERS = 8
+
+# Where profiled conversions write their .pstats and collapsed stacks
+PROFILE_DIR = Path.home() / ".docx_to_renpy" / "profiles"
 
 
 class FileHandler:
     """Handles file operations for document conversion"""
     
+    def __init__(self, store=None):
+        self.store = store if store is not None else ConversionStore()
+        self._stats_cache = {}
+        self._source_map_cache = {}
+        # Path -> ConversionTimings of its last conversion this session
+        self.timings = {}
+        # Profile mode (profiling.PROFILE_MODES) of new conversions, None for off
+        self.profile_mode = None
+        # Path -> files written by its last profiled conversion
+        self.profiles = {}
+    
     @staticmethod
-    def convert_docx_to_renpy(docx_file_path):
+    def _temp_output_path(docx_file_path):
+        """Temporary .rpy path used while converting a document"""
+        return os.path.join(
+            os.path.dirname(docx_file_path),
+            f"temp_renpy_{Path(docx_file_path).stem}"
+        )
+    
+    def _output_label(self, docx_file_path):
+        """Label the converter derives from the temporary output name"""
+        return os.path.basename(self._temp_output_path(docx_file_path))
+    
+    def convert_docx_to_renpy(self, docx_file_path, on_progress=None, cancel_token=None,
+                              on_preview=None):
         """
         Convert a single DOCX file to Renpy format
         
+        A conversion of identical document content is served from the
+        conversion store instead of being parsed again. The time each stage
+        took is kept in self.timings once the conversion succeeds.
+        
+        With a profile_mode set, stored outputs are skipped so the document
+        is really converted, and the profile is saved under PROFILE_DIR.
+        
         Args:
             docx_file_path: Path to the DOCX file
-            
+            on_progress: Optional callback(stage, done, total)
+            cancel_token: Optional CancellationToken to stop the conversion
+            on_preview: Optional callback(text, replace) streaming the script
+                while the document is parsed; not called for stored outputs
+        
         Returns:
             tuple: (success: bool, content: str or None, error: str or None)
+        
+        Raises:
+            ConversionCancelled: If cancel_token was cancelled
         """
         try:
+            label = self._output_label(docx_file_path)
+            timings = ConversionTimings(docx_file_path)
+            digest = None
+            profile_mode = self.profile_mode
+            try:
+                with timings.stage(STAGE_LOOKUP):
+                    digest = self.store.digest(docx_file_path)
+                    cached = self.store.read_output(digest, label) if profile_mode is None else None
+                if cached is not None:
+                    timings.cache = CACHE_OUTPUT
+                    timings.output_bytes = len(cached.encode("utf-8"))
+                    self.timings[docx_file_path] = timings
+                    return True, cached, None
+            except OSError:
+                pass
+            
             # Create temporary output file
-            temp_output = os.path.join(
-                os.path.dirname(docx_file_path),
-                f"temp_renpy_{Path(docx_file_path).stem}"
-            )
+            temp_output = self._temp_output_path(docx_file_path)
             
             # Convert
-            convert(docx_file_path, temp_output)
+            source_maps = {}
+            profiler = ConversionProfiler(profile_mode) if profile_mode is not None else None
+            if profiler is not None:
+                profiler.start()
+            try:
+                stats = convert(docx_file_path, temp_output, on_progress=on_progress,
+                                cancel_token=cancel_token, on_preview=on_preview,
+                                timings=timings, source_maps=source_maps)
+            finally:
+                if profiler is not None:
+                    profiler.stop()
+            stats.source = docx_file_path
+            
+            if profiler is not None:
+                self.profiles[docx_file_path] = self._write_profile(profiler, docx_file_path)
             
             # Read output
             with open(temp_output, "r", encoding="utf-8") as f:
@@ -41,12 +118,118 @@ class FileHandler:
             if os.path.exists(temp_output):
                 os.remove(temp_output)
             
-            return True, content, None
+            if digest is not None:
+                try:
+                    self.store.write_output(digest, label, content)
+                    self.store.write_stats(digest, label, stats.to_dict())
+                    self.store.write_source_map(digest, label, source_maps[temp_output].to_dict())
+                except OSError:
+                    pass
             
+            self.timings[docx_file_path] = timings
+            return True, content, None
+        
+        except ConversionCancelled:
+            raise
         except Exception as e:
             error_msg = f"Error converting {Path(docx_file_path).name}:\n{str(e)}"
             return False, None, error_msg
     
+    @staticmethod
+    def _write_profile(profiler, docx_file_path):
+        """Save a conversion's profile; returns the written paths, empty if saving failed"""
+        try:
+            PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+            return profiler.write(profile_prefix(str(PROFILE_DIR), docx_file_path))
+        except OSError:
+            return []
+    
+    def restore_cached(self, docx_file_path):
+        """
+        Get the stored output of the last conversion of a file
+        
+        Neither the document nor its digest is read, so this is fast enough
+        to run for a whole session at startup. Use needs_reconvert() to
+        check the result against the file on disk afterwards.
+        
+        Returns:
+            str or None: Cached Renpy script, or None if nothing is stored
+        """
+        entry = self.store.lookup(docx_file_path)
+        if entry is None:
+            return None
+        return self.store.read_output(entry.digest, self._output_label(docx_file_path))
+    
+    def restore_fresh(self, docx_file_path):
+        """
+        Get the stored output of a file that has not changed since
+        
+        Only the file's size and mtime are checked, so this is cheap enough
+        to call for every file the user opens.
+        
+        Returns:
+            str or None: Cached Renpy script, or None if it must be converted
+        """
+        if not self.store.is_fresh(docx_file_path):
+            return None
+        return self.restore_cached(docx_file_path)
+    
+    def get_stats(self, docx_file_path):
+        """
+        Get the script statistics recorded by the last conversion of a file
+        
+        Returns:
+            ScriptStats or None: Statistics, or None if nothing is stored
+        """
+        entry = self.store.lookup(docx_file_path)
+        if entry is None:
+            return None
+        cache_key = (docx_file_path, entry.digest)
+        if cache_key not in self._stats_cache:
+            data = self.store.read_stats(entry.digest, self._output_label(docx_file_path))
+            if data is None:
+                return None
+            stats = ScriptStats.from_dict(data)
+            stats.source = docx_file_path
+            self._stats_cache[cache_key] = stats
+        return self._stats_cache[cache_key]
+    
+    def get_source_map(self, docx_file_path):
+        """
+        Get the source map of the output of the last conversion of a file
+        
+        Returns:
+            SourceMap or None: Output lines to document paragraphs, or None
+                if nothing is stored
+        """
+        entry = self.store.lookup(docx_file_path)
+        if entry is None:
+            return None
+        cache_key = (docx_file_path, entry.digest)
+        if cache_key not in self._source_map_cache:
+            data = self.store.read_source_map(entry.digest, self._output_label(docx_file_path))
+            if data is None:
+                return None
+            self._source_map_cache[cache_key] = SourceMap.from_dict(data)
+        return self._source_map_cache[cache_key]
+    
+    def needs_reconvert(self, docx_file_path):
+        """
+        Check whether a file changed since its output was stored
+        
+        Only files whose size or mtime changed are hashed.
+        
+        Returns:
+            bool: True if the stored output is out of date
+        """
+        if self.store.is_fresh(docx_file_path):
+            return False
+        try:
+            digest = self.store.digest(docx_file_path)
+        except OSError:
+            return False
+        return self.store.read_output(digest, self._output_label(docx_file_path)) is None
+    
     @staticmethod
     def save_file(content, filepath):
         """
@@ -55,13 +238,12 @@ class FileHandler:
         Args:
             content: String content to save
             filepath: Destination file path
-            
+        
         Returns:
             tuple: (success: bool, error: str or None)
         """
         try:
-            with open(filepath, "w", encoding="utf-8") as f:
-                f.write(content)
+            atomic_write_text(filepath, content)
             return True, None
         except Exception as e:
             return False, str(e)
@@ -71,25 +253,57 @@ class FileHandler:
         """
         Save multiple files to a directory
         
+        Files whose content already matches what is on disk are skipped so
+        their mtime is left alone; the rest are written atomically on a
+        thread pool. Inputs with the same name from different folders would
+        write the same .rpy file: only the first is saved, the others are
+        reported as failed under their own path.
+        
         Args:
             output_contents: Dict mapping filepaths to content
             directory: Target directory
-            
+        
         Returns:
-            tuple: (saved_count: int, error: str or None)
+            dict: {'written': [paths], 'skipped': [paths], 'failed': {path: error}}
         """
-        try:
-            saved_count = 0
-            for filepath, content in output_contents.items():
-                if content:
-                    output_filename = os.path.join(
-                        directory,
-                        Path(filepath).stem + ".rpy"
+        summary = {'written': [], 'skipped': [], 'failed': {}}
+        
+        jobs = []
+        sources = {}
+        for filepath, content in output_contents.items():
+            if content:
+                output_filename = os.path.join(
+                    directory,
+                    Path(filepath).stem + ".rpy"
+                )
+                # Compare as the file system would, e.g. case-insensitively on Windows
+                target = os.path.normcase(os.path.abspath(output_filename))
+                if target in sources:
+                    summary['failed'][filepath] = (
+                        f"same output file {Path(output_filename).name} as {sources[target]}"
                     )
-                    with open(output_filename, "w", encoding="utf-8") as f:
-                        f.write(content)
-                    saved_count += 1
-            return saved_count, None
-        except Exception as e:
-            return 0, str(e)
-
+                    continue
+                sources[target] = filepath
+                jobs.append((output_filename, content))
+        
+        if not jobs:
+            return summary
+        
+        def save_one(job):
+            output_filename, content = job
+            try:
+                written = write_text_if_changed(output_filename, content)
+                return output_filename, written, None
+            except Exception as e:
+                return output_filename, False, str(e)
+        
+        with ThreadPoolExecutor(max_workers=min(SAVE_WORKERS, len(jobs))) as pool:
+            for output_filename, written, error in pool.map(save_one, jobs):
+                if error:
+                    summary['failed'][output_filename] = error
+                elif written:
+                    summary['written'].append(output_filename)
+                else:
+                    summary['skipped'].append(output_filename)
+        
+        return summary
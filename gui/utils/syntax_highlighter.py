@@ -0,0 +1,168 @@
+"""
+Incremental Ren'Py syntax highlighting for the output preview
+"""
+
+import re
+from collections import OrderedDict
+
+from gui.utils.constants import SYNTAX_COLORS, HIGHLIGHT_SLICE_LINES, HIGHLIGHT_CACHE_LINES
+
+_COMMENT = re.compile(r'^\s*#.*$')
+_STATEMENT = re.compile(r'^(\s*)(label|jump|call)(\s+)([\w.]+)')
+_DEFINE = re.compile(r'^(\s*)(define)(\s+)(\w+)')
+_MENU = re.compile(r'^\s*(menu)\s*:')
+_STRING = re.compile(r'"(?:[^"\\]|\\.)*"')
+_BARE_SPEAKER = re.compile(r'^(\s*)([A-Za-z_]\w*)(\s+)"')
+_TEXT_TAG = re.compile(r'(?<!\{)\{/?[a-z]+(?:=[^{}]*)?\}')
+
+
+def tokenize_line(line):
+    """
+    Split one line of Ren'Py script into highlight tokens
+    
+    Returns:
+        tuple: ((tag, start_column, end_column), ...)
+    """
+    if _COMMENT.match(line):
+        start = len(line) - len(line.lstrip())
+        return (('comment', start, len(line)),)
+    
+    tokens = []
+    
+    match = _STATEMENT.match(line) or _DEFINE.match(line)
+    if match:
+        tokens.append(('keyword', match.start(2), match.end(2)))
+        name_tag = 'speaker' if match.group(2) == 'define' else 'label'
+        tokens.append((name_tag, match.start(4), match.end(4)))
+    else:
+        match = _MENU.match(line)
+        if match:
+            tokens.append(('keyword', match.start(1), match.end(1)))
+        else:
+            match = _BARE_SPEAKER.match(line)
+            if match:
+                tokens.append(('speaker', match.start(2), match.end(2)))
+    
+    strings = list(_STRING.finditer(line))
+    for number, string in enumerate(strings):
+        # The first of two strings on a say line is the speaker name
+        is_speaker = (number == 0 and len(strings) > 1 and not tokens and
+                      line[:string.start()].strip() == "")
+        tokens.append(('speaker' if is_speaker else 'string', string.start(), string.end()))
+        for tag in _TEXT_TAG.finditer(line, string.start(), string.end()):
+            tokens.append(('text_tag', tag.start(), tag.end()))
+    
+    return tuple(tokens)
+
+
+class SyntaxHighlighter:
+    """
+    Highlights the lines of a CTkTextbox that are on screen
+    
+    Lines are tokenized only when they scroll into view, a slice at a time
+    in idle callbacks, and token lists are cached by line text so repeated
+    lines and revisited regions cost nothing.
+    """
+    
+    def __init__(self, textbox):
+        self.textbox = textbox
+        self._text = textbox._textbox
+        self._highlighted = set()
+        # Highlighted lines are flagged by number, so edits that add or
+        # remove lines shift the flags of every line below them
+        self._line_count = self._count_lines()
+        self._token_cache = OrderedDict()
+        self._job = None
+        
+        self.apply_colors()
+        # Text tags sit inside strings and must win over the string colour
+        self._text.tag_raise('text_tag')
+        
+        # Every scroll, resize and insert reports through yscrollcommand
+        self._scrollbar_set = textbox._y_scrollbar.set
+        
+        def on_view_changed(first, last):
+            self._scrollbar_set(first, last)
+            self.schedule()
+        
+        self._text.configure(yscrollcommand=on_view_changed)
+        self._text.bind("<KeyRelease>", self._on_edit, add=True)
+        self._text.bind("<<Paste>>", lambda event: self.reset(), add=True)
+    
+    def apply_colors(self):
+        """Set tag colours for the current light/dark appearance mode"""
+        for tag, color in SYNTAX_COLORS.items():
+            self._text.tag_configure(tag, foreground=self.textbox._apply_appearance_mode(color))
+    
+    def reset(self):
+        """Forget highlighted lines; call after replacing the content"""
+        self._highlighted.clear()
+        self._line_count = self._count_lines()
+        self.schedule()
+    
+    def invalidate_from(self, line_number):
+        """Forget highlighted lines from line_number on, e.g. after a patch"""
+        self._highlighted = {n for n in self._highlighted if n < line_number}
+        self._line_count = self._count_lines()
+        self.schedule()
+    
+    def schedule(self):
+        """Highlight the visible lines once Tk is idle"""
+        if self._job is None:
+            self._job = self._text.after_idle(self._highlight_slice)
+    
+    def _count_lines(self):
+        """Number of lines in the textbox"""
+        return int(self._text.index("end-1c").split(".")[0])
+    
+    def _on_edit(self, event=None):
+        """
+        Re-tokenize the line being typed on, and every line below it
+        when the edit added or removed lines
+        """
+        line_number = int(self._text.index("insert").split(".")[0])
+        if self._count_lines() != self._line_count:
+            # Enter leaves the cursor below the line it split
+            self.invalidate_from(max(1, line_number - 1))
+            return
+        self._highlighted.discard(line_number)
+        self.schedule()
+    
+    def _visible_lines(self):
+        """First and last line numbers currently on screen"""
+        first = int(self._text.index("@0,0").split(".")[0])
+        last = int(self._text.index(f"@0,{self._text.winfo_height()}").split(".")[0])
+        return first, last
+    
+    def _tokens(self, line):
+        """Tokenize a line, using the per-line cache"""
+        tokens = self._token_cache.get(line)
+        if tokens is None:
+            tokens = tokenize_line(line)
+            self._token_cache[line] = tokens
+            if len(self._token_cache) > HIGHLIGHT_CACHE_LINES:
+                self._token_cache.popitem(last=False)
+        else:
+            self._token_cache.move_to_end(line)
+        return tokens
+    
+    def _highlight_slice(self):
+        """Tag up to HIGHLIGHT_SLICE_LINES visible lines, then yield to Tk"""
+        self._job = None
+        if not self._text.winfo_exists():
+            return
+        
+        first, last = self._visible_lines()
+        pending = [n for n in range(first, last + 1) if n not in self._highlighted]
+        
+        for line_number in pending[:HIGHLIGHT_SLICE_LINES]:
+            start = f"{line_number}.0"
+            line = self._text.get(start, f"{line_number}.end")
+            for tag in SYNTAX_COLORS:
+                self._text.tag_remove(tag, start, f"{line_number}.end")
+            for tag, begin, end in self._tokens(line):
+                self._text.tag_add(tag, f"{line_number}.{begin}", f"{line_number}.{end}")
+            self._highlighted.add(line_number)
+        
+        if len(pending) > HIGHLIGHT_SLICE_LINES:
+            self._job = self._text.after(1, self._highlight_slice)
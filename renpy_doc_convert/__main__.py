@@ -0,0 +1,5 @@
+import sys
+
+from renpy_doc_convert.cli import main
+
+sys.exit(main())
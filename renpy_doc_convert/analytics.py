@@ -0,0 +1,166 @@
+#doc-to-renpy/renpy_doc_convert/analytics.py
+import csv
+import json
+import re
+from typing import Dict, Iterable, List, Optional
+
+# Average voice-over speaking rate used for length estimates
+VOICE_OVER_WORDS_PER_MINUTE = 150
+
+# Key narration lines are counted under in the per-character tables
+NARRATION_KEY = "(narration)"
+
+TEXT_TAG_REGEX = re.compile(r'\{[^{}]*\}')
+WORD_REGEX = re.compile(r"[\w']+")
+
+def count_words(rendered_text: str) -> int:
+  """Count words in rendered Ren'Py text, ignoring {text tags}"""
+  return len(WORD_REGEX.findall(TEXT_TAG_REGEX.sub(" ", rendered_text.replace("\\", ""))))
+
+def voice_over_seconds(words: int) -> float:
+  return words * 60.0 / VOICE_OVER_WORDS_PER_MINUTE
+
+class ScriptStats:
+  """
+  Statistics of one converted script, or of a batch of them once merged.
+
+  ConvertToRenpy records every line it writes, so nothing has to re-read
+  the document or the .rpy output to produce these numbers.
+  """
+
+  def __init__(self, source: str = ""):
+    self.source = source
+    self.lines_per_character: Dict[str, int] = {}
+    self.words_per_character: Dict[str, int] = {}
+    self.lines_per_label: Dict[str, int] = {}
+    self.words_per_label: Dict[str, int] = {}
+    self.menus = 0
+    self.choices = 0
+
+  def record_line(self, label: str, character: str, rendered_text: str):
+    words = count_words(rendered_text)
+    key = character if character else NARRATION_KEY
+
+    self.lines_per_character[key] = self.lines_per_character.get(key, 0) + 1
+    self.words_per_character[key] = self.words_per_character.get(key, 0) + words
+    self.lines_per_label[label] = self.lines_per_label.get(label, 0) + 1
+    self.words_per_label[label] = self.words_per_label.get(label, 0) + words
+
+  def record_menu(self, choice_count: int):
+    self.menus += 1
+    self.choices += choice_count
+
+  @property
+  def total_lines(self) -> int:
+    return sum(self.lines_per_character.values())
+
+  @property
+  def total_words(self) -> int:
+    return sum(self.words_per_character.values())
+
+  def voice_over_seconds(self, character: Optional[str] = None) -> float:
+    """Estimated voice-over length of one character, or of all spoken dialogue"""
+    if character is not None:
+      return voice_over_seconds(self.words_per_character.get(character, 0))
+    return voice_over_seconds(sum(
+      words for name, words in self.words_per_character.items() if name != NARRATION_KEY
+    ))
+
+  def merge(self, other: "ScriptStats"):
+    """Add another script's numbers to this one"""
+    for mine, theirs in ((self.lines_per_character, other.lines_per_character),
+                         (self.words_per_character, other.words_per_character),
+                         (self.lines_per_label, other.lines_per_label),
+                         (self.words_per_label, other.words_per_label)):
+      for key, value in theirs.items():
+        mine[key] = mine.get(key, 0) + value
+    self.menus += other.menus
+    self.choices += other.choices
+
+  def to_dict(self) -> dict:
+    return {
+      "source": self.source,
+      "total_lines": self.total_lines,
+      "total_words": self.total_words,
+      "menus": self.menus,
+      "choices": self.choices,
+      "voice_over_seconds": round(self.voice_over_seconds(), 1),
+      "characters": {
+        name: {
+          "lines": lines,
+          "words": self.words_per_character.get(name, 0),
+          "voice_over_seconds": round(self.voice_over_seconds(name), 1),
+        }
+        for name, lines in self.lines_per_character.items()
+      },
+      "labels": {
+        label: {"lines": lines, "words": self.words_per_label.get(label, 0)}
+        for label, lines in self.lines_per_label.items()
+      },
+    }
+
+  @classmethod
+  def from_dict(cls, data: dict) -> "ScriptStats":
+    stats = cls(data.get("source", ""))
+    for name, entry in data.get("characters", {}).items():
+      stats.lines_per_character[name] = entry["lines"]
+      stats.words_per_character[name] = entry["words"]
+    for label, entry in data.get("labels", {}).items():
+      stats.lines_per_label[label] = entry["lines"]
+      stats.words_per_label[label] = entry["words"]
+    stats.menus = data.get("menus", 0)
+    stats.choices = data.get("choices", 0)
+    return stats
+
+def aggregate(stats_list: Iterable[ScriptStats], source: str = "TOTAL") -> ScriptStats:
+  """Merge the statistics of a whole batch into one"""
+  total = ScriptStats(source)
+  for stats in stats_list:
+    total.merge(stats)
+  return total
+
+def report_dict(stats_list: List[ScriptStats]) -> dict:
+  return {
+    "files": [stats.to_dict() for stats in stats_list],
+    "total": aggregate(stats_list).to_dict(),
+  }
+
+def write_json_report(stats_list: List[ScriptStats], path: str):
+  with open(path, "w", encoding="utf-8") as f:
+    json.dump(report_dict(stats_list), f, indent=2)
+
+CSV_FIELDS = ["source", "kind", "name", "lines", "words", "voice_over_seconds", "menus", "choices"]
+
+def csv_rows(stats: ScriptStats) -> List[dict]:
+  rows = [{
+    "source": stats.source, "kind": "summary", "name": "",
+    "lines": stats.total_lines, "words": stats.total_words,
+    "voice_over_seconds": round(stats.voice_over_seconds(), 1),
+    "menus": stats.menus, "choices": stats.choices,
+  }]
+  for name, lines in stats.lines_per_character.items():
+    rows.append({
+      "source": stats.source, "kind": "character", "name": name,
+      "lines": lines, "words": stats.words_per_character.get(name, 0),
+      "voice_over_seconds": round(stats.voice_over_seconds(name), 1),
+    })
+  for label, lines in stats.lines_per_label.items():
+    rows.append({
+      "source": stats.source, "kind": "label", "name": label,
+      "lines": lines, "words": stats.words_per_label.get(label, 0),
+    })
+  return rows
+
+def write_csv_report(stats_list: List[ScriptStats], path: str):
+  with open(path, "w", encoding="utf-8", newline="") as f:
+    writer = csv.DictWriter(f, fieldnames=CSV_FIELDS)
+    writer.writeheader()
+    for stats in list(stats_list) + [aggregate(stats_list)]:
+      writer.writerows(csv_rows(stats))
+
+def write_report(stats_list: List[ScriptStats], path: str):
+  """Write a JSON or CSV report depending on the file extension"""
+  if path.lower().endswith(".csv"):
+    write_csv_report(stats_list, path)
+  else:
+    write_json_report(stats_list, path)
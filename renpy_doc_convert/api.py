@@ -1,24 +1,249 @@
 #doc-to-renpy/renpy_doc_convert/api.py
-from docx import Document
+from renpy_doc_convert.analytics import ScriptStats
 from renpy_doc_convert.consolidate import Consolidate
-from renpy_doc_convert.to_renpy import ConvertToRenpy
+from renpy_doc_convert.ir import DocumentIR, IR_FORMAT_VERSION
+from renpy_doc_convert.labels import LabelGraph
+from renpy_doc_convert.media import extract_images
+from renpy_doc_convert.memory import (
+  MemoryTracker, STAGE_CONSOLIDATE, STAGE_FONT_STANDARDS, STAGE_INDEX, STAGE_LOAD, STAGE_RENDER, measure
+)
+from renpy_doc_convert.parallel import parse_parallel
+from renpy_doc_convert.preview import PreviewCallback, PreviewStream
+from renpy_doc_convert.progress import CancellationToken, ProgressCallback, ProgressReporter
+from renpy_doc_convert.sourcemap import SourceMap
+from renpy_doc_convert.store import ConversionStore
+from renpy_doc_convert.styles import document_default_size, load_document
+from renpy_doc_convert.text_source import TextDocument
+from renpy_doc_convert.timings import CACHE_IR, ConversionTimings, timed
+from renpy_doc_convert.to_renpy import ConvertToRenpy, RenderOptions
 
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import AsyncIterator, Dict, Iterable, Optional, Tuple
+import asyncio
+import functools
 import logging
+import os
 
 DOC_TO_RENPY_VERSION="2.0.0"
 
-def convert(docx_file_path: str, renpy_file_path : str):
+DEFAULT_ASYNC_CONCURRENCY = 4
 
+def parse(docx_file_path: str, store: Optional[ConversionStore] = None, workers: int = 1,
+          progress: Optional[ProgressReporter] = None,
+          memory: Optional[MemoryTracker] = None,
+          preview: Optional[PreviewStream] = None,
+          timings: Optional[ConversionTimings] = None,
+          skip_media: bool = False) -> DocumentIR:
+  """
+  Parse stage: read a .docx, or a plain-text or Markdown script (see
+  text_source), into a DocumentIR.
+  With skip_media, the pictures of the .docx are not read into memory
+  (see media.open_document); convert() does this when it copies them out.
+  With a store, the IR of an unchanged document is loaded from disk instead.
+  With more than one worker, a large document is consolidated in paragraph
+  ranges by that many processes (whose memory `memory` does not see).
+  A preview is only streamed while consolidating serially.
+  """
   logging.debug("Docx File->{0}".format(docx_file_path))
+
+  key = None
+  digest = None
+  if store is not None:
+    digest = store.digest(docx_file_path)
+    key = store.ir_key(digest, IR_FORMAT_VERSION)
+    with measure(memory, STAGE_LOAD), timed(timings, STAGE_LOAD):
+      data = store.read("ir", key)
+      ir = None
+      if data is not None:
+        try:
+          ir = DocumentIR.from_bytes(data)
+        except ValueError as e:
+          logging.debug("Ignoring unusable cached IR: {0}".format(e))
+    if ir is not None:
+      logging.debug("Loaded cached IR for {0}".format(docx_file_path))
+      if timings is not None:
+        timings.cache = CACHE_IR
+        timings.count_document(ir)
+      return ir
+
+  with measure(memory, STAGE_LOAD), timed(timings, STAGE_LOAD):
+    document = load_document(docx_file_path, skip_media)
+    logging.debug("Finish getting document object from dependency docx")
+    default_font_size = document_default_size(document, store, digest)
+    if isinstance(document, TextDocument):
+      # Reading a text script costs less than starting a worker
+      workers = 1
+
+  with measure(memory, STAGE_CONSOLIDATE), timed(timings, STAGE_CONSOLIDATE):
+    ir = parse_parallel(docx_file_path, len(document.paragraphs), default_font_size, workers, progress,
+                       skip_media=skip_media)
+    if ir is None:
+      obj = Consolidate(document, progress=progress, preview=preview)
+      obj.consolidate_paragraphs()
+      logging.debug("Finish consolidating docx text to chunks")
+  if ir is None:
+    with measure(memory, STAGE_INDEX), timed(timings, STAGE_INDEX):
+      if preview is not None:
+        # Most chunks were indexed for the previews already
+        ir = preview.finish_ir(obj, default_font_size, progress)
+      else:
+        ir = DocumentIR.from_chunks(obj.text_chunks, default_font_size, obj.font_histogram, progress,
+                                    obj.images)
+  logging.debug("Finish building IR of {0} chunk(s)".format(ir.chunk_count))
+  if timings is not None:
+    timings.count_document(ir)
+
+  if key is not None:
+    store.write("ir", key, ir.to_bytes(), digest)
+
+  return ir
+
+def render(ir: DocumentIR, renpy_file_path: str, options: Optional[RenderOptions] = None,
+           label_graph: Optional[LabelGraph] = None,
+           progress: Optional[ProgressReporter] = None,
+           memory: Optional[MemoryTracker] = None,
+           timings: Optional[ConversionTimings] = None,
+           source_maps: Optional[Dict[str, SourceMap]] = None,
+           image_names: Optional[Dict[str, str]] = None) -> ScriptStats:
+  """
+  Render stage: write the .rpy script for a DocumentIR. source_maps, when
+  given, receives the SourceMap of each file written, by path. With
+  options.image_statement, pictures named in image_names (archive member ->
+  Ren'Py image name, see media.extract_images) are shown where they were.
+  """
   logging.debug("Renpy File->{0}".format(renpy_file_path))
 
-  document = Document(docx_file_path)
-  logging.debug("Finish getting document object from dependency docx")
-  obj = Consolidate(document)
+  with measure(memory, STAGE_FONT_STANDARDS), timed(timings, STAGE_FONT_STANDARDS):
+    cr = ConvertToRenpy(ir, ir.chunks(), renpy_file_path, label_graph,
+                        font_histogram=ir.font_histogram, options=options, progress=progress,
+                        images=ir.images(), image_names=image_names)
+  with measure(memory, STAGE_RENDER), timed(timings, STAGE_RENDER):
+    cr.output_renpy_text()
+  logging.debug("Finish outputting renpy text from text chunks")
+  if timings is not None:
+    timings.output_bytes = sum(os.path.getsize(path) for path in cr.output_files)
+  if source_maps is not None:
+    source_maps.update((path, cr.source_maps[path]) for path in cr.output_files)
+
+  return cr.stats
+
+def convert(docx_file_path: str, renpy_file_path : str, label_graph: Optional[LabelGraph] = None,
+            options: Optional[RenderOptions] = None, store: Optional[ConversionStore] = None,
+            workers: int = 1, on_progress: Optional[ProgressCallback] = None,
+            cancel_token: Optional[CancellationToken] = None,
+            memory: Optional[MemoryTracker] = None,
+            on_preview: Optional[PreviewCallback] = None,
+            timings: Optional[ConversionTimings] = None,
+            source_maps: Optional[Dict[str, SourceMap]] = None):
+  """
+  Convert a .docx to a .rpy file and return its ScriptStats.
+
+  on_progress(stage, done, total) is called every few hundred paragraphs or
+  chunks of each stage. Cancelling cancel_token from another thread stops
+  the conversion with ConversionCancelled; the .rpy file is then left as
+  it was. With a MemoryTracker, the memory use of each stage is recorded
+  on it, and with ConversionTimings the time of each stage and the size of
+  the document and output. on_preview(text, replace) receives the script
+  rendered so far while the document is parsed (see preview.PreviewStream).
+  source_maps receives the SourceMap of each file written (see render()).
+  With options.images_dir, the document's pictures are first copied there
+  (see media.extract_images).
+  """
+  progress = None
+  if on_progress is not None or cancel_token is not None:
+    progress = ProgressReporter(on_progress, cancel_token)
+  preview = PreviewStream(renpy_file_path, on_preview) if on_preview is not None else None
+
+  try:
+    copy_images = options is not None and options.images_dir is not None
+    ir = parse(docx_file_path, store, workers, progress, memory, preview, timings,
+               skip_media=copy_images)
+    image_names = None
+    if copy_images:
+      members = {image.member for image in ir.images()}
+      image_names = extract_images(docx_file_path, options.images_dir, members).names
+    return render(ir, renpy_file_path, options, label_graph, progress, memory, timings,
+                  source_maps, image_names)
+  finally:
+    if memory is not None:
+      memory.stop()
+
+def validate(docx_file_path: str, renpy_file_path: str, label_graph: LabelGraph):
+  """
+  Add a document's labels and jumps to label_graph without rendering it,
+  or reading its styles and fonts.
+  renpy_file_path is only used to name the document's own label.
+  """
+  document = load_document(docx_file_path)
+  obj = Consolidate(document, count_fonts=False)
   obj.consolidate_paragraphs()
-  logging.debug("Finish consolidating docx text to chunks")
 
-  cr = ConvertToRenpy(document, obj.text_chunks, renpy_file_path)
-  cr.output_renpy_text()
-  logging.debug("Finish outputting renpy text from text chunks")
+  cr = ConvertToRenpy(document, obj.text_chunks, renpy_file_path, label_graph, labels_only=True)
+  cr.collect_labels()
+  logging.debug("Finish collecting labels of {0}".format(docx_file_path))
+
+async def convert_async(docx_file_path: str, renpy_file_path: str,
+                        executor: Optional[Executor] = None):
+  """
+  Coroutine version of convert().
+
+  Parsing and rendering run on `executor` (the loop's default thread pool
+  when None), so the event loop stays free while the document is converted.
+  Cancelling the awaiting task abandons the result. On a thread executor it
+  also stops a conversion that has already started; one running in another
+  process still runs to completion.
+  """
+  loop = asyncio.get_running_loop()
+  job = functools.partial(convert, docx_file_path, renpy_file_path)
+  token = None
+  if executor is None or isinstance(executor, ThreadPoolExecutor):
+    token = CancellationToken()
+    job = functools.partial(job, cancel_token=token)
+
+  try:
+    return await loop.run_in_executor(executor, job)
+  except asyncio.CancelledError:
+    if token is not None:
+      token.cancel()
+    raise
+
+async def convert_many_async(
+    jobs: Iterable[Tuple[str, str]],
+    executor: Optional[Executor] = None,
+    concurrency: int = DEFAULT_ASYNC_CONCURRENCY
+) -> AsyncIterator[Tuple[str, str, Optional[BaseException]]]:
+  """
+  Convert many (docx_file_path, renpy_file_path) pairs concurrently.
+
+  At most `concurrency` conversions are in flight at once. Results are
+  yielded as (docx_file_path, renpy_file_path, error) in completion order,
+  where error is None on success. Closing the generator early, or cancelling
+  the task iterating it, cancels every conversion that has not started yet.
+  """
+  if concurrency < 1:
+    raise ValueError("concurrency must be at least 1, got {0}".format(concurrency))
+
+  semaphore = asyncio.Semaphore(concurrency)
+
+  async def run_one(docx_file_path: str, renpy_file_path: str):
+    async with semaphore:
+      try:
+        await convert_async(docx_file_path, renpy_file_path, executor)
+      except asyncio.CancelledError:
+        raise
+      except Exception as e:
+        logging.debug("Async conversion of {0} failed: {1}".format(docx_file_path, e))
+        return docx_file_path, renpy_file_path, e
+      return docx_file_path, renpy_file_path, None
+
+  tasks = [asyncio.ensure_future(run_one(docx, renpy)) for docx, renpy in jobs]
+  logging.debug("Scheduled {0} async conversion(s)".format(len(tasks)))
 
+  try:
+    for next_done in asyncio.as_completed(tasks):
+      yield await next_done
+  finally:
+    for task in tasks:
+      if not task.done():
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,178 @@
+#doc-to-renpy/renpy_doc_convert/batch.py
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import partial
+from pathlib import Path
+from typing import Callable, List, Optional, Sequence, Tuple
+import logging
+import os
+
+from renpy_doc_convert.analytics import ScriptStats
+from renpy_doc_convert.api import convert, validate
+from renpy_doc_convert.labels import LabelGraph, LabelReport
+from renpy_doc_convert.memory import MemoryTracker
+from renpy_doc_convert.profiling import ConversionProfiler, profile_prefix
+from renpy_doc_convert.progress import ProgressCallback
+from renpy_doc_convert.schedule import expected_work, largest_first
+from renpy_doc_convert.to_renpy import RenderOptions
+
+class BatchResult:
+  """Outcome of converting one document of a batch"""
+
+  def __init__(self, docx_file_path: str, renpy_file_path: str,
+               stats: Optional[ScriptStats] = None, error: Optional[str] = None,
+               label_graph: Optional[LabelGraph] = None,
+               memory: Optional[MemoryTracker] = None):
+    self.docx_file_path = docx_file_path
+    self.renpy_file_path = renpy_file_path
+    self.stats = stats
+    self.error = error
+    self.label_graph = label_graph
+    self.memory = memory
+    # Files written by a profiled conversion, and its summary
+    self.profile_files: List[str] = []
+    self.profile_lines: List[str] = []
+    # Problems that did not fail the conversion
+    self.warnings: List[str] = []
+
+  @property
+  def ok(self) -> bool:
+    return self.error is None
+
+def output_path_for(docx_file_path: str, output_dir: Optional[str] = None) -> str:
+  """The .rpy path a document converts to, next to it unless output_dir is given"""
+  directory = output_dir if output_dir else os.path.dirname(docx_file_path)
+  return os.path.join(directory, Path(docx_file_path).stem + ".rpy")
+
+def _convert_job(job: Tuple[str, str], parse_workers: int = 1,
+                 on_progress: Optional[ProgressCallback] = None,
+                 track_memory: bool = False,
+                 options: Optional[RenderOptions] = None,
+                 profile: Optional[str] = None, profile_dir: Optional[str] = None) -> BatchResult:
+  docx_file_path, renpy_file_path = job
+  label_graph = LabelGraph()
+  memory = MemoryTracker(docx_file_path) if track_memory else None
+  try:
+    if profile is None:
+      stats = convert(docx_file_path, renpy_file_path, label_graph, options, workers=parse_workers,
+                      on_progress=on_progress, memory=memory)
+    else:
+      # Parse in this process so the parse shows up in the profile
+      with ConversionProfiler(profile) as profiler:
+        stats = convert(docx_file_path, renpy_file_path, label_graph, options, workers=1,
+                        on_progress=on_progress, memory=memory)
+    result = BatchResult(docx_file_path, renpy_file_path, stats=stats, label_graph=label_graph,
+                         memory=memory)
+  except Exception as e:
+    logging.debug("Batch conversion of {0} failed: {1}".format(docx_file_path, e))
+    return BatchResult(docx_file_path, renpy_file_path, error="{0}: {1}".format(type(e).__name__, e))
+
+  if profile is not None:
+    result.profile_lines = profiler.format_lines()
+    # The document is converted; a profile that cannot be saved only loses the profile
+    try:
+      os.makedirs(profile_dir or ".", exist_ok=True)
+      result.profile_files = profiler.write(profile_prefix(profile_dir or ".", docx_file_path))
+    except OSError as e:
+      result.warnings.append("profile not written: {0}: {1}".format(type(e).__name__, e))
+  return result
+
+def _validate_job(job: Tuple[str, str]) -> BatchResult:
+  docx_file_path, renpy_file_path = job
+  label_graph = LabelGraph()
+  try:
+    validate(docx_file_path, renpy_file_path, label_graph)
+    return BatchResult(docx_file_path, renpy_file_path, label_graph=label_graph)
+  except Exception as e:
+    logging.debug("Batch validation of {0} failed: {1}".format(docx_file_path, e))
+    return BatchResult(docx_file_path, renpy_file_path, error="{0}: {1}".format(type(e).__name__, e))
+
+def validate_labels(results: Sequence[BatchResult]) -> LabelReport:
+  """Check jumps and labels across every document of a batch"""
+  project = LabelGraph()
+  for result in results:
+    if result.label_graph is not None:
+      project.merge(result.label_graph)
+  return project.validate()
+
+def convert_batch(jobs: Sequence[Tuple[str, str]], workers: Optional[int] = None,
+                  validate_only: bool = False,
+                  on_progress: Optional[ProgressCallback] = None,
+                  on_result: Optional[Callable[[int, int, BatchResult], None]] = None,
+                  track_memory: bool = False,
+                  weights: Optional[Sequence[int]] = None,
+                  options: Optional[RenderOptions] = None,
+                  profile: Optional[str] = None,
+                  profile_dir: Optional[str] = None) -> List[BatchResult]:
+  """
+  Convert (docx_file_path, renpy_file_path) pairs, in worker processes when
+  there is more than one job and more than one worker.
+  Results come back in the order of `jobs`; `workers` defaults to the CPU
+  count. A single document is parsed in one process unless `workers` is
+  given, in which case a large one is split across that many workers by
+  paragraph range (see parallel).
+
+  Worker processes take the documents with the most expected work first
+  (weights, from schedule.expected_work unless given), so one large
+  chapter late in the list does not run alone at the end.
+
+  With validate_only, documents are only parsed for their labels and
+  jumps; nothing is rendered or written.
+
+  on_progress(stage, done, total) follows the stages of a single document
+  converted on its own. on_result(done, total, result) is called as each
+  document's result comes in, which with several workers is not the order
+  of `jobs`.
+
+  With track_memory, each result carries a MemoryTracker with the memory
+  use of every conversion stage. options are the RenderOptions of every
+  document.
+
+  With a profile mode (profiling.PROFILE_MODES), each conversion is
+  profiled and its profile written to profile_dir (default: the working
+  directory) as <document name>-<path hash>-<time>.pstats / .collapsed.txt
+  (profiling.profile_prefix); the paths are in each result's profile_files.
+  A profile that cannot be written is a warning of the result, not an
+  error.
+  """
+  job_function = (_validate_job if validate_only
+                  else partial(_convert_job, track_memory=track_memory, options=options,
+                               profile=profile, profile_dir=profile_dir))
+  jobs = list(jobs)
+
+  if len(jobs) == 1 and not validate_only:
+    # Each parse worker re-reads the whole document, so only split it when asked to
+    parse_workers = workers if workers is not None else 1
+    results = [_convert_job(jobs[0], parse_workers=parse_workers, on_progress=on_progress,
+                            track_memory=track_memory, options=options, profile=profile,
+                            profile_dir=profile_dir)]
+    if on_result is not None:
+      on_result(1, 1, results[0])
+    return results
+
+  if workers is None:
+    workers = os.cpu_count() or 1
+  workers = max(1, min(workers, len(jobs)))
+
+  logging.debug("Converting {0} document(s) with {1} worker(s)".format(len(jobs), workers))
+
+  if workers == 1:
+    results = []
+    for job in jobs:
+      results.append(job_function(job))
+      if on_result is not None:
+        on_result(len(results), len(jobs), results[-1])
+    return results
+
+  if weights is None:
+    weights = [expected_work(docx_file_path) for docx_file_path, _ in jobs]
+
+  results: List[Optional[BatchResult]] = [None] * len(jobs)
+  with ProcessPoolExecutor(max_workers=workers) as pool:
+    # The pool hands out submitted jobs in submission order
+    futures = {pool.submit(job_function, jobs[index]): index for index in largest_first(weights)}
+    for done, future in enumerate(as_completed(futures), 1):
+      result = future.result()
+      results[futures[future]] = result
+      if on_result is not None:
+        on_result(done, len(jobs), result)
+  return results
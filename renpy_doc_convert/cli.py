@@ -0,0 +1,157 @@
+#doc-to-renpy/renpy_doc_convert/cli.py
+import argparse
+import logging
+import os
+import sys
+import time
+from typing import List, Optional, Sequence, Tuple
+
+from renpy_doc_convert.analytics import aggregate, write_report
+from renpy_doc_convert.api import DOC_TO_RENPY_VERSION
+from renpy_doc_convert.batch import BatchResult, convert_batch, output_path_for, validate_labels
+from renpy_doc_convert.media import IMAGE_STATEMENTS
+from renpy_doc_convert.profiling import PROFILE_CPROFILE, PROFILE_MODES
+from renpy_doc_convert.progress import ProgressCallback, eta_seconds, format_eta, overall_fraction
+from renpy_doc_convert.schedule import BatchEstimate, expected_work
+from renpy_doc_convert.to_renpy import RenderOptions
+
+def build_parser() -> argparse.ArgumentParser:
+  parser = argparse.ArgumentParser(
+    prog="python -m renpy_doc_convert",
+    description="Convert .docx (or plain-text .txt and Markdown .md) scripts to Ren'Py .rpy files."
+  )
+  parser.add_argument("inputs", nargs="+", metavar="DOCX",
+                      help="documents to convert (.docx, .txt or .md)")
+  parser.add_argument("-o", "--output-dir",
+                      help="directory for the .rpy files, created if missing (default: next to each document)")
+  parser.add_argument("-j", "--jobs", type=int, default=None,
+                      help="worker processes for batches (default: CPU count), or for the paragraphs "
+                           "of a single large document (default: 1)")
+  parser.add_argument("--split-sections", action="store_true",
+                      help="write each == label == section and the defines to its own file, "
+                           "in a directory named after the .rpy file; unchanged files are not rewritten")
+  parser.add_argument("--images", metavar="DIR",
+                      help="copy the documents' pictures to DIR (e.g. game/images), named by "
+                           "content hash; a picture already there is not written again")
+  parser.add_argument("--image-statement", choices=IMAGE_STATEMENTS,
+                      help="write a show or scene statement where each picture was (needs --images)")
+  parser.add_argument("--stats", metavar="REPORT",
+                      help="write script statistics to REPORT (.json or .csv)")
+  parser.add_argument("--validate", action="store_true",
+                      help="check jumps and labels across all inputs after converting")
+  parser.add_argument("--validate-only", action="store_true",
+                      help="only check jumps and labels; do not write any .rpy files")
+  parser.add_argument("--memory", action="store_true",
+                      help="report peak and retained memory of each conversion stage on stderr")
+  parser.add_argument("--profile", nargs="?", const=PROFILE_CPROFILE, choices=PROFILE_MODES,
+                      help="profile each conversion with cProfile (default) or by sampling "
+                           "its stack (cheaper on long runs); writes .pstats and collapsed-stack "
+                           "files that name functions only, not the document's text")
+  parser.add_argument("--profile-dir", metavar="DIR",
+                      help="directory for the profiles (default: the working directory)")
+  parser.add_argument("--progress", action="store_true",
+                      help="show progress and the estimated time left on stderr")
+  parser.add_argument("-v", "--verbose", action="store_true", help="debug logging")
+  parser.add_argument("--version", action="version", version=DOC_TO_RENPY_VERSION)
+  return parser
+
+def document_progress_printer(name: str) -> ProgressCallback:
+  """Progress callback that redraws one status line on stderr"""
+  started = time.monotonic()
+
+  def on_progress(stage: str, done: int, total: int):
+    fraction = overall_fraction(stage, done, total)
+    eta = eta_seconds(time.monotonic() - started, fraction)
+    print("\r{0}: {1} {2:.0%} ({3})\x1b[K".format(name, stage, fraction, format_eta(eta)),
+          end="", file=sys.stderr, flush=True)
+
+  return on_progress
+
+def batch_progress_printer(jobs: Sequence[Tuple[str, str]], weights: Sequence[int]):
+  """Result callback printing each finished document, with a time left weighted by document size"""
+  started = time.monotonic()
+  estimate = BatchEstimate(weights)
+  positions = {job: index for index, job in enumerate(jobs)}
+
+  def on_result(done: int, total: int, result: BatchResult):
+    estimate.finish(positions[(result.docx_file_path, result.renpy_file_path)])
+    eta = eta_seconds(time.monotonic() - started, estimate.fraction())
+    print("[{0}/{1}] {2} ({3})".format(done, total, result.docx_file_path, format_eta(eta)),
+          file=sys.stderr, flush=True)
+
+  return on_result
+
+def main(argv: Optional[List[str]] = None) -> int:
+  parser = build_parser()
+  args = parser.parse_args(argv)
+  if args.image_statement and not args.images:
+    parser.error("--image-statement needs --images")
+  logging.basicConfig(level=logging.DEBUG if args.verbose else logging.WARNING)
+
+  if args.output_dir and not args.validate_only:
+    try:
+      os.makedirs(args.output_dir, exist_ok=True)
+    except OSError as e:
+      parser.error("cannot create output directory {0}: {1}".format(args.output_dir, e.strerror or e))
+
+  jobs = [(path, output_path_for(path, args.output_dir)) for path in args.inputs]
+  weights = [expected_work(docx_file_path) for docx_file_path, _ in jobs] if len(jobs) > 1 else None
+  on_progress = None
+  on_result = None
+  if args.progress:
+    if len(jobs) == 1:
+      on_progress = document_progress_printer(jobs[0][0])
+    else:
+      on_result = batch_progress_printer(jobs, weights)
+
+  results = convert_batch(jobs, args.jobs, validate_only=args.validate_only,
+                          on_progress=on_progress, on_result=on_result, track_memory=args.memory,
+                          weights=weights,
+                          options=RenderOptions(split_sections=args.split_sections,
+                                                images_dir=args.images,
+                                                image_statement=args.image_statement),
+                          profile=args.profile, profile_dir=args.profile_dir)
+  if on_progress is not None:
+    print(file=sys.stderr)
+
+  for result in results:
+    if result.memory is not None:
+      for line in result.memory.format_lines():
+        print(line, file=sys.stderr)
+    if result.profile_files:
+      print("Profile of {0} written to {1}".format(result.docx_file_path,
+                                                   ", ".join(result.profile_files)), file=sys.stderr)
+      for line in result.profile_lines:
+        print(line, file=sys.stderr)
+    for warning in result.warnings:
+      print("{0}: warning: {1}".format(result.docx_file_path, warning), file=sys.stderr)
+
+  failed = 0
+  for result in results:
+    if result.ok:
+      if not args.validate_only:
+        print("{0} -> {1}".format(result.docx_file_path, result.renpy_file_path))
+    else:
+      failed += 1
+      print("{0}: {1}".format(result.docx_file_path, result.error), file=sys.stderr)
+
+  labels_ok = True
+  if args.validate or args.validate_only:
+    report = validate_labels(results)
+    for line in report.format_lines():
+      print(line, file=sys.stderr)
+    labels_ok = report.ok
+    if labels_ok:
+      print("Labels OK in {0} file(s)".format(len(results) - failed))
+
+  stats_list = [result.stats for result in results if result.stats is not None]
+  if args.stats:
+    write_report(stats_list, args.stats)
+    total = aggregate(stats_list)
+    print("Statistics for {0} file(s), {1} lines, {2} words written to {3}".format(
+      len(stats_list), total.total_lines, total.total_words, args.stats))
+
+  # The .rpy files and statistics are written either way; label errors take precedence
+  if not labels_ok:
+    return 2
+  return 1 if failed else 0
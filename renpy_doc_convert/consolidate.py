@@ -1,12 +1,17 @@
 #doc-to-renpy/renpy_doc_convert/consolidate.py
 from docx.document import Document
+from docx.shared import RGBColor
 from docx.text.paragraph import Paragraph
 
+from collections import Counter
 from enum import Enum
-from typing import List
+from typing import Callable, List, Optional
 import logging
 import re
 
+from renpy_doc_convert.media import ImageRef, paragraph_images
+from renpy_doc_convert.progress import STAGE_PARSING, ProgressReporter
+
 class TextType(Enum):
   DIALOGUE = 1
   NARRATION = 2
@@ -30,13 +35,78 @@ class TextChunk:
     self.paragraphs: List[Paragraph] = []
     self.text_type: TextType = TextType.NONE
     self.character: str = ""
+    # Index in document.paragraphs of the first paragraph, -1 if unknown
+    self.source_index: int = -1
+
+class FontHistogram:
+  """
+  Character-weighted histogram of the font sizes and colours of runs.
+  Runs without an explicit size or colour are counted under None.
+  """
+
+  def __init__(self):
+    self.sizes: Counter = Counter()
+    self.colors: Counter = Counter()
+
+  def add_paragraph(self, paragraph: Paragraph):
+    for run in paragraph.runs:
+      weight = len(run.text)
+      if weight == 0:
+        continue
+      font = run.font
+      self.sizes[font.size.pt if font.size else None] += weight
+      self.colors[font.color.rgb if font.color and font.color.rgb else None] += weight
+
+  def merge(self, other: "FontHistogram"):
+    """Add the counts of a histogram built from text that follows this one"""
+    self.sizes.update(other.sizes)
+    self.colors.update(other.colors)
+
+  def inherits_size(self) -> bool:
+    """True if most characters are in runs of the inherited size"""
+    return self.sizes[None] * 2 > sum(self.sizes.values())
+
+  def most_common_size(self) -> Optional[float]:
+    """
+    Explicit size covering the most characters, None if no run has one.
+    Runs of the inherited size never get a size tag, so they do not count.
+    """
+    explicit = [(size, count) for size, count in self.sizes.most_common() if size is not None]
+    if not explicit:
+      return None
+    return explicit[0][0]
+
+  def most_common_color(self) -> Optional[RGBColor]:
+    """Colour covering the most characters, None if that is the inherited colour"""
+    if not self.colors:
+      return None
+    return self.colors.most_common(1)[0][0]
 
 class Consolidate:
   
-  def __init__(self, document: Document):
+  def __init__(self, document: Document, start: int = 0, end: Optional[int] = None,
+               progress: Optional[ProgressReporter] = None,
+               preview: Optional[Callable[["Consolidate", int], None]] = None,
+               count_fonts: bool = True):
+    """
+    Consolidates the document's paragraphs start .. end - 1 (all by default).
+    The document may also be a text_source.TextDocument read from a draft.
+    preview(self, done) is called before each paragraph and once at the end
+    (e.g. a preview.PreviewStream). The pictures in the paragraphs are
+    listed in self.images, placed before the chunk that follows them.
+    Without count_fonts, font_histogram is None (e.g. to check labels only).
+    """
     self.document = document
+    self.start = start
+    self.progress = progress
+    self.preview = preview
     self.text_chunks: list[TextChunk] = []
-    self.doc_paragraphs: list[Paragraph] = document.paragraphs
+    self.images: List[ImageRef] = []
+    self._paragraph_images = paragraph_images(document)
+    self.doc_paragraphs: list[Paragraph] = document.paragraphs[start:end]
+    self.font_histogram: Optional[FontHistogram] = FontHistogram() if count_fonts else None
+    # Set when the last paragraph was still inside a Characters{} block
+    self.ends_in_character_block = False
 
     logging.debug("Finish with Consolidate constructor")
   
@@ -45,8 +115,19 @@ class Consolidate:
     character_block_chunk = None
 
     logging.debug("Processing {0} paragraphs".format(len(self.doc_paragraphs)))
+    if self.progress is not None:
+      self.progress.start(STAGE_PARSING, len(self.doc_paragraphs))
+
+    for done, paragraph in enumerate(self.doc_paragraphs):
+      if self.progress is not None:
+        self.progress.update(done)
+      if self.preview is not None:
+        self.preview(self, done)
+
+      if self._paragraph_images:
+        for member in self._paragraph_images.get(paragraph._p, ()):
+          self.images.append(ImageRef(len(self.text_chunks), self.start + done, member))
 
-    for paragraph in self.doc_paragraphs:
       text = paragraph.text.strip()
       
       # Skip empty lines
@@ -59,6 +140,7 @@ class Consolidate:
         character_block_chunk = TextChunk()
         character_block_chunk.paragraphs.append(paragraph)
         character_block_chunk.text_type = TextType.CHARACTER_DEF
+        character_block_chunk.source_index = self.start + done
         self.text_chunks.append(character_block_chunk)
         continue
       
@@ -75,6 +157,7 @@ class Consolidate:
         chunk = TextChunk()
         chunk.paragraphs.append(paragraph)
         chunk.text_type = TextType.COMMENT
+        chunk.source_index = self.start + done
         self.text_chunks.append(chunk)
         continue
       
@@ -83,6 +166,7 @@ class Consolidate:
         chunk = TextChunk()
         chunk.paragraphs.append(paragraph)
         chunk.text_type = TextType.LABEL_MARKER
+        chunk.source_index = self.start + done
         self.text_chunks.append(chunk)
         continue
       
@@ -91,16 +175,26 @@ class Consolidate:
         chunk = TextChunk()
         chunk.paragraphs.append(paragraph)
         chunk.text_type = TextType.MENU_CHOICE
+        chunk.source_index = self.start + done
         self.text_chunks.append(chunk)
         continue
       
       # Regular text processing - each paragraph is its own chunk
+      if self.font_histogram is not None:
+        self.font_histogram.add_paragraph(paragraph)
       chunk = TextChunk()
       chunk.paragraphs.append(paragraph)
       chunk.text_type = self.get_text_type(paragraph)
       chunk.character = self.get_character(paragraph, chunk.text_type)
+      chunk.source_index = self.start + done
       self.text_chunks.append(chunk)
 
+    self.ends_in_character_block = in_character_block
+    if self.preview is not None:
+      self.preview(self, len(self.doc_paragraphs))
+    if self.progress is not None:
+      self.progress.finish()
+
   def is_comment_line(self, text: str) -> bool:
     """Check if line is a comment (starts with # or wrapped in ())"""
     text = text.strip()
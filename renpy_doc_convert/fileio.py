@@ -0,0 +1,89 @@
+#doc-to-renpy/renpy_doc_convert/fileio.py
+from typing import BinaryIO, Callable
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+
+HASH_BLOCK_SIZE = 1 << 16
+
+def stream_digest(stream: BinaryIO) -> str:
+  """Return the sha256 hex digest of what is left in a binary stream, read in blocks"""
+  digest = hashlib.sha256()
+  for block in iter(lambda: stream.read(HASH_BLOCK_SIZE), b""):
+    digest.update(block)
+  return digest.hexdigest()
+
+def file_digest(path: str) -> str:
+  """Return the sha256 hex digest of a file on disk"""
+  with open(path, "rb") as f:
+    return stream_digest(f)
+
+def _umask() -> int:
+  """The process umask, from /proc where it can be read without setting it"""
+  try:
+    with open("/proc/self/status") as f:
+      for line in f:
+        if line.startswith("Umask:"):
+          return int(line.split()[1], 8)
+  except (OSError, ValueError):
+    pass
+  umask = os.umask(0)
+  os.umask(umask)
+  return umask
+
+def _atomic_write(path: str, write: Callable[[BinaryIO], None]):
+  directory = os.path.dirname(os.path.abspath(path))
+  fd, temp_path = tempfile.mkstemp(prefix=".tmp_", dir=directory)
+  try:
+    with os.fdopen(fd, "wb") as f:
+      # mkstemp creates files as 0600; give them the mode open() would have
+      if os.path.exists(path):
+        os.chmod(temp_path, os.stat(path).st_mode & 0o7777)
+      else:
+        os.chmod(temp_path, 0o666 & ~_umask())
+      write(f)
+      f.flush()
+      os.fsync(f.fileno())
+    os.replace(temp_path, path)
+  except BaseException:
+    if os.path.exists(temp_path):
+      os.remove(temp_path)
+    raise
+
+def atomic_write_bytes(path: str, data: bytes):
+  """
+  Write data to path through a temp file in the same directory and os.replace,
+  so readers only ever see the old file or the complete new one.
+  """
+  _atomic_write(path, lambda f: f.write(data))
+
+def atomic_copy_stream(path: str, stream: BinaryIO):
+  """atomic_write_bytes() for what is left in a binary stream, copied in blocks"""
+  _atomic_write(path, lambda f: shutil.copyfileobj(stream, f, HASH_BLOCK_SIZE))
+
+def encode_text(text: str) -> bytes:
+  """Encode text the way open(path, "w", encoding="utf-8") would write it"""
+  if os.linesep != "\n":
+    text = text.replace("\n", os.linesep)
+  return text.encode("utf-8")
+
+def atomic_write_text(path: str, text: str):
+  atomic_write_bytes(path, encode_text(text))
+
+def write_if_changed(path: str, data: bytes) -> bool:
+  """
+  Atomically write data to path unless the file already holds the same bytes.
+  Returns True when the file was written, False when it was left untouched.
+  """
+  if os.path.isfile(path) and os.path.getsize(path) == len(data):
+    if file_digest(path) == hashlib.sha256(data).hexdigest():
+      logging.debug("Skip unchanged file {0}".format(path))
+      return False
+
+  atomic_write_bytes(path, data)
+  return True
+
+def write_text_if_changed(path: str, text: str) -> bool:
+  return write_if_changed(path, encode_text(text))
@@ -0,0 +1,403 @@
+#doc-to-renpy/renpy_doc_convert/ir.py
+"""
+Serializable intermediate representation (IR) of a consolidated document.
+
+The parse stage (opening the .docx and walking its XML) is by far the most
+expensive part of a conversion. DocumentIR captures everything the render
+stage reads from python-docx - chunk types, speakers, paragraph and run
+text, run styling, the font baseline inputs and where pictures are - in
+flat typed arrays, so
+a document can be re-rendered with different options without reparsing.
+
+The views returned by DocumentIR.chunks() expose the small part of the
+python-docx Paragraph/Run API that ConvertToRenpy uses, so the renderer
+works unchanged on either.
+"""
+from array import array
+from collections import Counter
+from typing import List, Optional
+import json
+import struct
+import sys
+
+from docx.shared import Length, RGBColor
+
+from renpy_doc_convert.consolidate import FontHistogram, TextChunk, TextType
+from renpy_doc_convert.media import ImageRef
+from renpy_doc_convert.progress import STAGE_INDEXING, ProgressReporter
+
+IR_MAGIC = b"RPIR"
+IR_FORMAT_VERSION = 3
+
+# Bits of DocumentIR.run_flags
+RUN_BOLD = 1
+RUN_ITALIC = 2
+RUN_UNDERLINE = 4
+RUN_STRIKE = 8
+
+# Stored in run_size / run_color when a run has no explicit value
+NO_VALUE = -1
+
+_HEADER = struct.Struct("<4sHI")
+_ARRAY_LENGTH = struct.Struct("<Q")
+
+class StringColumn:
+  """Strings stored back to back in one pool string, addressed by offsets"""
+
+  def __init__(self):
+    self._pending: List[str] = []
+    self._pool = ""
+    self.offsets = array("I", [0])
+
+  def append(self, text: str):
+    self._pending.append(text)
+    self.offsets.append(self.offsets[-1] + len(text))
+
+  def _flush(self):
+    if self._pending:
+      self._pool += "".join(self._pending)
+      self._pending = []
+
+  def __getitem__(self, index: int) -> str:
+    self._flush()
+    return self._pool[self.offsets[index]:self.offsets[index + 1]]
+
+  def __len__(self) -> int:
+    return len(self.offsets) - 1
+
+  def extend(self, other: "StringColumn"):
+    base = self.offsets[-1]
+    self._pending.append(other.pool)
+    self.offsets.extend(offset + base for offset in other.offsets[1:])
+
+  @property
+  def pool(self) -> str:
+    self._flush()
+    return self._pool
+
+  @classmethod
+  def from_pool(cls, pool: str, offsets: array) -> "StringColumn":
+    column = cls()
+    column._pool = pool
+    column.offsets = offsets
+    return column
+
+class IRColor:
+  def __init__(self, rgb: Optional[RGBColor]):
+    self.rgb = rgb
+
+class IRFont:
+  def __init__(self, size: Optional[Length], color: IRColor, strike: bool):
+    self.size = size
+    self.color = color
+    self.strike = strike
+
+class IRRun:
+  """Read-only stand-in for docx.text.run.Run (text may be reassigned)"""
+
+  def __init__(self, ir: "DocumentIR", index: int):
+    flags = ir.run_flags[index]
+    size = ir.run_size[index]
+    color = ir.run_color[index]
+
+    self.text = ir.run_text[index]
+    self.bold = bool(flags & RUN_BOLD)
+    self.italic = bool(flags & RUN_ITALIC)
+    self.underline = bool(flags & RUN_UNDERLINE)
+    self.font = IRFont(
+      Length(size) if size != NO_VALUE else None,
+      IRColor(RGBColor(color >> 16, (color >> 8) & 0xFF, color & 0xFF) if color != NO_VALUE else None),
+      bool(flags & RUN_STRIKE)
+    )
+
+class IRParagraph:
+  """Read-only stand-in for docx.text.paragraph.Paragraph"""
+
+  def __init__(self, ir: "DocumentIR", index: int):
+    self._ir = ir
+    self._index = index
+    self.text = ir.paragraph_text[index]
+
+  @property
+  def runs(self) -> List[IRRun]:
+    start = self._ir.paragraph_run_start[self._index]
+    end = self._ir.paragraph_run_start[self._index + 1]
+    return [IRRun(self._ir, i) for i in range(start, end)]
+
+class DocumentIR:
+  """
+  Columnar IR of one document. Chunk i owns paragraphs
+  chunk_paragraph_start[i] .. chunk_paragraph_start[i + 1] - 1, and
+  paragraph j owns runs paragraph_run_start[j] .. paragraph_run_start[j + 1] - 1.
+  Empty paragraphs are not kept; chunk_source[i] is the index in the
+  document of chunk i's first paragraph (TextChunk.source_index). Picture
+  k (media.ImageRef) comes before chunk image_chunk[k].
+  """
+
+  def __init__(self):
+    self.chunk_type = array("B")
+    self.chunk_character = StringColumn()
+    self.chunk_paragraph_start = array("I", [0])
+    self.chunk_source = array("i")
+
+    self.paragraph_text = StringColumn()
+    self.paragraph_run_start = array("I", [0])
+
+    self.run_text = StringColumn()
+    self.run_flags = array("B")
+    self.run_size = array("q")
+    self.run_color = array("i")
+
+    self.image_chunk = array("I")
+    self.image_source = array("i")
+    self.image_member = StringColumn()
+
+    # Document default font size in points, NO_VALUE when the styles have none
+    self.default_font_size: float = NO_VALUE
+    self.font_histogram = FontHistogram()
+
+  @property
+  def chunk_count(self) -> int:
+    return len(self.chunk_type)
+
+  def add_run(self, run):
+    font = run.font
+    flags = 0
+    if run.bold:
+      flags |= RUN_BOLD
+    if run.italic:
+      flags |= RUN_ITALIC
+    if run.underline:
+      flags |= RUN_UNDERLINE
+    if font.strike:
+      flags |= RUN_STRIKE
+
+    rgb = font.color.rgb if font.color else None
+
+    self.run_text.append(run.text)
+    self.run_flags.append(flags)
+    self.run_size.append(int(font.size) if font.size else NO_VALUE)
+    self.run_color.append((rgb[0] << 16) | (rgb[1] << 8) | rgb[2] if rgb else NO_VALUE)
+
+  def add_paragraph(self, paragraph):
+    self.paragraph_text.append(paragraph.text)
+    for run in paragraph.runs:
+      self.add_run(run)
+    self.paragraph_run_start.append(len(self.run_flags))
+
+  def add_chunk(self, chunk: TextChunk):
+    self.chunk_type.append(chunk.text_type.value)
+    self.chunk_character.append(chunk.character)
+    self.chunk_source.append(chunk.source_index)
+    for paragraph in chunk.paragraphs:
+      self.add_paragraph(paragraph)
+    self.chunk_paragraph_start.append(len(self.paragraph_text))
+
+  def add_images(self, images: List[ImageRef]):
+    for image in images:
+      self.image_chunk.append(image.chunk)
+      self.image_source.append(image.source)
+      self.image_member.append(image.member)
+
+  @classmethod
+  def from_chunks(cls, chunks: List[TextChunk], default_font_size: float = NO_VALUE,
+                  font_histogram: Optional[FontHistogram] = None,
+                  progress: Optional[ProgressReporter] = None,
+                  images: Optional[List[ImageRef]] = None) -> "DocumentIR":
+    ir = cls()
+    if progress is not None:
+      progress.start(STAGE_INDEXING, len(chunks))
+    for done, chunk in enumerate(chunks):
+      if progress is not None:
+        progress.update(done)
+      ir.add_chunk(chunk)
+    if progress is not None:
+      progress.finish()
+    ir.default_font_size = default_font_size
+    if font_histogram is not None:
+      ir.font_histogram = font_histogram
+    if images is not None:
+      ir.add_images(images)
+    return ir
+
+  def extend(self, other: "DocumentIR"):
+    """
+    Append the chunks of an IR parsed from the paragraphs that follow this
+    one's, e.g. by another worker process
+    """
+    chunk_base = self.chunk_count
+    paragraph_base = len(self.paragraph_text)
+    run_base = len(self.run_flags)
+
+    self.chunk_type.extend(other.chunk_type)
+    self.chunk_character.extend(other.chunk_character)
+    self.chunk_paragraph_start.extend(start + paragraph_base for start in other.chunk_paragraph_start[1:])
+    self.chunk_source.extend(other.chunk_source)
+
+    self.paragraph_text.extend(other.paragraph_text)
+    self.paragraph_run_start.extend(start + run_base for start in other.paragraph_run_start[1:])
+
+    self.run_text.extend(other.run_text)
+    self.run_flags.extend(other.run_flags)
+    self.run_size.extend(other.run_size)
+    self.run_color.extend(other.run_color)
+
+    self.image_chunk.extend(chunk + chunk_base for chunk in other.image_chunk)
+    self.image_source.extend(other.image_source)
+    self.image_member.extend(other.image_member)
+
+    self.font_histogram.merge(other.font_histogram)
+
+  def chunk(self, index: int) -> TextChunk:
+    chunk = TextChunk()
+    chunk.text_type = TextType(self.chunk_type[index])
+    chunk.character = self.chunk_character[index]
+    chunk.source_index = self.chunk_source[index]
+    start = self.chunk_paragraph_start[index]
+    end = self.chunk_paragraph_start[index + 1]
+    chunk.paragraphs = [IRParagraph(self, i) for i in range(start, end)]
+    return chunk
+
+  def chunks(self, start: int = 0, end: Optional[int] = None) -> List[TextChunk]:
+    """TextChunks backed by the IR, usable wherever Consolidate's chunks are"""
+    if end is None:
+      end = self.chunk_count
+    return [self.chunk(i) for i in range(start, end)]
+
+  def images(self) -> List[ImageRef]:
+    return [
+      ImageRef(self.image_chunk[k], self.image_source[k], self.image_member[k])
+      for k in range(len(self.image_chunk))
+    ]
+
+  def _header(self) -> dict:
+    histogram = self.font_histogram
+    return {
+      "default_font_size": self.default_font_size,
+      "byteorder": sys.byteorder,
+      "itemsizes": {code: array(code).itemsize for code in "BIqi"},
+      "histogram_sizes": [[size, count] for size, count in histogram.sizes.items()],
+      "histogram_colors": [
+        [str(color) if color is not None else None, count]
+        for color, count in histogram.colors.items()
+      ],
+    }
+
+  def _columns(self) -> List[array]:
+    return [
+      self.chunk_type, self.chunk_character.offsets, self.chunk_paragraph_start, self.chunk_source,
+      self.paragraph_text.offsets, self.paragraph_run_start,
+      self.run_text.offsets, self.run_flags, self.run_size, self.run_color,
+      self.image_chunk, self.image_source, self.image_member.offsets,
+    ]
+
+  def to_bytes(self) -> bytes:
+    header = json.dumps(self._header()).encode("utf-8")
+    parts = [_HEADER.pack(IR_MAGIC, IR_FORMAT_VERSION, len(header)), header]
+
+    for column in self._columns():
+      data = column.tobytes()
+      parts.append(_ARRAY_LENGTH.pack(len(data)))
+      parts.append(data)
+
+    for strings in (self.chunk_character, self.paragraph_text, self.run_text, self.image_member):
+      data = strings.pool.encode("utf-8")
+      parts.append(_ARRAY_LENGTH.pack(len(data)))
+      parts.append(data)
+
+    return b"".join(parts)
+
+  @classmethod
+  def from_bytes(cls, data: bytes) -> "DocumentIR":
+    """
+    Load an IR written by to_bytes(). Truncated, corrupt or incompatible
+    data raises ValueError.
+    """
+    if len(data) < _HEADER.size:
+      raise ValueError("Document IR is truncated")
+    magic, version, header_length = _HEADER.unpack_from(data, 0)
+    if magic != IR_MAGIC or version != IR_FORMAT_VERSION:
+      raise ValueError("Not a version {0} document IR".format(IR_FORMAT_VERSION))
+
+    offset = _HEADER.size
+    if offset + header_length > len(data):
+      raise ValueError("Document IR is truncated")
+    header = json.loads(data[offset:offset + header_length].decode("utf-8"))
+    offset += header_length
+
+    try:
+      itemsizes = dict(header["itemsizes"])
+      byteorder = header["byteorder"]
+      default_font_size = header["default_font_size"]
+      histogram_sizes = Counter({size: count for size, count in header["histogram_sizes"]})
+      histogram_colors = Counter({
+        RGBColor.from_string(color) if color is not None else None: count
+        for color, count in header["histogram_colors"]
+      })
+    except (KeyError, TypeError) as e:
+      raise ValueError("Document IR header is incomplete: {0!r}".format(e))
+
+    if any(array(code).itemsize != size for code, size in itemsizes.items()):
+      raise ValueError("Document IR was written on a platform with different array sizes")
+    swap = byteorder != sys.byteorder
+
+    def next_block() -> bytes:
+      nonlocal offset
+      if offset + _ARRAY_LENGTH.size > len(data):
+        raise ValueError("Document IR is truncated")
+      (length,) = _ARRAY_LENGTH.unpack_from(data, offset)
+      offset += _ARRAY_LENGTH.size
+      if offset + length > len(data):
+        raise ValueError("Document IR is truncated")
+      block = data[offset:offset + length]
+      offset += length
+      return block
+
+    ir = cls()
+    columns = ir._columns()
+    loaded = []
+    for column in columns:
+      restored = array(column.typecode)
+      # Raises ValueError when the length is not a whole number of items
+      restored.frombytes(next_block())
+      if swap:
+        restored.byteswap()
+      loaded.append(restored)
+
+    (ir.chunk_type, character_offsets, ir.chunk_paragraph_start, ir.chunk_source,
+     paragraph_offsets, ir.paragraph_run_start,
+     run_offsets, ir.run_flags, ir.run_size, ir.run_color,
+     ir.image_chunk, ir.image_source, image_offsets) = loaded
+
+    ir.chunk_character = StringColumn.from_pool(next_block().decode("utf-8"), character_offsets)
+    ir.paragraph_text = StringColumn.from_pool(next_block().decode("utf-8"), paragraph_offsets)
+    ir.run_text = StringColumn.from_pool(next_block().decode("utf-8"), run_offsets)
+    ir.image_member = StringColumn.from_pool(next_block().decode("utf-8"), image_offsets)
+    if offset != len(data):
+      raise ValueError("Document IR has {0} trailing bytes".format(len(data) - offset))
+    ir._check_lengths()
+
+    ir.default_font_size = default_font_size
+    ir.font_histogram.sizes = histogram_sizes
+    ir.font_histogram.colors = histogram_colors
+    return ir
+
+  def _check_lengths(self):
+    """Raise ValueError unless the columns agree on the numbers of chunks, paragraphs and runs"""
+    chunks = self.chunk_count
+    paragraphs = len(self.paragraph_run_start) - 1
+    runs = len(self.run_flags)
+    images = len(self.image_chunk)
+    expected = [
+      (len(self.chunk_character), chunks), (len(self.chunk_source), chunks),
+      (len(self.chunk_paragraph_start), chunks + 1), (len(self.paragraph_text), paragraphs),
+      (len(self.run_text), runs), (len(self.run_size), runs), (len(self.run_color), runs),
+      (len(self.image_source), images), (len(self.image_member), images),
+    ]
+    if paragraphs < 0 or any(length != count for length, count in expected):
+      raise ValueError("Document IR columns have inconsistent lengths")
+    for column in (self.chunk_character, self.paragraph_text, self.run_text, self.image_member):
+      if len(column.offsets) == 0 or column.offsets[-1] != len(column.pool):
+        raise ValueError("Document IR strings do not match their offsets")
+    if self.chunk_paragraph_start[-1] != paragraphs or self.paragraph_run_start[-1] != runs:
+      raise ValueError("Document IR columns have inconsistent lengths")
@@ -0,0 +1,113 @@
+#doc-to-renpy/renpy_doc_convert/labels.py
+from collections import deque
+from typing import Dict, List, Set, Tuple
+
+class LabelReport:
+  """Problems found in the label graph of a project"""
+
+  def __init__(self):
+    # (source, from_label, target) of every jump to a label nobody defines
+    self.undefined_jumps: List[Tuple[str, str, str]] = []
+    # label -> sources defining it, for labels defined more than once
+    self.duplicate_labels: Dict[str, List[str]] = {}
+    # (source, label) of sections no entry label can reach
+    self.unreachable_labels: List[Tuple[str, str]] = []
+
+  @property
+  def ok(self) -> bool:
+    return not (self.undefined_jumps or self.duplicate_labels or self.unreachable_labels)
+
+  def to_dict(self) -> dict:
+    return {
+      "undefined_jumps": [
+        {"source": source, "from_label": from_label, "target": target}
+        for source, from_label, target in self.undefined_jumps
+      ],
+      "duplicate_labels": self.duplicate_labels,
+      "unreachable_labels": [
+        {"source": source, "label": label} for source, label in self.unreachable_labels
+      ],
+    }
+
+  def format_lines(self) -> List[str]:
+    lines = []
+    for source, from_label, target in self.undefined_jumps:
+      lines.append("{0}: label {1} jumps to undefined label '{2}'".format(source, from_label, target))
+    for label, sources in self.duplicate_labels.items():
+      lines.append("label '{0}' is defined {1} times: {2}".format(label, len(sources), ", ".join(sources)))
+    for source, label in self.unreachable_labels:
+      lines.append("{0}: label '{1}' is unreachable".format(source, label))
+    return lines
+
+class LabelGraph:
+  """
+  Labels, jumps and fall-through edges of one or more converted scripts.
+
+  Each document's own label (named after its output file) is an entry
+  point. A `== label ==` section falls through to the next one unless it
+  ended with a menu whose every choice jumps away. Graphs built for single
+  documents (e.g. in worker processes) are combined with merge().
+  """
+
+  def __init__(self):
+    # (source, label) in definition order
+    self.definitions: List[Tuple[str, str]] = []
+    self.entry_labels: List[str] = []
+    # (source, from_label, target)
+    self.jumps: List[Tuple[str, str, str]] = []
+    self.fallthroughs: List[Tuple[str, str]] = []
+
+  def add_label(self, source: str, label: str, entry: bool = False):
+    self.definitions.append((source, label))
+    if entry:
+      self.entry_labels.append(label)
+
+  def add_jump(self, source: str, from_label: str, target: str):
+    self.jumps.append((source, from_label, target))
+
+  def add_fallthrough(self, from_label: str, to_label: str):
+    self.fallthroughs.append((from_label, to_label))
+
+  def merge(self, other: "LabelGraph"):
+    self.definitions.extend(other.definitions)
+    self.entry_labels.extend(other.entry_labels)
+    self.jumps.extend(other.jumps)
+    self.fallthroughs.extend(other.fallthroughs)
+
+  def validate(self) -> LabelReport:
+    """Check the whole graph in time linear in labels plus jumps"""
+    report = LabelReport()
+
+    sources_by_label: Dict[str, List[str]] = {}
+    for source, label in self.definitions:
+      sources_by_label.setdefault(label, []).append(source)
+
+    for label, sources in sources_by_label.items():
+      if len(sources) > 1:
+        report.duplicate_labels[label] = sources
+
+    edges: Dict[str, Set[str]] = {}
+    for source, from_label, target in self.jumps:
+      if target not in sources_by_label:
+        report.undefined_jumps.append((source, from_label, target))
+      edges.setdefault(from_label, set()).add(target)
+    for from_label, to_label in self.fallthroughs:
+      edges.setdefault(from_label, set()).add(to_label)
+
+    roots = list(self.entry_labels)
+    if "start" in sources_by_label:
+      roots.append("start")
+
+    reachable: Set[str] = set(roots)
+    queue = deque(roots)
+    while queue:
+      for target in edges.get(queue.popleft(), ()):
+        if target not in reachable:
+          reachable.add(target)
+          queue.append(target)
+
+    for source, label in self.definitions:
+      if label not in reachable:
+        report.unreachable_labels.append((source, label))
+
+    return report
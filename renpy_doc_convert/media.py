@@ -0,0 +1,187 @@
+#doc-to-renpy/renpy_doc_convert/media.py
+"""
+Pictures embedded in a .docx.
+
+python-docx reads every part of a package into memory when it opens it,
+including the reference images and CGs in word/media/ that the converter
+never looks at. When the pictures are copied out separately anyway,
+open_document() can open a package with those parts left empty; that
+uses python-docx internals, so only with the versions it was written for
+(MEDIA_SKIPPING_DOCX_VERSIONS).
+
+extract_images() copies the pictures out of the package instead, a block
+at a time, into a Ren'Py images directory. Each file is named after a hash
+of its content, so a picture pasted into 40 chapters is written once and
+a picture already in the directory is not written again. Ren'Py defines an
+image for every file there, named after the file, which the renderer can
+show where the picture was in the document.
+"""
+from collections import namedtuple
+from typing import Dict, Iterable, List, Optional
+from zipfile import ZipFile, is_zipfile
+import logging
+import os
+
+import docx
+from docx import Document
+from docx.document import Document as DocumentObject
+from docx.opc.constants import CONTENT_TYPE as CT
+from docx.opc.part import PartFactory
+from docx.oxml.ns import qn
+
+from renpy_doc_convert.fileio import atomic_copy_stream, stream_digest
+
+# python-docx versions whose package reader internals open_document(skip_media=True)
+# was written against (see requirements.txt); other versions read the pictures
+MEDIA_SKIPPING_DOCX_VERSIONS = ("1.1.2",)
+
+def media_skipping_supported() -> bool:
+  return getattr(docx, "__version__", None) in MEDIA_SKIPPING_DOCX_VERSIONS
+
+if media_skipping_supported():
+  from docx.opc.package import Unmarshaller
+  from docx.opc.packuri import PACKAGE_URI
+  from docx.opc.phys_pkg import _ZipPkgReader
+  from docx.opc.pkgreader import PackageReader, _ContentTypeMap
+  from docx.package import Package
+
+MEDIA_DIRECTORY = "word/media/"
+
+# Formats Ren'Py can show; other pictures (e.g. .emf, .wmf, .tiff) are skipped
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".gif", ".bmp", ".webp")
+
+# Extracted files are named <prefix><first hex digits of their sha256><extension>,
+# which is also the name Ren'Py gives the image
+IMAGE_NAME_PREFIX = "docimg_"
+IMAGE_HASH_LENGTH = 16
+
+# Statements RenderOptions.image_statement can write where a picture was
+IMAGE_STATEMENTS = ["show", "scene"]
+
+# A picture in paragraph `source` of a document, placed before chunk
+# `chunk`; `member` is its file in the .docx archive
+ImageRef = namedtuple('ImageRef', ['chunk', 'source', 'member'])
+
+if media_skipping_supported():
+  class _MediaSkippingZipReader(_ZipPkgReader):
+    """Zip package reader that returns the parts in word/media/ as empty blobs"""
+
+    def __new__(cls, pkg_file):
+      # PhysPkgReader.__new__ would pick the reader class itself
+      return object.__new__(cls)
+
+    def blob_for(self, pack_uri):
+      member = pack_uri.membername
+      # Relationship items are looked up for every part, and mostly missing
+      if member.startswith(MEDIA_DIRECTORY) and not member.endswith(".rels"):
+        return b""
+      return super().blob_for(pack_uri)
+
+def _unmarshal_without_media(docx_file_path: str, part_factory) -> "Package":
+  phys_reader = _MediaSkippingZipReader(docx_file_path)
+  try:
+    content_types = _ContentTypeMap.from_xml(phys_reader.content_types_xml)
+    package_rels = PackageReader._srels_for(phys_reader, PACKAGE_URI)
+    parts = PackageReader._load_serialized_parts(phys_reader, package_rels, content_types)
+  finally:
+    phys_reader.close()
+
+  package = Package()
+  Unmarshaller.unmarshal(PackageReader(content_types, package_rels, parts), package, part_factory)
+  return package
+
+def open_document(docx_file_path: str, skip_media: bool = False,
+                  part_factory=PartFactory) -> DocumentObject:
+  """
+  docx.Document(docx_file_path). With skip_media, and a python-docx
+  version in MEDIA_SKIPPING_DOCX_VERSIONS, the pictures in word/media/ are
+  not read, and part_factory(partname, content_type, reltype, blob,
+  package) makes the parts as python-docx's PartFactory does by default.
+  """
+  if not skip_media or not media_skipping_supported() or not is_zipfile(docx_file_path):
+    # Also lets python-docx report a file that is not a zip file
+    return Document(docx_file_path)
+
+  package = _unmarshal_without_media(docx_file_path, part_factory)
+  document_part = package.main_document_part
+  if document_part.content_type != CT.WML_DOCUMENT_MAIN:
+    raise ValueError("file '{0}' is not a Word file, content type is '{1}'".format(
+      docx_file_path, document_part.content_type))
+  return document_part.document
+
+def paragraph_images(document) -> Dict[object, List[str]]:
+  """
+  Archive members of the pictures in the document body, in order, by the
+  outermost paragraph element (w:p) they are in. Empty for documents that
+  are not .docx.
+  """
+  if not isinstance(document, DocumentObject):
+    return {}
+  rels = document.part.rels
+  images: Dict[object, List[str]] = {}
+  for blip in document.element.body.iter(qn("a:blip")):
+    # Linked pictures have r:link instead and are not in the package
+    rel = rels.get(blip.get(qn("r:embed")))
+    if rel is None or rel.is_external:
+      continue
+    paragraphs = list(blip.iterancestors(qn("w:p")))
+    if paragraphs:
+      images.setdefault(paragraphs[-1], []).append(rel.target_part.partname.membername)
+  return images
+
+def image_file_name(digest: str, member: str) -> str:
+  extension = os.path.splitext(member)[1].lower()
+  return IMAGE_NAME_PREFIX + digest[:IMAGE_HASH_LENGTH] + extension
+
+def image_name(file_name: str) -> str:
+  """The name Ren'Py defines for an image file in its images directory"""
+  return os.path.splitext(file_name)[0]
+
+class ExtractedImages:
+  """Outcome of extract_images()"""
+
+  def __init__(self):
+    # Archive member -> Ren'Py image name
+    self.names: Dict[str, str] = {}
+    # Files written, and files that were already there
+    self.written: List[str] = []
+    self.unchanged: List[str] = []
+
+def extract_images(docx_file_path: str, images_dir: str,
+                   members: Optional[Iterable[str]] = None) -> ExtractedImages:
+  """
+  Copy the pictures Ren'Py can show from a .docx to images_dir, named by
+  content hash: the archive members given (e.g. the ImageRef.member of
+  the pictures in the body), or every picture in word/media/. Each picture
+  is streamed twice, to hash it and then only if its file is missing to
+  copy it, so none is ever held in memory.
+  """
+  extracted = ExtractedImages()
+  if not is_zipfile(docx_file_path):
+    return extracted
+  wanted = set(members) if members is not None else None
+  if wanted is not None and not wanted:
+    return extracted
+
+  os.makedirs(images_dir, exist_ok=True)
+  with ZipFile(docx_file_path) as package:
+    for info in package.infolist():
+      member = info.filename
+      if not member.startswith(MEDIA_DIRECTORY) or not member.lower().endswith(IMAGE_EXTENSIONS):
+        continue
+      if wanted is not None and member not in wanted:
+        continue
+      with package.open(info) as stream:
+        file_name = image_file_name(stream_digest(stream), member)
+      path = os.path.join(images_dir, file_name)
+      if os.path.isfile(path) and os.path.getsize(path) == info.file_size:
+        extracted.unchanged.append(path)
+      else:
+        with package.open(info) as stream:
+          atomic_copy_stream(path, stream)
+        extracted.written.append(path)
+      extracted.names[member] = image_name(file_name)
+
+  logging.debug("Images of {0}: {1} written, {2} unchanged".format(
+    docx_file_path, len(extracted.written), len(extracted.unchanged)))
+  return extracted
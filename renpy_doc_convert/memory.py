@@ -0,0 +1,136 @@
+#doc-to-renpy/renpy_doc_convert/memory.py
+"""
+Per-stage memory measurements of a conversion.
+
+A MemoryTracker passed to api.convert() records, for each stage, the peak
+Python heap use seen by tracemalloc while the stage ran and how much of
+what it allocated is still alive when it ends. Where the platform has the
+resource module, the process's RSS high-water mark is recorded too.
+tracemalloc slows conversion down noticeably, so tracking is opt-in.
+"""
+from contextlib import contextmanager, nullcontext
+from typing import Iterator, List, Optional
+import os
+import sys
+import tracemalloc
+
+try:
+  import resource
+except ImportError: # Windows
+  resource = None
+
+STAGE_LOAD = "load"
+STAGE_CONSOLIDATE = "consolidate"
+STAGE_INDEX = "index"
+STAGE_FONT_STANDARDS = "font_standards"
+STAGE_RENDER = "render"
+
+MB = 1024 * 1024
+
+def rss_high_water() -> Optional[int]:
+  """Largest resident set size of this process so far in bytes, None if unknown"""
+  if resource is None:
+    return None
+  max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+  # Kilobytes on Linux, bytes on macOS
+  return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+class StageMemory:
+  def __init__(self, stage: str, peak_bytes: int, retained_bytes: int,
+               rss_bytes: Optional[int] = None):
+    self.stage = stage
+    # Peak traced heap while the stage ran, including what earlier stages left
+    self.peak_bytes = peak_bytes
+    # Traced heap the stage allocated and did not free
+    self.retained_bytes = retained_bytes
+    self.rss_bytes = rss_bytes
+
+  def to_dict(self) -> dict:
+    return {
+      "stage": self.stage,
+      "peak_bytes": self.peak_bytes,
+      "retained_bytes": self.retained_bytes,
+      "rss_bytes": self.rss_bytes,
+    }
+
+  @classmethod
+  def from_dict(cls, data: dict) -> "StageMemory":
+    return cls(data["stage"], data["peak_bytes"], data["retained_bytes"], data.get("rss_bytes"))
+
+class MemoryTracker:
+  """Collects StageMemory records for the conversion of one file"""
+
+  def __init__(self, source: str = ""):
+    self.source = source
+    self.input_bytes = os.path.getsize(source) if source and os.path.isfile(source) else 0
+    self.stages: List[StageMemory] = []
+    # Traced heap still held at the end of the last stage, compared to
+    # before the first one
+    self.retained_bytes = 0
+    self._baseline: Optional[int] = None
+    self._started_tracing = False
+
+  def start(self):
+    if not tracemalloc.is_tracing():
+      tracemalloc.start()
+      self._started_tracing = True
+
+  def stop(self):
+    if self._started_tracing:
+      tracemalloc.stop()
+      self._started_tracing = False
+
+  @contextmanager
+  def stage(self, name: str) -> Iterator[None]:
+    self.start()
+    before, _ = tracemalloc.get_traced_memory()
+    if self._baseline is None:
+      self._baseline = before
+    tracemalloc.reset_peak()
+    try:
+      yield
+    finally:
+      current, peak = tracemalloc.get_traced_memory()
+      self.stages.append(StageMemory(name, peak, current - before, rss_high_water()))
+      self.retained_bytes = current - self._baseline
+
+  @property
+  def peak_bytes(self) -> int:
+    return max((stage.peak_bytes for stage in self.stages), default=0)
+
+  def peak_per_input_mb(self) -> float:
+    """Peak traced heap in bytes per MB of input file"""
+    if not self.input_bytes:
+      return 0.0
+    return self.peak_bytes / (self.input_bytes / MB)
+
+  def to_dict(self) -> dict:
+    return {
+      "source": self.source,
+      "input_bytes": self.input_bytes,
+      "peak_bytes": self.peak_bytes,
+      "retained_bytes": self.retained_bytes,
+      "stages": [stage.to_dict() for stage in self.stages],
+    }
+
+  @classmethod
+  def from_dict(cls, data: dict) -> "MemoryTracker":
+    tracker = cls()
+    tracker.source = data["source"]
+    tracker.input_bytes = data["input_bytes"]
+    tracker.retained_bytes = data["retained_bytes"]
+    tracker.stages = [StageMemory.from_dict(stage) for stage in data["stages"]]
+    return tracker
+
+  def format_lines(self) -> List[str]:
+    lines = ["{0}: peak {1:.1f} MB, retained {2:.1f} MB ({3:.2f} MB input)".format(
+      self.source, self.peak_bytes / MB, self.retained_bytes / MB, self.input_bytes / MB)]
+    for stage in self.stages:
+      rss = " rss {0:.1f} MB".format(stage.rss_bytes / MB) if stage.rss_bytes is not None else ""
+      lines.append("  {0:<15} peak {1:8.1f} MB  retained {2:8.1f} MB{3}".format(
+        stage.stage, stage.peak_bytes / MB, stage.retained_bytes / MB, rss))
+    return lines
+
+def measure(tracker: Optional[MemoryTracker], stage: str):
+  """Context manager recording `stage` on tracker, or doing nothing without one"""
+  return tracker.stage(stage) if tracker is not None else nullcontext()
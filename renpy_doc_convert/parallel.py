@@ -0,0 +1,114 @@
+#doc-to-renpy/renpy_doc_convert/parallel.py
+"""
+Parsing one large document in several worker processes.
+
+Consolidation looks at one paragraph at a time, so the body can be cut into
+paragraph ranges that workers consolidate independently into DocumentIRs,
+which are then joined in order. The only state carried between paragraphs
+is an open Characters{} block; if one spans a cut, the split result is
+discarded and the document is parsed serially instead.
+
+Every worker opens the whole .docx again before consolidating its ranges,
+so this only pays off for documents whose consolidation costs much more
+than loading them. It is never the default: callers ask for it with
+workers > 1 (the CLI's -j for a single document).
+
+Rendering stays in the calling process: it needs the whole document for
+the font baseline, the character table and menu lookahead, and it is a
+small fraction of the conversion time once the IR exists.
+"""
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import List, Optional, Tuple
+import logging
+
+from renpy_doc_convert.consolidate import Consolidate
+from renpy_doc_convert.ir import DocumentIR
+from renpy_doc_convert.progress import STAGE_INDEXING, STAGE_PARSING, ProgressReporter
+from renpy_doc_convert.styles import load_document
+
+# Documents with fewer paragraphs are parsed serially; below this the
+# worker start-up cost outweighs the gain
+PARALLEL_MIN_PARAGRAPHS = 2000
+
+# Each worker gets about this many ranges so an uneven document still
+# keeps every worker busy
+RANGES_PER_WORKER = 2
+
+# Seconds between cancellation checks while waiting for workers
+CANCEL_POLL_SECONDS = 0.1
+
+def split_ranges(count: int, parts: int) -> List[Tuple[int, int]]:
+  """Split 0 .. count - 1 into at most `parts` contiguous (start, end) ranges"""
+  parts = max(1, min(parts, count))
+  size, extra = divmod(count, parts)
+  ranges = []
+  start = 0
+  for part in range(parts):
+    end = start + size + (1 if part < extra else 0)
+    ranges.append((start, end))
+    start = end
+  return ranges
+
+def _parse_range(job: Tuple[str, int, int, bool]) -> Tuple[bytes, bool]:
+  docx_file_path, start, end, skip_media = job
+  document = load_document(docx_file_path, skip_media)
+  obj = Consolidate(document, start, end)
+  obj.consolidate_paragraphs()
+  ir = DocumentIR.from_chunks(obj.text_chunks, font_histogram=obj.font_histogram, images=obj.images)
+  return ir.to_bytes(), obj.ends_in_character_block
+
+def parse_parallel(docx_file_path: str, paragraph_count: int, default_font_size: float,
+                   workers: int, progress: Optional[ProgressReporter] = None,
+                   min_paragraphs: int = PARALLEL_MIN_PARAGRAPHS,
+                   skip_media: bool = False) -> Optional[DocumentIR]:
+  """
+  The same DocumentIR a serial parse builds, consolidated in `workers`
+  processes. Returns None when the document has to be parsed serially.
+  skip_media is passed to styles.load_document in the workers.
+  Progress is reported as ranges finish; on cancellation, ranges that have
+  not started are dropped and the running ones are left to finish.
+  """
+  if workers < 2 or paragraph_count < max(1, min_paragraphs):
+    return None
+
+  ranges = split_ranges(paragraph_count, workers * RANGES_PER_WORKER)
+  jobs = [(docx_file_path, start, end, skip_media) for start, end in ranges]
+  logging.debug("Parsing {0} paragraphs in {1} range(s) with {2} worker(s)".format(
+    paragraph_count, len(ranges), workers))
+
+  if progress is not None:
+    progress.start(STAGE_PARSING, paragraph_count)
+
+  pool = ProcessPoolExecutor(max_workers=workers)
+  try:
+    futures = [pool.submit(_parse_range, job) for job in jobs]
+    pending = set(futures)
+    while pending:
+      done, pending = wait(pending, timeout=CANCEL_POLL_SECONDS, return_when=FIRST_COMPLETED)
+      if progress is None:
+        continue
+      if done:
+        progress.update(sum(end - start for (start, end), future in zip(ranges, futures)
+                            if future.done()), force=True)
+      else:
+        progress.check_cancelled()
+    parts = [future.result() for future in futures]
+  except BaseException:
+    pool.shutdown(wait=False, cancel_futures=True)
+    raise
+  pool.shutdown()
+
+  if progress is not None:
+    progress.start(STAGE_INDEXING, len(parts))
+
+  ir = DocumentIR()
+  ir.default_font_size = default_font_size
+  for index, (data, ends_in_character_block) in enumerate(parts):
+    if ends_in_character_block and index != len(parts) - 1:
+      logging.debug("A Characters{{}} block spans paragraph {0}, parsing serially".format(ranges[index][1]))
+      return None
+    ir.extend(DocumentIR.from_bytes(data))
+    if progress is not None:
+      progress.update(index + 1, force=True)
+
+  return ir
@@ -0,0 +1,110 @@
+#doc-to-renpy/renpy_doc_convert/preview.py
+"""
+Previews of a script while its document is still being parsed.
+
+A PreviewStream is called by Consolidate as paragraphs are consolidated.
+It adds the chunks found so far to a DocumentIR and renders that: first
+after a screenful of paragraphs, then each time the parsed part of the
+document has doubled. The parse stage finishes the same IR instead of
+indexing every chunk afterwards, so previews only add the cost of
+rendering, which is small from an IR.
+
+Each preview usually only adds lines to the one before; when earlier lines
+changed (the font baseline moved, say), the whole text is sent again.
+"""
+from typing import Callable, List, Optional
+import logging
+
+from renpy_doc_convert.consolidate import TextChunk, TextType
+from renpy_doc_convert.ir import DocumentIR
+from renpy_doc_convert.progress import STAGE_INDEXING, ProgressReporter
+from renpy_doc_convert.styles import document_default_size
+from renpy_doc_convert.to_renpy import ConvertToRenpy
+
+# Paragraphs parsed before the first preview, about one screen of script
+PREVIEW_FIRST_PARAGRAPHS = 60
+
+# Each later preview waits until this many times as many paragraphs are
+# parsed, so all previews together cost about two renders
+PREVIEW_GROWTH = 2
+
+# callback(text, replace): text to append to the preview shown so far, or
+# with replace, the whole preview
+PreviewCallback = Callable[[str, bool], None]
+
+def settled_chunk_count(chunks: List[TextChunk]) -> int:
+  """
+  Number of leading chunks whose rendering cannot change when more follow:
+  a trailing dialogue line could still turn out to be a menu prompt, and
+  trailing menu choices could still be joined by more
+  """
+  end = len(chunks)
+  while end and chunks[end - 1].text_type == TextType.MENU_CHOICE:
+    end -= 1
+  if end and chunks[end - 1].text_type == TextType.DIALOGUE:
+    end -= 1
+  return end
+
+class PreviewStream:
+
+  def __init__(self, renpy_file_path: str, callback: PreviewCallback,
+               first_paragraphs: int = PREVIEW_FIRST_PARAGRAPHS):
+    # Only used for the document's label; nothing is written
+    self.renpy_file_path = renpy_file_path
+    self.callback = callback
+    self.next_preview = max(1, first_paragraphs)
+    self.ir = DocumentIR()
+    self.text: Optional[str] = None
+
+  def __call__(self, consolidate, done: int):
+    """Consolidate reports that its first `done` paragraphs are consolidated"""
+    if done < self.next_preview or done == len(consolidate.doc_paragraphs):
+      # The finished script is rendered by the render stage
+      return
+    self.next_preview = done * PREVIEW_GROWTH
+
+    if self.text is None:
+      self.ir.default_font_size = document_default_size(consolidate.document)
+    self.add_chunks(consolidate.text_chunks)
+    settled = settled_chunk_count(consolidate.text_chunks[:self.ir.chunk_count])
+    renderer = ConvertToRenpy(self.ir, self.ir.chunks(0, settled), self.renpy_file_path,
+                              font_histogram=consolidate.font_histogram)
+    self.show(renderer.render_sections()[0][1])
+
+  def add_chunks(self, chunks: List[TextChunk], progress: Optional[ProgressReporter] = None,
+                 complete: bool = False):
+    """
+    Index the chunks not in the IR yet; unless complete, a Characters{}
+    block at the end is left out as it may still grow
+    """
+    end = len(chunks)
+    if not complete and end and chunks[end - 1].text_type == TextType.CHARACTER_DEF:
+      end -= 1
+    start = self.ir.chunk_count
+    if progress is not None:
+      progress.start(STAGE_INDEXING, end - start)
+    for done, chunk in enumerate(chunks[start:end]):
+      if progress is not None:
+        progress.update(done)
+      self.ir.add_chunk(chunk)
+    if progress is not None:
+      progress.finish()
+
+  def finish_ir(self, consolidate, default_font_size: float,
+                progress: Optional[ProgressReporter] = None) -> DocumentIR:
+    """The IR of the whole document, the same as DocumentIR.from_chunks() builds"""
+    self.add_chunks(consolidate.text_chunks, progress, complete=True)
+    self.ir.default_font_size = default_font_size
+    self.ir.font_histogram = consolidate.font_histogram
+    self.ir.add_images(consolidate.images)
+    return self.ir
+
+  def show(self, text: str):
+    if self.text is not None and text.startswith(self.text):
+      added = text[len(self.text):]
+      if added:
+        self.callback(added, False)
+    else:
+      logging.debug("Sending the whole preview of {0} again".format(self.renpy_file_path))
+      self.callback(text, True)
+    self.text = text
@@ -0,0 +1,251 @@
+#doc-to-renpy/renpy_doc_convert/profiling.py
+"""
+Function-level profiles of a conversion.
+
+Where timings.ConversionTimings says which stage is slow, a
+ConversionProfiler says which functions inside it are. Two modes:
+
+- cprofile: every call is counted by cProfile. Precise, but it slows the
+  conversion down several times. Writes a .pstats file (for pstats,
+  snakeviz, ...) and collapsed stacks rebuilt from the caller graph.
+- sample: the converting thread's stack is recorded every few
+  milliseconds, from a SIGPROF timer on the main thread of a Unix process
+  and from a background thread otherwise. It costs little even on long
+  runs. It writes collapsed stacks only.
+
+Collapsed stacks are one `frame;frame;...;frame count` line per stack,
+the input format of flamegraph.pl, speedscope and inferno. Profiles name
+functions and source files only (directories are stripped), never the
+document's text, so they can be shared when a document cannot.
+"""
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Tuple
+import cProfile
+import hashlib
+import os
+import pstats
+import signal
+import sys
+import threading
+import time
+
+from renpy_doc_convert.fileio import atomic_write_text
+
+PROFILE_CPROFILE = "cprofile"
+PROFILE_SAMPLE = "sample"
+PROFILE_MODES = [PROFILE_CPROFILE, PROFILE_SAMPLE]
+
+# Seconds between samples
+SAMPLE_INTERVAL = 0.005
+
+# Stacks deeper than this are cut at the root end
+MAX_STACK_DEPTH = 200
+
+# Collapsed stacks rebuilt from cProfile count microseconds; branches
+# below this many are dropped
+MIN_COLLAPSED_MICROSECONDS = 10
+
+PSTATS_SUFFIX = ".pstats"
+COLLAPSED_SUFFIX = ".collapsed.txt"
+
+# Hex digits of the document path's hash in profile file names
+PROFILE_PATH_HASH_LENGTH = 8
+
+# cProfile hooks cannot be nested; profiled conversions run one at a time
+_cprofile_lock = threading.Lock()
+
+def profile_prefix(profile_dir: str, docx_file_path: str) -> str:
+  """
+  <profile_dir>/<document name>-<path hash>-<time>, the prefix of a
+  conversion's profile files. Documents with the same name in different
+  directories, and later runs of one document, get files of their own.
+  """
+  path_hash = hashlib.sha256(os.path.abspath(docx_file_path).encode("utf-8")).hexdigest()
+  name = "{0}-{1}-{2}".format(os.path.splitext(os.path.basename(docx_file_path))[0],
+                              path_hash[:PROFILE_PATH_HASH_LENGTH], time.strftime("%Y%m%d-%H%M%S"))
+  return os.path.join(profile_dir, name)
+
+def frame_label(filename: str, line: int, function: str) -> str:
+  """`function (file:line)`, without the file's directory"""
+  if filename == "~":
+    # Built-in functions
+    return function
+  return "{0} ({1}:{2})".format(function, os.path.basename(filename), line)
+
+def collapsed_from_stats(stats: pstats.Stats) -> Counter:
+  """
+  Collapsed stacks (in microseconds) approximated from a cProfile caller
+  graph: a function's time is split between its callers, and its own
+  callees, in proportion to each call edge's cumulative time
+  """
+  raw = stats.stats
+  callees: Dict[tuple, List[Tuple[tuple, float]]] = defaultdict(list)
+  for function, (_, _, _, _, callers) in raw.items():
+    for caller, edge in callers.items():
+      callees[caller].append((function, edge[3]))
+  roots = [function for function, (_, _, _, _, callers) in raw.items() if not callers]
+
+  stacks: Counter = Counter()
+
+  def walk(function: tuple, path: List[str], on_path: set, share: float):
+    _, _, own_seconds, total_seconds, _ = raw[function]
+    if total_seconds * share * 1e6 < MIN_COLLAPSED_MICROSECONDS:
+      return
+    path.append(frame_label(*function))
+    on_path.add(function)
+    microseconds = int(own_seconds * share * 1e6)
+    if microseconds:
+      stacks[";".join(path)] += microseconds
+    if len(path) < MAX_STACK_DEPTH:
+      for callee, edge_seconds in callees[function]:
+        # Recursive calls are already counted in the outer frame
+        if callee not in on_path and raw[callee][3]:
+          walk(callee, path, on_path, share * edge_seconds / raw[callee][3])
+    on_path.discard(function)
+    path.pop()
+
+  for root in roots:
+    walk(root, [], set(), 1.0)
+  return stacks
+
+class StackSampler:
+  """Counts sampled stacks of one thread"""
+
+  def __init__(self, interval: float = SAMPLE_INTERVAL):
+    self.interval = interval
+    self.stacks: Counter = Counter()
+    self.samples = 0
+
+  def record(self, frame):
+    path = []
+    while frame is not None and len(path) < MAX_STACK_DEPTH:
+      code = frame.f_code
+      path.append(frame_label(code.co_filename, code.co_firstlineno, code.co_name))
+      frame = frame.f_back
+    path.reverse()
+    self.stacks[";".join(path)] += 1
+    self.samples += 1
+
+class SignalSampler(StackSampler):
+  """
+  Samples the main thread from a SIGPROF handler every `interval` seconds
+  of CPU time. Unix only.
+  """
+
+  def start(self):
+    self._previous_handler = signal.signal(signal.SIGPROF, self._on_signal)
+    signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+
+  def stop(self):
+    signal.setitimer(signal.ITIMER_PROF, 0)
+    signal.signal(signal.SIGPROF, self._previous_handler)
+
+  def _on_signal(self, signum, frame):
+    self.record(frame)
+
+class ThreadSampler(StackSampler):
+  """
+  Samples another thread from a background thread. A sample can only be
+  taken while the sampled thread lets go of the GIL, so code that
+  releases it often (lxml's XPath calls, file reads) is over-counted.
+  """
+
+  def __init__(self, thread_id: int, interval: float = SAMPLE_INTERVAL):
+    super().__init__(interval)
+    self.thread_id = thread_id
+    self._stop = threading.Event()
+    self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+  def start(self):
+    self._thread.start()
+
+  def stop(self):
+    self._stop.set()
+    self._thread.join()
+
+  def _run(self):
+    while not self._stop.wait(self.interval):
+      frame = sys._current_frames().get(self.thread_id)
+      if frame is not None:
+        self.record(frame)
+
+class ConversionProfiler:
+  """
+  Profiles the code run in the calling thread between start() and stop(),
+  or inside a `with` block
+  """
+
+  def __init__(self, mode: str = PROFILE_CPROFILE, interval: float = SAMPLE_INTERVAL):
+    if mode not in PROFILE_MODES:
+      raise ValueError("Unknown profile mode {0!r}, expected one of {1}".format(mode, PROFILE_MODES))
+    self.mode = mode
+    self.interval = interval
+    self._profile: Optional[cProfile.Profile] = None
+    self._sampler: Optional[StackSampler] = None
+
+  def start(self):
+    if self.mode == PROFILE_CPROFILE:
+      _cprofile_lock.acquire()
+      self._profile = cProfile.Profile()
+      self._profile.enable()
+    elif threading.current_thread() is threading.main_thread() and hasattr(signal, "setitimer"):
+      self._sampler = SignalSampler(self.interval)
+      self._sampler.start()
+    else:
+      self._sampler = ThreadSampler(threading.get_ident(), self.interval)
+      self._sampler.start()
+
+  def stop(self):
+    if self._profile is not None:
+      self._profile.disable()
+      _cprofile_lock.release()
+    if self._sampler is not None:
+      self._sampler.stop()
+
+  def __enter__(self) -> "ConversionProfiler":
+    self.start()
+    return self
+
+  def __exit__(self, *exc_info):
+    self.stop()
+
+  def stats(self) -> Optional[pstats.Stats]:
+    """cProfile statistics with directories stripped, None when sampling"""
+    if self._profile is None:
+      return None
+    return pstats.Stats(self._profile).strip_dirs()
+
+  def collapsed_stacks(self) -> Counter:
+    """Stack -> microseconds (cprofile) or samples (sample)"""
+    if self._sampler is not None:
+      return self._sampler.stacks
+    return collapsed_from_stats(pstats.Stats(self._profile))
+
+  def write(self, output_prefix: str) -> List[str]:
+    """Write <prefix>.pstats (cprofile only) and <prefix>.collapsed.txt; returns their paths"""
+    paths = []
+    stats = self.stats()
+    if stats is not None:
+      stats.dump_stats(output_prefix + PSTATS_SUFFIX)
+      paths.append(output_prefix + PSTATS_SUFFIX)
+    lines = ["{0} {1}\n".format(stack, count) for stack, count in sorted(self.collapsed_stacks().items())]
+    atomic_write_text(output_prefix + COLLAPSED_SUFFIX, "".join(lines))
+    paths.append(output_prefix + COLLAPSED_SUFFIX)
+    return paths
+
+  def top_functions(self, limit: int = 10) -> List[Tuple[str, float]]:
+    """(function, share of the profile spent in the function itself), largest first"""
+    own: Counter = Counter()
+    for stack, count in self.collapsed_stacks().items():
+      own[stack.rsplit(";", 1)[-1]] += count
+    total = sum(own.values())
+    if not total:
+      return []
+    return [(function, count / total) for function, count in own.most_common(limit)]
+
+  def format_lines(self, limit: int = 10) -> List[str]:
+    unit = "samples" if self._sampler is not None else "time"
+    lines = ["Top functions by own {0}:".format(unit)]
+    for function, share in self.top_functions(limit):
+      lines.append("  {0:6.1%}  {1}".format(share, function))
+    return lines
@@ -0,0 +1,97 @@
+#doc-to-renpy/renpy_doc_convert/progress.py
+import threading
+from typing import Callable, Optional
+
+STAGE_PARSING = "parsing"
+STAGE_INDEXING = "indexing"
+STAGE_RENDERING = "rendering"
+
+# Share of a conversion's time spent in each stage, measured on large
+# documents; used to turn per-stage progress into one overall fraction
+STAGE_WEIGHTS = {
+  STAGE_PARSING: 0.48,
+  STAGE_INDEXING: 0.48,
+  STAGE_RENDERING: 0.04,
+}
+STAGE_ORDER = [STAGE_PARSING, STAGE_INDEXING, STAGE_RENDERING]
+
+# Report progress every this many paragraphs or chunks
+PROGRESS_INTERVAL = 250
+
+# callback(stage, done, total)
+ProgressCallback = Callable[[str, int, int], None]
+
+class ConversionCancelled(Exception):
+  """Raised inside a conversion whose CancellationToken was cancelled"""
+
+class CancellationToken:
+  """
+  Lets another thread stop a running conversion. The converter checks it
+  between paragraphs and chunks and raises ConversionCancelled.
+  """
+
+  def __init__(self):
+    self._event = threading.Event()
+
+  def cancel(self):
+    self._event.set()
+
+  @property
+  def cancelled(self) -> bool:
+    return self._event.is_set()
+
+  def raise_if_cancelled(self):
+    if self._event.is_set():
+      raise ConversionCancelled("Conversion cancelled")
+
+class ProgressReporter:
+  """Passed through the conversion stages to report progress and check for cancellation"""
+
+  def __init__(self, callback: Optional[ProgressCallback] = None,
+               cancel_token: Optional[CancellationToken] = None,
+               interval: int = PROGRESS_INTERVAL):
+    self.callback = callback
+    self.cancel_token = cancel_token
+    self.interval = max(1, interval)
+    self.stage = ""
+    self.total = 0
+
+  def check_cancelled(self):
+    if self.cancel_token is not None:
+      self.cancel_token.raise_if_cancelled()
+
+  def start(self, stage: str, total: int):
+    self.stage = stage
+    self.total = total
+    self.check_cancelled()
+    if self.callback is not None:
+      self.callback(stage, 0, total)
+
+  def update(self, done: int, force: bool = False):
+    """Check for cancellation, and report every `interval` items (always when forced)"""
+    self.check_cancelled()
+    if self.callback is not None and done and (force or done % self.interval == 0 or done == self.total):
+      self.callback(self.stage, done, self.total)
+
+  def finish(self):
+    self.update(self.total)
+
+def overall_fraction(stage: str, done: int, total: int) -> float:
+  """Fraction of a whole conversion finished when `stage` is at done/total"""
+  if stage not in STAGE_WEIGHTS:
+    return 0.0
+  finished = sum(STAGE_WEIGHTS[s] for s in STAGE_ORDER[:STAGE_ORDER.index(stage)])
+  stage_fraction = done / total if total else 1.0
+  return min(1.0, finished + STAGE_WEIGHTS[stage] * stage_fraction)
+
+def eta_seconds(elapsed: float, fraction: float) -> Optional[float]:
+  """Estimated seconds left after `elapsed` seconds for `fraction` of the work"""
+  if fraction <= 0:
+    return None
+  return elapsed * (1 - fraction) / fraction
+
+def format_eta(seconds: Optional[float]) -> str:
+  if seconds is None:
+    return "estimating"
+  minutes, seconds = divmod(int(seconds + 0.5), 60)
+  return "about {0}m{1:02d}s left".format(minutes, seconds) if minutes else "about {0}s left".format(seconds)
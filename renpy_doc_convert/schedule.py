@@ -0,0 +1,57 @@
+#doc-to-renpy/renpy_doc_convert/schedule.py
+"""
+Work estimates for scheduling and timing batches.
+
+Conversion time grows with the size of a document's main XML part, which
+a .docx records in its zip central directory. Reading it costs one small
+read at the end of the file, so every document of a batch can be sized
+before any is converted.
+"""
+from typing import List, Optional, Sequence
+import logging
+import os
+import zipfile
+
+DOCUMENT_PART = "word/document.xml"
+
+def expected_work(docx_file_path: str) -> int:
+  """
+  Uncompressed size of the document part, or the file size when it cannot
+  be read (missing part, not a zip); 0 for a missing file.
+  """
+  try:
+    with zipfile.ZipFile(docx_file_path) as archive:
+      return archive.getinfo(DOCUMENT_PART).file_size
+  except (OSError, KeyError, zipfile.BadZipFile) as e:
+    logging.debug("Could not size {0} from its zip directory: {1}".format(docx_file_path, e))
+  try:
+    return os.path.getsize(docx_file_path)
+  except OSError:
+    return 0
+
+def largest_first(weights: Sequence[int]) -> List[int]:
+  """Indices of `weights` from the most to the least expected work, ties in input order"""
+  return sorted(range(len(weights)), key=lambda index: -weights[index])
+
+class BatchEstimate:
+  """Fraction done and time left of a batch, weighted by expected work"""
+
+  def __init__(self, weights: Sequence[int]):
+    # Every document counts for something, even an empty one
+    self.weights = [max(1, weight) for weight in weights]
+    self.total = sum(self.weights)
+    self.done = 0
+
+  def finish(self, index: int):
+    """Count the document at `index` as converted"""
+    self.done += self.weights[index]
+
+  def fraction(self, index: Optional[int] = None, document_fraction: float = 0.0) -> float:
+    """
+    Share of the batch finished, adding `document_fraction` of the document
+    at `index` when it is partly converted
+    """
+    if not self.total:
+      return 1.0
+    partial = self.weights[index] * document_fraction if index is not None else 0
+    return min(1.0, (self.done + partial) / self.total)
@@ -0,0 +1,208 @@
+#doc-to-renpy/renpy_doc_convert/sourcemap.py
+"""
+Source maps from the lines of a rendered script to document paragraphs.
+
+ConvertToRenpy records, for each output file, which lines each chunk
+wrote. A line maps to the index in document.paragraphs of the paragraph
+its chunk started at, or NO_SOURCE for lines the renderer generated on its
+own (the document's label statement).
+
+Because a map splits a script into the blocks each paragraph produced,
+line_patches() can compare two renderings of a document block by block
+and return just the line ranges that differ, e.g. to update a text view
+in place after the document was reconverted.
+"""
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter, namedtuple
+from difflib import SequenceMatcher
+from typing import List, Optional, Tuple
+
+NO_SOURCE = -1
+
+# Changed regions without a unit unique to both sides are diffed with
+# difflib up to this many units (blocks or lines) a side, which can take
+# quadratic time; larger ones are replaced as a whole
+MAX_DIFF_UNITS = 2000
+
+# Replace lines start .. end - 1 (0-based) of the old text with `text`
+LinePatch = namedtuple('LinePatch', ['start', 'end', 'text'])
+
+class SourceMap:
+  """
+  Output line ranges of one script: entry k covers lines
+  line_start[k] .. line_start[k + 1] - 1 (the last entry runs to
+  line_count - 1) and came from paragraph source[k].
+  """
+
+  def __init__(self):
+    self.line_start = array("I")
+    self.source = array("i")
+    self.line_count = 0
+
+  def mark(self, line: int, source: int):
+    """Lines from `line` on come from paragraph `source`"""
+    if self.source and self.line_start[-1] == line:
+      # The previous entry wrote no lines
+      self.line_start.pop()
+      self.source.pop()
+    if self.source and self.source[-1] == source:
+      return
+    self.line_start.append(line)
+    self.source.append(source)
+
+  def finish(self, line_count: int):
+    if self.source and self.line_start[-1] == line_count:
+      self.line_start.pop()
+      self.source.pop()
+    self.line_count = line_count
+
+  def __len__(self) -> int:
+    return len(self.source)
+
+  def entry_lines(self, entry: int) -> Tuple[int, int]:
+    """(first line, line after the last) of an entry"""
+    end = self.line_start[entry + 1] if entry + 1 < len(self.source) else self.line_count
+    return self.line_start[entry], end
+
+  def entry_at(self, line: int) -> Optional[int]:
+    """Entry covering a 0-based line, None outside the script"""
+    if not 0 <= line < self.line_count:
+      return None
+    entry = bisect_right(self.line_start, line) - 1
+    return entry if entry >= 0 else None
+
+  def source_at(self, line: int) -> int:
+    """Paragraph a 0-based line came from, NO_SOURCE if none"""
+    entry = self.entry_at(line)
+    return self.source[entry] if entry is not None else NO_SOURCE
+
+  def lines_from(self, line: int) -> Optional[Tuple[int, int]]:
+    """Line range written by the same paragraph as a 0-based line"""
+    entry = self.entry_at(line)
+    if entry is None or self.source[entry] == NO_SOURCE:
+      return None
+    return self.entry_lines(entry)
+
+  def blocks(self, text: str) -> List[str]:
+    """Split the script this map describes into the text of each entry"""
+    lines = text.splitlines(keepends=True)
+    blocks = []
+    if self.source and self.line_start[0] > 0:
+      blocks.append("".join(lines[:self.line_start[0]]))
+    for entry in range(len(self.source)):
+      start, end = self.entry_lines(entry)
+      blocks.append("".join(lines[start:end]))
+    return blocks
+
+  def to_dict(self) -> dict:
+    return {
+      "line_start": self.line_start.tolist(),
+      "source": self.source.tolist(),
+      "line_count": self.line_count,
+    }
+
+  @classmethod
+  def from_dict(cls, data: dict) -> "SourceMap":
+    source_map = cls()
+    source_map.line_start = array("I", data["line_start"])
+    source_map.source = array("i", data["source"])
+    source_map.line_count = data["line_count"]
+    return source_map
+
+def _line_count(unit: str) -> int:
+  return unit.count("\n") + (not unit.endswith("\n"))
+
+def _units(text: str, source_map: Optional[SourceMap]) -> List[str]:
+  """The blocks of a mapped script, otherwise its lines"""
+  if source_map is not None and source_map.line_count == text.count("\n"):
+    return source_map.blocks(text)
+  return text.splitlines(keepends=True)
+
+def _unique_anchors(old: List[str], new: List[str], old_lo: int, old_hi: int,
+                    new_lo: int, new_hi: int) -> List[Tuple[int, int]]:
+  """
+  Positions (old, new) of units that occur once on each side, keeping the
+  longest run that is in the same order on both (patience diff)
+  """
+  old_counts = Counter(old[old_lo:old_hi])
+  new_counts = Counter(new[new_lo:new_hi])
+  new_index = {new[j]: j for j in range(new_lo, new_hi) if new_counts[new[j]] == 1}
+  pairs = [
+    (i, new_index[old[i]]) for i in range(old_lo, old_hi)
+    if old_counts[old[i]] == 1 and old[i] in new_index
+  ]
+
+  # Longest increasing subsequence of the new positions
+  tails: List[int] = []
+  tail_pair: List[int] = []
+  previous = [-1] * len(pairs)
+  for k, (_, j) in enumerate(pairs):
+    position = bisect_left(tails, j)
+    if position == len(tails):
+      tails.append(j)
+      tail_pair.append(k)
+    else:
+      tails[position] = j
+      tail_pair[position] = k
+    previous[k] = tail_pair[position - 1] if position else -1
+  anchors = []
+  k = tail_pair[-1] if tail_pair else -1
+  while k != -1:
+    anchors.append(pairs[k])
+    k = previous[k]
+  anchors.reverse()
+  return anchors
+
+def _diff_units(old: List[str], new: List[str], old_lo: int, old_hi: int, new_lo: int, new_hi: int,
+                changes: List[Tuple[int, int, int, int]]):
+  """Append the (old_lo, old_hi, new_lo, new_hi) ranges that differ to changes, in order"""
+  # Reconversions mostly change a few paragraphs; match the unchanged
+  # start and end directly
+  while old_lo < old_hi and new_lo < new_hi and old[old_lo] == new[new_lo]:
+    old_lo += 1
+    new_lo += 1
+  while old_lo < old_hi and new_lo < new_hi and old[old_hi - 1] == new[new_hi - 1]:
+    old_hi -= 1
+    new_hi -= 1
+  if old_lo == old_hi or new_lo == new_hi:
+    if old_lo != old_hi or new_lo != new_hi:
+      changes.append((old_lo, old_hi, new_lo, new_hi))
+    return
+
+  anchors = _unique_anchors(old, new, old_lo, old_hi, new_lo, new_hi)
+  if anchors:
+    for old_anchor, new_anchor in anchors:
+      _diff_units(old, new, old_lo, old_anchor, new_lo, new_anchor, changes)
+      old_lo = old_anchor + 1
+      new_lo = new_anchor + 1
+    _diff_units(old, new, old_lo, old_hi, new_lo, new_hi, changes)
+  elif old_hi - old_lo > MAX_DIFF_UNITS or new_hi - new_lo > MAX_DIFF_UNITS:
+    changes.append((old_lo, old_hi, new_lo, new_hi))
+  else:
+    matcher = SequenceMatcher(None, old[old_lo:old_hi], new[new_lo:new_hi], autojunk=False)
+    for tag, old_start, old_end, new_start, new_end in matcher.get_opcodes():
+      if tag != "equal":
+        changes.append((old_lo + old_start, old_lo + old_end, new_lo + new_start, new_lo + new_end))
+
+def line_patches(old_text: str, new_text: str, old_map: Optional[SourceMap] = None,
+                 new_map: Optional[SourceMap] = None) -> List[LinePatch]:
+  """
+  Patches turning old_text into new_text, in order and in old_text's line
+  numbers; apply them from the last to the first. With the maps of both
+  texts whole paragraph blocks are compared instead of single lines, which
+  is faster and keeps each patch to the paragraphs that changed. A map that
+  does not fit its text (e.g. one for a stale output) is ignored.
+  """
+  old_units = _units(old_text, old_map)
+  new_units = _units(new_text, new_map)
+  changes: List[Tuple[int, int, int, int]] = []
+  _diff_units(old_units, new_units, 0, len(old_units), 0, len(new_units), changes)
+
+  old_line = [0]
+  for unit in old_units:
+    old_line.append(old_line[-1] + _line_count(unit))
+  return [
+    LinePatch(old_line[old_lo], old_line[old_hi], "".join(new_units[new_lo:new_hi]))
+    for old_lo, old_hi, new_lo, new_hi in changes
+  ]
@@ -0,0 +1,247 @@
+#doc-to-renpy/renpy_doc_convert/store.py
+import atexit
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Set
+
+from renpy_doc_convert.fileio import atomic_write_bytes, atomic_write_text, file_digest
+
+# Bump whenever the converter output for the same input changes, so stale
+# cached conversions are never served
+STORE_FORMAT_VERSION = 3
+
+DEFAULT_STORE_DIR = Path.home() / ".docx_to_renpy" / "store"
+
+# prune() keeps the sources used most recently, and none unused for longer
+MAX_STORE_SOURCES = 500
+MAX_STORE_AGE_DAYS = 90
+
+# prune() leaves objects younger than this alone; another process may be
+# about to add them to its index
+PRUNE_GRACE_SECONDS = 3600
+
+class SourceEntry:
+  """What the store last saw of a source document on disk"""
+
+  def __init__(self, size: int, mtime_ns: int, digest: str, used: Optional[float] = None):
+    self.size = size
+    self.mtime_ns = mtime_ns
+    self.digest = digest
+    # When the entry was last recorded or looked up, for prune()
+    self.used = used if used is not None else time.time()
+
+  def matches_stat(self, stat: os.stat_result) -> bool:
+    return self.size == stat.st_size and self.mtime_ns == stat.st_mtime_ns
+
+class ConversionStore:
+  """
+  Content-addressed on-disk cache of conversion results.
+
+  Objects are stored under <root>/<kind>/<key[:2]>/<key>. A small path index
+  remembers the size, mtime and digest each source file had when it was last
+  converted, so a previous session can be restored without rehashing and
+  stale entries can be found with a stat call. It also lists the objects
+  written for each source digest, which prune() keeps only while an entry
+  has that digest.
+
+  Changes to the index are written by flush(), which runs at exit; call it
+  after a batch to have them on disk sooner.
+  """
+
+  def __init__(self, root: Optional[str] = None):
+    self.root = Path(root) if root else DEFAULT_STORE_DIR
+    self.index_file = self.root / "index.json"
+    self._lock = threading.Lock()
+    # Source digest -> "<kind>/<key>" of the objects written for it
+    self._objects: Dict[str, Set[str]] = {}
+    self._index: Dict[str, SourceEntry] = self._load_index()
+    self._dirty = False
+
+    atexit.register(self.flush)
+
+  def _load_index(self) -> Dict[str, SourceEntry]:
+    if not self.index_file.exists():
+      return {}
+    try:
+      with open(self.index_file, "r", encoding="utf-8") as f:
+        raw = json.load(f)
+      if raw.get("version") != STORE_FORMAT_VERSION:
+        return {}
+      self._objects = {digest: set(names) for digest, names in raw.get("objects", {}).items()}
+      return {
+        path: SourceEntry(entry["size"], entry["mtime_ns"], entry["digest"], entry.get("used"))
+        for path, entry in raw.get("sources", {}).items()
+      }
+    except Exception as e:
+      logging.debug("Ignoring unreadable store index {0}: {1}".format(self.index_file, e))
+      self._objects = {}
+      return {}
+
+  def _save_index(self):
+    raw = {
+      "version": STORE_FORMAT_VERSION,
+      "sources": {
+        path: {"size": entry.size, "mtime_ns": entry.mtime_ns, "digest": entry.digest,
+               "used": entry.used}
+        for path, entry in self._index.items()
+      },
+      "objects": {digest: sorted(names) for digest, names in self._objects.items()},
+    }
+    self.root.mkdir(parents=True, exist_ok=True)
+    atomic_write_text(str(self.index_file), json.dumps(raw))
+    self._dirty = False
+
+  def flush(self):
+    """Write the index if it changed since it was last written"""
+    with self._lock:
+      if not self._dirty:
+        return
+      try:
+        self._save_index()
+      except OSError as e:
+        logging.debug("Could not save store index: {0}".format(e))
+
+  def object_path(self, kind: str, key: str) -> Path:
+    return self.root / kind / key[:2] / key
+
+  def read(self, kind: str, key: str) -> Optional[bytes]:
+    try:
+      with open(self.object_path(kind, key), "rb") as f:
+        return f.read()
+    except OSError:
+      return None
+
+  def write(self, kind: str, key: str, data: bytes, digest: Optional[str] = None):
+    """Store an object; with the digest of the source it was made from, prune() keeps it with that source"""
+    path = self.object_path(kind, key)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    atomic_write_bytes(str(path), data)
+    if digest is not None:
+      self.attach(digest, kind, key)
+
+  def attach(self, digest: str, kind: str, key: str):
+    """Keep an object for as long as a source with this digest is in the index"""
+    name = "{0}/{1}".format(kind, key)
+    with self._lock:
+      names = self._objects.setdefault(digest, set())
+      if name not in names:
+        names.add(name)
+        self._dirty = True
+
+  def output_key(self, digest: str, label: str) -> str:
+    """Key of the .rpy text rendered from a source with this digest and label"""
+    material = "{0}:{1}:{2}".format(STORE_FORMAT_VERSION, digest, label)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+  def read_output(self, digest: str, label: str) -> Optional[str]:
+    data = self.read("output", self.output_key(digest, label))
+    return data.decode("utf-8") if data is not None else None
+
+  def write_output(self, digest: str, label: str, text: str):
+    self.write("output", self.output_key(digest, label), text.encode("utf-8"), digest)
+
+  def read_stats(self, digest: str, label: str) -> Optional[dict]:
+    data = self.read("stats", self.output_key(digest, label))
+    return json.loads(data.decode("utf-8")) if data is not None else None
+
+  def write_stats(self, digest: str, label: str, stats: dict):
+    self.write("stats", self.output_key(digest, label), json.dumps(stats).encode("utf-8"), digest)
+
+  def read_source_map(self, digest: str, label: str) -> Optional[dict]:
+    data = self.read("sourcemap", self.output_key(digest, label))
+    return json.loads(data.decode("utf-8")) if data is not None else None
+
+  def write_source_map(self, digest: str, label: str, source_map: dict):
+    self.write("sourcemap", self.output_key(digest, label), json.dumps(source_map).encode("utf-8"),
+               digest)
+
+  def ir_key(self, digest: str, ir_version: int) -> str:
+    """Key of the parsed IR of a source with this digest"""
+    material = "ir:{0}:{1}".format(ir_version, digest)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+  def styles_key(self, styles_digest: str, styles_version: int) -> str:
+    """Key of the values cached for a styles.xml with this digest"""
+    material = "styles:{0}:{1}".format(styles_version, styles_digest)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+  def lookup(self, source_path: str) -> Optional[SourceEntry]:
+    """Last recorded entry for a source path, without touching the file"""
+    with self._lock:
+      entry = self._index.get(os.path.abspath(source_path))
+      if entry is not None:
+        entry.used = time.time()
+        self._dirty = True
+      return entry
+
+  def is_fresh(self, source_path: str) -> bool:
+    """True when the source still has the size and mtime recorded for it"""
+    entry = self.lookup(source_path)
+    if entry is None:
+      return False
+    try:
+      return entry.matches_stat(os.stat(source_path))
+    except OSError:
+      return False
+
+  def digest(self, source_path: str) -> str:
+    """
+    Digest of the source, reusing the recorded one when the file's stat has
+    not changed and recording the new one when it has
+    """
+    stat = os.stat(source_path)
+    entry = self.lookup(source_path)
+    if entry is not None and entry.matches_stat(stat):
+      return entry.digest
+
+    digest = file_digest(source_path)
+    self.remember(source_path, digest, stat)
+    return digest
+
+  def remember(self, source_path: str, digest: str, stat: Optional[os.stat_result] = None):
+    if stat is None:
+      stat = os.stat(source_path)
+    with self._lock:
+      self._index[os.path.abspath(source_path)] = SourceEntry(stat.st_size, stat.st_mtime_ns, digest)
+      self._dirty = True
+
+  def prune(self, max_sources: int = MAX_STORE_SOURCES, max_age_days: float = MAX_STORE_AGE_DAYS) -> int:
+    """
+    Forget all but the max_sources most recently used sources, and any not
+    used for max_age_days, then delete the objects no remaining source
+    references. Returns the number of objects deleted.
+    """
+    now = time.time()
+    with self._lock:
+      recent = sorted(self._index.items(), key=lambda item: item[1].used, reverse=True)
+      self._index = {
+        path: entry for path, entry in recent[:max_sources]
+        if now - entry.used <= max_age_days * 86400
+      }
+      digests = {entry.digest for entry in self._index.values()}
+      self._objects = {digest: names for digest, names in self._objects.items() if digest in digests}
+      referenced = set().union(*self._objects.values())
+      self._dirty = True
+
+    removed = 0
+    for kind_dir in (self.root.iterdir() if self.root.is_dir() else ()):
+      if not kind_dir.is_dir():
+        continue
+      for path in kind_dir.glob("*/*"):
+        name = "{0}/{1}".format(kind_dir.name, path.name)
+        try:
+          if name not in referenced and now - path.stat().st_mtime > PRUNE_GRACE_SECONDS:
+            path.unlink()
+            removed += 1
+        except OSError as e:
+          logging.debug("Could not prune {0}: {1}".format(path, e))
+
+    logging.debug("Pruned {0} object(s) from {1}, {2} source(s) left".format(
+      removed, self.root, len(self._index)))
+    self.flush()
+    return removed
@@ -0,0 +1,126 @@
+#doc-to-renpy/renpy_doc_convert/styles.py
+"""
+Style defaults shared by documents made from the same template.
+
+python-docx parses every XML part of a package when it opens it, and the
+styles part of a Word template is often larger than a chapter's text.
+Documents opened with load_document(skip_media=True) only parse styles.xml
+when something reads their styles, and leave their pictures unread (see
+media). The one style value the converter needs, the default run font
+size, is cached by a hash of styles.xml: in memory for the rest of the
+process (a batch worker converts many documents) and, when one is given,
+in a ConversionStore shared with other processes.
+"""
+from typing import Dict, Optional
+import hashlib
+import json
+import logging
+
+from docx.document import Document as DocumentObject
+from docx.opc.constants import CONTENT_TYPE as CT, RELATIONSHIP_TYPE as RT
+from docx.opc.part import PartFactory
+from docx.oxml.parser import parse_xml
+from docx.parts.styles import StylesPart
+
+from renpy_doc_convert.media import open_document
+from renpy_doc_convert.store import ConversionStore
+from renpy_doc_convert.text_source import TextDocument, is_text_source
+from renpy_doc_convert.to_renpy import get_document_default_size
+
+# Bump when what is cached per styles.xml changes
+STYLES_FORMAT_VERSION = 1
+
+# styles.xml digest -> default font size
+_default_sizes: Dict[str, float] = {}
+
+class LazyStylesPart(StylesPart):
+  """StylesPart that keeps the raw XML and parses it the first time it is used"""
+
+  def __init__(self, partname, content_type, element, package, source_blob: bytes = b""):
+    self.source_blob = source_blob
+    super().__init__(partname, content_type, element, package)
+
+  @property
+  def _element(self):
+    if self._parsed is None and self.source_blob:
+      self._parsed = parse_xml(self.source_blob)
+    return self._parsed
+
+  @_element.setter
+  def _element(self, element):
+    self._parsed = element
+
+  @property
+  def parsed(self) -> bool:
+    return self._parsed is not None
+
+  @classmethod
+  def load(cls, partname, content_type, blob, package):
+    return cls(partname, content_type, None, package, blob)
+
+def _part_factory(partname, content_type, reltype, blob, package):
+  """
+  Part factory of load_document(skip_media=True). Only its documents get a
+  LazyStylesPart; python-docx's PartFactory.part_type_for registry, which
+  every docx.Document() in the process uses, is left alone.
+  """
+  if content_type == CT.WML_STYLES:
+    return LazyStylesPart.load(partname, content_type, blob, package)
+  return PartFactory(partname, content_type, reltype, blob, package)
+
+def load_document(docx_file_path: str, skip_media: bool = False) -> DocumentObject:
+  """
+  python-docx Document; a plain-text or Markdown script is read into a
+  TextDocument instead. With skip_media (see media.open_document), its
+  pictures are not read and its styles part is parsed on first use.
+  """
+  if is_text_source(docx_file_path):
+    return TextDocument.from_file(docx_file_path)
+  return open_document(docx_file_path, skip_media, _part_factory)
+
+def styles_digest(document: DocumentObject) -> Optional[str]:
+  """sha256 of the document's styles.xml, None if it has no styles part"""
+  if not isinstance(document, DocumentObject):
+    return None
+  try:
+    part = document.part.part_related_by(RT.STYLES)
+  except KeyError:
+    return None
+  blob = part.source_blob if isinstance(part, LazyStylesPart) else part.blob
+  return hashlib.sha256(blob).hexdigest()
+
+def document_default_size(document: DocumentObject, store: Optional[ConversionStore] = None,
+                          source_digest: Optional[str] = None) -> float:
+  """
+  get_document_default_size(), looked up by styles.xml digest before parsing
+  the styles. In a store, the cached value is kept with the source of
+  source_digest (see ConversionStore.prune).
+  """
+  digest = styles_digest(document)
+  if digest is None:
+    return get_document_default_size(document)
+
+  key = store.styles_key(digest, STYLES_FORMAT_VERSION) if store is not None else None
+  if key is not None and source_digest is not None:
+    store.attach(source_digest, "styles", key)
+
+  size = _default_sizes.get(digest)
+  if size is not None:
+    return size
+
+  if key is not None:
+    data = store.read("styles", key)
+    if data is not None:
+      try:
+        size = json.loads(data.decode("utf-8"))["default_font_size"]
+      except (ValueError, KeyError) as e:
+        logging.debug("Ignoring unusable cached styles: {0}".format(e))
+
+  if size is None:
+    size = get_document_default_size(document)
+    logging.debug("Default font size {0} for styles {1}".format(size, digest[:12]))
+    if key is not None:
+      store.write("styles", key, json.dumps({"default_font_size": size}).encode("utf-8"))
+
+  _default_sizes[digest] = size
+  return size
@@ -0,0 +1,123 @@
+#doc-to-renpy/renpy_doc_convert/text_source.py
+"""
+Plain-text and Markdown scripts, read without python-docx.
+
+Drafts written in a text editor follow the same conventions as the Word
+documents (`Name: line`, `== label ==`, `- choice == target`,
+`Characters{}`), one paragraph per line. TextDocument reads such a file
+line by line into stand-ins for the python-docx Document, Paragraph and
+Run objects Consolidate and the IR read, so the rest of the pipeline is
+unchanged.
+
+Plain text (.txt) is taken literally. In Markdown (.md), `**bold**`,
+`*italic*`, `***both***` and `~~strike~~` become bold, italic and
+struck-through runs; `\\*` and `\\~` stand for a literal asterisk and
+tilde. A line that is wholly wrapped in single asterisks, the convention
+for a sound cue, is kept as written.
+"""
+from typing import List
+import os
+import re
+
+from renpy_doc_convert.ir import IRColor, IRFont
+
+PLAIN_TEXT_EXTENSIONS = (".txt",)
+MARKDOWN_EXTENSIONS = (".md", ".markdown")
+
+_SPAN = re.compile(
+  r"\\([*~])"                                  # escaped markup character
+  r"|\*\*\*(?=\S)(.+?)(?<=\S)\*\*\*"           # ***bold italic***
+  r"|\*\*(?=\S)(.+?)(?<=\S)\*\*"               # **bold**
+  r"|~~(?=\S)(.+?)(?<=\S)~~"                   # ~~strike~~
+  r"|\*(?=[^\s*])(.+?)(?<=[^\s*])\*(?!\*)"     # *italic*
+)
+
+def is_text_source(file_path: str) -> bool:
+  """True for the plain-text and Markdown scripts TextDocument reads"""
+  return os.path.splitext(file_path)[1].lower() in PLAIN_TEXT_EXTENSIONS + MARKDOWN_EXTENSIONS
+
+def is_sound_cue(text: str) -> bool:
+  text = text.strip()
+  return (len(text) > 2 and text[0] == "*" and text[-1] == "*" and
+          text[1] != "*" and text[-2] != "*")
+
+class TextRun:
+  """Read-only stand-in for docx.text.run.Run (text may be reassigned)"""
+
+  def __init__(self, text: str, bold: bool = False, italic: bool = False, strike: bool = False):
+    self.text = text
+    self.bold = bold
+    self.italic = italic
+    self.underline = False
+    self.font = IRFont(None, IRColor(None), strike)
+
+  def same_style(self, other: "TextRun") -> bool:
+    return (self.bold == other.bold and self.italic == other.italic and
+            self.font.strike == other.font.strike)
+
+class TextParagraph:
+  """Read-only stand-in for docx.text.paragraph.Paragraph"""
+
+  def __init__(self, runs: List[TextRun]):
+    self.runs = runs
+    self.text = "".join(run.text for run in runs)
+
+def _add_run(runs: List[TextRun], run: TextRun):
+  """Append a run, joining it to the previous one when they look the same"""
+  if not run.text:
+    return
+  if runs and runs[-1].same_style(run):
+    runs[-1].text += run.text
+  else:
+    runs.append(run)
+
+def _parse_spans(text: str, bold: bool, italic: bool, strike: bool, runs: List[TextRun]):
+  position = 0
+  for match in _SPAN.finditer(text):
+    _add_run(runs, TextRun(text[position:match.start()], bold, italic, strike))
+    escaped, bold_italic_text, bold_text, strike_text, italic_text = match.groups()
+    if escaped is not None:
+      _add_run(runs, TextRun(escaped, bold, italic, strike))
+    elif bold_italic_text is not None:
+      _parse_spans(bold_italic_text, True, True, strike, runs)
+    elif bold_text is not None:
+      _parse_spans(bold_text, True, italic, strike, runs)
+    elif strike_text is not None:
+      _parse_spans(strike_text, bold, italic, True, runs)
+    else:
+      _parse_spans(italic_text, bold, True, strike, runs)
+    position = match.end()
+  _add_run(runs, TextRun(text[position:], bold, italic, strike))
+
+def parse_markdown_line(line: str) -> TextParagraph:
+  """One line of a Markdown script as a paragraph of styled runs"""
+  runs: List[TextRun] = []
+  if is_sound_cue(line):
+    _add_run(runs, TextRun(line))
+  else:
+    _parse_spans(line, False, False, False, runs)
+  return TextParagraph(runs)
+
+def parse_plain_line(line: str) -> TextParagraph:
+  return TextParagraph([TextRun(line)] if line else [])
+
+class TextDocument:
+  """
+  Stand-in for a python-docx Document read from a text script: every line
+  is a paragraph. It has no styles, so the document default font size is
+  unknown, as for a .docx without one.
+  """
+
+  def __init__(self, paragraphs: List[TextParagraph]):
+    self.paragraphs = paragraphs
+    self.styles = None
+
+  @classmethod
+  def from_file(cls, file_path: str) -> "TextDocument":
+    markdown = os.path.splitext(file_path)[1].lower() in MARKDOWN_EXTENSIONS
+    parse_line = parse_markdown_line if markdown else parse_plain_line
+    paragraphs = []
+    with open(file_path, "r", encoding="utf-8-sig") as f:
+      for line in f:
+        paragraphs.append(parse_line(line.rstrip("\r\n")))
+    return cls(paragraphs)
@@ -0,0 +1,120 @@
+#doc-to-renpy/renpy_doc_convert/timings.py
+"""
+Wall-clock time of each conversion stage, with the size of the document.
+
+A ConversionTimings passed to api.convert() records how long each stage
+took (the same stages memory.MemoryTracker measures), how many paragraphs,
+runs and chunks the document has, how large the output is and whether a
+cache was used. Timing costs next to nothing, so unlike memory tracking it
+can stay on, e.g. for the GUI's Performance tab.
+"""
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Iterator, Optional, Sequence
+import json
+import platform
+import time
+
+from renpy_doc_convert.fileio import atomic_write_text
+from renpy_doc_convert.memory import (
+  STAGE_CONSOLIDATE, STAGE_FONT_STANDARDS, STAGE_INDEX, STAGE_LOAD, STAGE_RENDER
+)
+
+# Looking up a stored output before converting (timed by callers with a store)
+STAGE_LOOKUP = "lookup"
+
+STAGES = [STAGE_LOOKUP, STAGE_LOAD, STAGE_CONSOLIDATE, STAGE_INDEX, STAGE_FONT_STANDARDS,
+          STAGE_RENDER]
+
+# Where a conversion's result came from
+CACHE_MISS = "miss"
+CACHE_IR = "ir"          # parsed IR loaded from a ConversionStore
+CACHE_OUTPUT = "output"  # rendered script reused without converting
+
+class ConversionTimings:
+
+  def __init__(self, source: str = ""):
+    self.source = source
+    # Stage name -> seconds, in the order the stages ran
+    self.stages: Dict[str, float] = {}
+    self.paragraphs = 0
+    self.runs = 0
+    self.chunks = 0
+    self.output_bytes = 0
+    self.cache = CACHE_MISS
+
+  @contextmanager
+  def stage(self, name: str) -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+      yield
+    finally:
+      self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - started
+
+  def count_document(self, ir):
+    """Record the paragraph, run and chunk counts of a DocumentIR"""
+    self.paragraphs = len(ir.paragraph_text)
+    self.runs = len(ir.run_flags)
+    self.chunks = ir.chunk_count
+
+  @property
+  def total_seconds(self) -> float:
+    return sum(self.stages.values())
+
+  def to_dict(self) -> dict:
+    return {
+      "source": self.source,
+      "total_seconds": self.total_seconds,
+      "stages": dict(self.stages),
+      "paragraphs": self.paragraphs,
+      "runs": self.runs,
+      "chunks": self.chunks,
+      "output_bytes": self.output_bytes,
+      "cache": self.cache,
+    }
+
+  @classmethod
+  def from_dict(cls, data: dict) -> "ConversionTimings":
+    timings = cls(data["source"])
+    timings.stages = dict(data["stages"])
+    timings.paragraphs = data["paragraphs"]
+    timings.runs = data["runs"]
+    timings.chunks = data["chunks"]
+    timings.output_bytes = data["output_bytes"]
+    timings.cache = data["cache"]
+    return timings
+
+def timed(timings: Optional[ConversionTimings], stage: str):
+  """Context manager timing `stage` on timings, or doing nothing without it"""
+  return timings.stage(stage) if timings is not None else nullcontext()
+
+def total_timings(timings_list: Sequence[ConversionTimings]) -> ConversionTimings:
+  """Sum of several conversions; its cache field is unused"""
+  total = ConversionTimings()
+  for timings in timings_list:
+    for stage, seconds in timings.stages.items():
+      total.stages[stage] = total.stages.get(stage, 0.0) + seconds
+    total.paragraphs += timings.paragraphs
+    total.runs += timings.runs
+    total.chunks += timings.chunks
+    total.output_bytes += timings.output_bytes
+  return total
+
+def cache_counts(timings_list: Sequence[ConversionTimings]) -> Dict[str, int]:
+  counts = {CACHE_MISS: 0, CACHE_IR: 0, CACHE_OUTPUT: 0}
+  for timings in timings_list:
+    counts[timings.cache] = counts.get(timings.cache, 0) + 1
+  return counts
+
+def write_timings_report(timings_list: Sequence[ConversionTimings], report_file_path: str,
+                         version: str = ""):
+  """Write the timings of each file and their totals as JSON, with the platform for bug reports"""
+  total = total_timings(timings_list)
+  report = {
+    "version": version,
+    "python": platform.python_version(),
+    "platform": platform.platform(),
+    "files": [timings.to_dict() for timings in timings_list],
+    "totals": dict(total.to_dict(), files=len(timings_list), cache=cache_counts(timings_list)),
+  }
+  del report["totals"]["source"]
+  atomic_write_text(report_file_path, json.dumps(report, indent=2) + "\n")
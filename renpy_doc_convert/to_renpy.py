@@ -1,4 +1,6 @@
+import io
 import logging
+import os
 import re
 from collections import namedtuple
 
@@ -6,32 +8,131 @@ from docx.text.run import Run
 from docx.shared import RGBColor
 from docx.document import Document
 
-from renpy_doc_convert.consolidate import TextChunk, TextType, ConsolidateTextType
+from renpy_doc_convert.consolidate import TextChunk, TextType, ConsolidateTextType, FontHistogram
+from renpy_doc_convert.analytics import ScriptStats
+from renpy_doc_convert.fileio import atomic_write_text, write_text_if_changed
+from renpy_doc_convert.progress import STAGE_RENDERING, ProgressReporter
+from renpy_doc_convert.labels import LabelGraph
+from renpy_doc_convert.ir import DocumentIR
+from renpy_doc_convert.media import ImageRef
+from renpy_doc_convert.sourcemap import NO_SOURCE, SourceMap
 from typing import List, Dict, Optional, Tuple
 
 INDENTATION_SPACES = 2
 DEFAULT_FONT_SIZE = 11.0
 DEFAULT_FONT_COLOR = "000000" # Hexadecimal Black
 
+# Split output: file of the define statements, and the list of files
+# written into a document's section directory
+DEFINES_FILE_STEM = "defines"
+SECTIONS_MANIFEST = ".sections"
+
 # name_found : bool
 # text : string
 CharNameReturn = namedtuple('CharNameReturn', ['name_found', 'text'])
 
+def get_document_default_size(document: Document) -> float:
+  """Default run font size from the document's styles, -1 if there is none"""
+  if (document != None and
+     document.styles != None and
+     document.styles.element != None):
+
+    styles_elem = document.styles.element
+
+    default_LXML = styles_elem.xpath('w:docDefaults/w:rPrDefault')
+    if (len(default_LXML) != 0 and 
+      len(default_LXML[0]) != 0):
+
+      # https://github.com/python-openxml/python-docx/blob/master/docx/oxml/text/font.py#L52
+      run = default_LXML[0][0] # Should be a type CT_RPr
+
+      if run.sz_val:
+        return run.sz_val.pt
+
+  return -1
+
 class CharacterDefinition:
   def __init__(self, short_name: str, full_name: str, color: str):
     self.short_name = short_name
     self.full_name = full_name
     self.color = color
 
+class RenderOptions:
+  """Output options that only affect rendering, not parsing"""
+
+  def __init__(self, indentation_spaces: int = INDENTATION_SPACES,
+               use_character_definitions: bool = True,
+               split_sections: bool = False,
+               images_dir: Optional[str] = None,
+               image_statement: Optional[str] = None):
+    self.indentation_spaces = indentation_spaces
+    # Write a Characters{} block as define statements and use the short names
+    self.use_character_definitions = use_character_definitions
+    # Write each `== label ==` section, and the defines, to its own file in
+    # a directory named after the output file; the document's own label
+    # stays in the output file. Unchanged files are not rewritten, so
+    # Ren'Py only recompiles the sections that were edited.
+    self.split_sections = split_sections
+    # Copy the document's pictures to this directory (see media.extract_images)
+    self.images_dir = images_dir
+    # "show" or "scene" (media.IMAGE_STATEMENTS) to write that statement
+    # where each extracted picture was, None to leave pictures out
+    self.image_statement = image_statement
+
+class ScriptBuffer(io.StringIO):
+  """Text of one output file, with the source map of the lines written so far"""
+
+  def __init__(self):
+    super().__init__()
+    self.lines = 0
+    self.source_map = SourceMap()
+
+  def write(self, text: str) -> int:
+    self.lines += text.count("\n")
+    return super().write(text)
+
+  def mark(self, source: int):
+    """The lines written next come from document paragraph `source`"""
+    self.source_map.mark(self.lines, source)
+
 class ConvertToRenpy:
 
-  def __init__(self, document: Document, chunks: List[TextChunk], output_file_path: str):
+  def __init__(self, document: Document, chunks: List[TextChunk], output_file_path: str,
+               label_graph: Optional[LabelGraph] = None,
+               font_histogram: Optional[FontHistogram] = None,
+               options: Optional[RenderOptions] = None,
+               progress: Optional[ProgressReporter] = None,
+               images: Optional[List[ImageRef]] = None,
+               image_names: Optional[Dict[str, str]] = None,
+               labels_only: bool = False):
+    """
+    With labels_only, no FontStandards is made (it reads the document's
+    styles) and only collect_labels() can be used.
+    """
     self.chunks: List[TextChunk] = chunks
+    # Pictures of the document, and the Ren'Py image name of each extracted one
+    self.images: List[ImageRef] = images if images is not None else []
+    self.image_names: Dict[str, str] = image_names if image_names is not None else {}
+    self.progress = progress
     self.output_file_path: str = output_file_path
-    self.font_standards: FontStandards = FontStandards(document, chunks)
-    self.renpy_styler = RenpyStyling(self.font_standards)
+    self.options: RenderOptions = options if options is not None else RenderOptions()
+    self.indent = " " * self.options.indentation_spaces
+    self.font_standards: Optional[FontStandards] = None
+    self.renpy_styler: Optional[RenpyStyling] = None
+    if not labels_only:
+      self.font_standards = FontStandards(document, chunks, font_histogram)
+      self.renpy_styler = RenpyStyling(self.font_standards)
     self.character_definitions: Dict[str, CharacterDefinition] = {}
     self.use_character_definitions = False
+    self.stats = ScriptStats(output_file_path)
+    self.label_graph: Optional[LabelGraph] = label_graph
+    self.current_label = ""
+    # True while the current section has ended with a menu whose every choice jumps
+    self.section_jumps_away = False
+    # Every file written by output_renpy_text()
+    self.output_files: List[str] = []
+    # Output file path -> SourceMap, set by render_sections()
+    self.source_maps: Dict[str, SourceMap] = {}
     
     logging.debug("Finish with initializing ConvertToRenpy constructor")
 
@@ -104,7 +205,7 @@ class ConvertToRenpy:
         )
     
     if self.character_definitions:
-      self.use_character_definitions = True
+      self.use_character_definitions = self.options.use_character_definitions
       logging.debug(f"Found {len(self.character_definitions)} character definitions")
       return True, 1
     
@@ -209,91 +310,292 @@ class ConvertToRenpy:
       # Return the styled character name, or empty if same as plain character name
       return result if result else "" 
   def output_renpy_text(self):
+    """
+    Render the script and write it to output_file_path. The file is only
+    replaced once rendering finished, so a failed or cancelled conversion
+    leaves no partial output behind.
+
+    With split_sections, sections after the document's own label go to
+    section_directory() instead, each ending with a jump to the next one
+    where the single script would have fallen through.
+    """
     logging.debug("Output renpy text to file")
-    with open(self.output_file_path, "w", encoding="utf-8") as file:
-      # Parse character definitions first
-      has_char_defs, skip_until = self.parse_character_definitions()
-      
-      if has_char_defs:
-        # Write character definitions at the very top
-        for char_name, char_def in self.character_definitions.items():
-          file.write(f'define {char_def.short_name} = Character("{char_def.full_name}", color="{char_def.color}")\n')
-        file.write("\n")
-      
-      # Write label after definitions
-      label = self.get_label(self.output_file_path)
-      file.write("label {0}:\n\n".format(label))
+    sections = self.render_sections()
+    if self.options.split_sections:
+      self.write_sections(sections)
+    else:
+      atomic_write_text(self.output_file_path, sections[0][1])
+      self.output_files = [self.output_file_path]
+      # The single script now holds every section an earlier split output had
+      if self.remove_stale_sections([]):
+        os.remove(os.path.join(self.section_directory(), SECTIONS_MANIFEST))
+
+  def render_sections(self) -> List[Tuple[str, str]]:
+    """
+    Render the script without writing it. Returns (file path, text) of each
+    output file, the output file first; there is only that one unless
+    split_sections is set.
+    """
+    split = self.options.split_sections
+    # (file path, text) of every output file, the output file first
+    sections: List[Tuple[str, ScriptBuffer]] = []
+    file = ScriptBuffer()
+
+    # Parse character definitions first
+    has_char_defs, skip_until = self.parse_character_definitions()
+    
+    if has_char_defs and self.use_character_definitions:
+      # Write character definitions at the very top
+      file.mark(self.chunks[0].source_index)
+      for char_name, char_def in self.character_definitions.items():
+        file.write(f'define {char_def.short_name} = Character("{char_def.full_name}", color="{char_def.color}")\n')
+      file.write("\n")
+      if split:
+        defines = file
+        file = ScriptBuffer()
+    
+    # Write label after definitions
+    label = self.get_label(self.output_file_path)
+    sections.append((self.output_file_path, file))
+    if split and has_char_defs and self.use_character_definitions:
+      sections.append((self.section_file_path(DEFINES_FILE_STEM, sections), defines))
+    file.mark(NO_SOURCE)
+    file.write("label {0}:\n\n".format(label))
+    current_label = label
+    self.record_label(label, entry=True)
+    
+    # Process chunks
+    logging.debug("Processing {0} text chunk(s)".format(len(self.chunks)))
+    
+    start_idx = skip_until if has_char_defs else 0
+    i = start_idx
+    images = self.images if self.options.image_statement is not None else []
+    next_image = 0
+    if self.progress is not None:
+      self.progress.start(STAGE_RENDERING, len(self.chunks))
+    
+    while i < len(self.chunks):
+      if self.progress is not None:
+        self.progress.update(i)
+      next_image = self.write_images(file, images, next_image, i)
+      chunk = self.chunks[i]
+      file.mark(chunk.source_index)
       
-      # Process chunks
-      logging.debug("Processing {0} text chunk(s)".format(len(self.chunks)))
+      # Check for label marker
+      is_label, label_name = self.is_label_marker(chunk)
+      if is_label:
+        if split:
+          # Sections in separate files cannot fall through to each other
+          if not self.section_jumps_away:
+            file.write(f"{self.indent}jump {label_name}\n")
+          file = ScriptBuffer()
+          file.mark(chunk.source_index)
+          sections.append((self.section_file_path(label_name, sections), file))
+        file.write(f"label {label_name}:\n")
+        current_label = label_name
+        self.record_label(label_name)
+        i += 1
+        continue
       
-      start_idx = skip_until if has_char_defs else 0
-      i = start_idx
+      # Check for comment
+      is_comment, comment_text = self.is_comment_line(chunk)
+      if is_comment:
+        file.write(f"{comment_text}\n")
+        i += 1
+        continue
       
-      while i < len(self.chunks):
-        chunk = self.chunks[i]
-        
-        # Check for label marker
-        is_label, label_name = self.is_label_marker(chunk)
-        if is_label:
-          file.write(f"label {label_name}:\n")
-          i += 1
-          continue
+      # Check if this is a dialogue line followed by menu choices
+      if chunk.text_type == TextType.DIALOGUE and i + 1 < len(self.chunks):
+        next_is_menu, _, _ = self.is_menu_choice(self.chunks[i + 1])
         
-        # Check for comment
-        is_comment, comment_text = self.is_comment_line(chunk)
-        if is_comment:
-          file.write(f"{comment_text}\n")
-          i += 1
-          continue
-        
-        # Check if this is a dialogue line followed by menu choices
-        if chunk.text_type == TextType.DIALOGUE and i + 1 < len(self.chunks):
-          next_is_menu, _, _ = self.is_menu_choice(self.chunks[i + 1])
+        if next_is_menu:
+          # This is a menu prompt line
+          text = self.handle_styling(chunk)
+          text = self.handle_escape_characters(text)
+          self.stats.record_line(current_label, chunk.character, text)
           
-          if next_is_menu:
-            # This is a menu prompt line
-            text = self.handle_styling(chunk)
-            text = self.handle_escape_characters(text)
-            
-            # Write the prompt
-            if self.use_character_definitions and chunk.character:
-              char_short = chunk.character
-              if char_short in self.character_definitions:
-                file.write(f'  {char_short} "{text}"\n')
-              else:
-                file.write(f'  "{chunk.character}" "{text}"\n')
+          # Write the prompt
+          if self.use_character_definitions and chunk.character:
+            char_short = chunk.character
+            if char_short in self.character_definitions:
+              file.write(f'{self.indent}{char_short} "{text}"\n')
             else:
-              if chunk.character:
-                file.write(f'  "{chunk.character}" "{text}"\n')
-              else:
-                file.write(f'  "{text}"\n')
-            
-            # Write menu
-            file.write("  menu:\n")
+              file.write(f'{self.indent}"{chunk.character}" "{text}"\n')
+          else:
+            if chunk.character:
+              file.write(f'{self.indent}"{chunk.character}" "{text}"\n')
+            else:
+              file.write(f'{self.indent}"{text}"\n')
+          
+          # Write menu
+          file.write(f"{self.indent}menu:\n")
+          
+          # Process menu choices
+          i += 1
+          choice_count = 0
+          while i < len(self.chunks):
+            is_menu_item, choice_text, jump_label = self.is_menu_choice(self.chunks[i])
+            if not is_menu_item:
+              break
             
-            # Process menu choices
+            file.mark(self.chunks[i].source_index)
+            file.write(f'{self.indent * 2}"{choice_text}":\n')
+            if jump_label:
+              file.write(f'{self.indent * 3}jump {jump_label}\n')
+            self.record_choice(jump_label, first=choice_count == 0)
+            choice_count += 1
             i += 1
-            while i < len(self.chunks):
-              is_menu_item, choice_text, jump_label = self.is_menu_choice(self.chunks[i])
-              if not is_menu_item:
-                break
-              
-              file.write(f'    "{choice_text}":\n')
-              if jump_label:
-                file.write(f'      jump {jump_label}\n')
-              i += 1
-            
-            file.write("\n")
-            continue
-        
-        # Regular dialogue or narration
-        text = self.handle_styling(chunk)
-        text = self.handle_escape_characters(text)
-        formatted_text = self.format_indentation(chunk, text)
-        file.write(formatted_text)
-        
+          
+          self.stats.record_menu(choice_count)
+          file.write("\n")
+          continue
+      
+      # Regular dialogue or narration
+      text = self.handle_styling(chunk)
+      text = self.handle_escape_characters(text)
+      formatted_text = self.format_indentation(chunk, text)
+      self.stats.record_line(current_label, chunk.character, text)
+      self.section_jumps_away = False
+      file.write(formatted_text)
+      
+      i += 1
+
+    self.write_images(file, images, next_image, len(self.chunks))
+    if self.progress is not None:
+      self.progress.finish()
+    self.source_maps = {}
+    for path, text in sections:
+      text.source_map.finish(text.lines)
+      self.source_maps[path] = text.source_map
+    return [(path, text.getvalue()) for path, text in sections]
+
+  def write_images(self, file: ScriptBuffer, images: List[ImageRef], next_image: int,
+                   before_chunk: int) -> int:
+    """
+    Write the statements of images[next_image:] placed before chunk
+    before_chunk; returns the index of the first picture left. Pictures
+    among menu choices come after the menu.
+    """
+    while next_image < len(images) and images[next_image].chunk <= before_chunk:
+      image = images[next_image]
+      name = self.image_names.get(image.member)
+      if name is not None:
+        file.mark(image.source)
+        file.write(f"{self.indent}{self.options.image_statement} {name}\n")
+      next_image += 1
+    return next_image
+
+  def section_directory(self) -> str:
+    """Directory the split sections of this document are written to"""
+    return os.path.splitext(self.output_file_path)[0]
+
+  def section_file_path(self, name: str, sections: List[Tuple[str, ScriptBuffer]]) -> str:
+    """File for a section called `name`, numbered if a section already has that name"""
+    taken = {path for path, _ in sections}
+    path = os.path.join(self.section_directory(), name + ".rpy")
+    number = 2
+    while path in taken:
+      path = os.path.join(self.section_directory(), "{0}_{1}.rpy".format(name, number))
+      number += 1
+    return path
+
+  def write_sections(self, sections: List[Tuple[str, str]]):
+    """
+    Write split output, skipping files whose content is unchanged, and
+    delete section files (and their .rpyc) an earlier conversion wrote that
+    are no longer produced
+    """
+    directory = self.section_directory()
+    manifest_path = os.path.join(directory, SECTIONS_MANIFEST)
+    names = [os.path.basename(path) for path, _ in sections[1:]]
+    had_manifest = self.remove_stale_sections(names)
+
+    if names:
+      os.makedirs(directory, exist_ok=True)
+    written = 0
+    for path, text in sections:
+      written += write_text_if_changed(path, text)
+    if names or had_manifest:
+      write_text_if_changed(manifest_path, "".join(name + "\n" for name in names))
+    logging.debug("Wrote {0} of {1} section file(s)".format(written, len(sections)))
+    self.output_files = [path for path, _ in sections]
+
+  def remove_stale_sections(self, keep: List[str]) -> bool:
+    """
+    Delete the section files listed in the section directory's manifest
+    that are not in `keep`, with their compiled .rpyc, so Ren'Py does not
+    see a label twice. Files the converter did not write are left alone.
+    Returns whether there was a manifest.
+    """
+    directory = self.section_directory()
+    manifest_path = os.path.join(directory, SECTIONS_MANIFEST)
+    if not os.path.isfile(manifest_path):
+      return False
+
+    with open(manifest_path, "r", encoding="utf-8") as f:
+      stale = set(f.read().split()) - set(keep)
+    for name in stale:
+      for stale_path in (os.path.join(directory, name), os.path.join(directory, name + "c")):
+        if os.path.isfile(stale_path):
+          logging.debug("Remove stale section {0}".format(stale_path))
+          os.remove(stale_path)
+    return True
+
+  def record_label(self, label_name: str, entry: bool = False):
+    """Add a label to the label graph, with a fall-through edge from the previous section"""
+    if self.label_graph is not None:
+      if self.current_label and not self.section_jumps_away:
+        self.label_graph.add_fallthrough(self.current_label, label_name)
+      self.label_graph.add_label(self.output_file_path, label_name, entry=entry)
+    self.current_label = label_name
+    self.section_jumps_away = False
+
+  def record_choice(self, jump_label: str, first: bool):
+    """Add a menu choice's jump to the label graph"""
+    if self.label_graph is not None and jump_label:
+      self.label_graph.add_jump(self.output_file_path, self.current_label, jump_label)
+    # A menu only ends the section if every one of its choices jumps
+    self.section_jumps_away = bool(jump_label) and (first or self.section_jumps_away)
+
+  def collect_labels(self):
+    """
+    Fill the label graph the same way output_renpy_text() does, without
+    styling or writing anything. Used to validate scripts quickly.
+    """
+    has_char_defs, skip_until = self.parse_character_definitions()
+    self.record_label(self.get_label(self.output_file_path), entry=True)
+
+    i = skip_until if has_char_defs else 0
+    while i < len(self.chunks):
+      chunk = self.chunks[i]
+
+      is_label, label_name = self.is_label_marker(chunk)
+      if is_label:
+        self.record_label(label_name)
         i += 1
+        continue
+
+      if chunk.text_type == TextType.COMMENT:
+        i += 1
+        continue
+
+      if chunk.text_type == TextType.DIALOGUE and i + 1 < len(self.chunks):
+        next_is_menu, _, _ = self.is_menu_choice(self.chunks[i + 1])
+
+        if next_is_menu:
+          i += 1
+          first = True
+          while i < len(self.chunks):
+            is_menu_item, _, jump_label = self.is_menu_choice(self.chunks[i])
+            if not is_menu_item:
+              break
+            self.record_choice(jump_label, first)
+            first = False
+            i += 1
+          continue
+
+      self.section_jumps_away = False
+      i += 1
 
   def handle_styling(self, chunk: TextChunk) -> str:
     text = ""
@@ -384,7 +686,7 @@ class ConvertToRenpy:
       character_text = "{0} {1}".format(character, text_formatted)
 
     # Add spaces to front of text
-    indented_text = character_text.rjust(len(character_text) + INDENTATION_SPACES)
+    indented_text = character_text.rjust(len(character_text) + self.options.indentation_spaces)
 
     # Add newline
     fulltext = "{0}\n".format(indented_text)
@@ -392,7 +694,7 @@ class ConvertToRenpy:
     return fulltext
 
   def format_non_dialogue(self, text: str):
-    return "  \"" + text + "\"\n"
+    return self.indent + "\"" + text + "\"\n"
 
   def remove_character_name_in_text(self, text: str) -> CharNameReturn:
     if ":" in text:
@@ -465,9 +767,11 @@ class RenpyStyling:
 
 
 class FontStandards:
-  def __init__(self, document: Document, chunks: TextChunk):
+  def __init__(self, document: Document, chunks: TextChunk,
+               font_histogram: Optional[FontHistogram] = None):
     self.document = document
     self.chunks = chunks
+    self.font_histogram = font_histogram
     self.size = self.get_standard_font_size()
     self.color: RGBColor = self.get_standard_font_color()
 
@@ -487,36 +791,33 @@ class FontStandards:
     return -1
 
   def _get_document_default(self) -> int:
-    if (self.document != None and
-       self.document.styles != None and
-       self.document.styles.element != None):
-
-      styles_elem = self.document.styles.element
-
-      default_LXML = styles_elem.xpath('w:docDefaults/w:rPrDefault')
-      if (len(default_LXML) != 0 and 
-        len(default_LXML[0]) != 0):
-
-        # https://github.com/python-openxml/python-docx/blob/master/docx/oxml/text/font.py#L52
-        run = default_LXML[0][0] # Should be a type CT_RPr
+    if isinstance(self.document, DocumentIR):
+      # Read from the styles when the IR was built
+      return self.document.default_font_size
 
-        if run.sz_val:
-          return run.sz_val.pt
-
-    return -1
+    return get_document_default_size(self.document)
 
   def get_standard_font_size(self) -> int:
     """
     We have to get the standard font size for this document.
 
-    1. Check if the first full line text has a font size. Use that as the priority.
-    2. If the first fully line text has no font size, we check the document default
+    1. With a font histogram from Consolidate, use the explicit size covering
+       the most characters, unless most of the text inherits its size (it is
+       then in the document default). Without one, use the first line's
+       font size.
+    2. If that finds no explicit size, we check the document default
     3. If the document default has no font size, we use hard coded value
     """
     font_size = -1
     
-    # Use font from first line
-    if font_size == -1:
+    if self.font_histogram is not None:
+      # Use the size most of the explicitly sized text is written in
+      if not self.font_histogram.inherits_size():
+        most_common = self.font_histogram.most_common_size()
+        if most_common is not None:
+          font_size = most_common
+    else:
+      # Use font from first line
       font_size = self._get_size_first_line()
 
     # If font from first line cannot be found, use document default
@@ -536,6 +837,12 @@ class FontStandards:
   def get_standard_font_color(self) -> RGBColor:
     """
     Get standard font color for this document.
-    Assume standard font color is black
+    With a font histogram, use the explicit colour covering the most
+    characters; otherwise assume standard font color is black
     """
+    if self.font_histogram is not None:
+      most_common = self.font_histogram.most_common_color()
+      if most_common is not None:
+        return most_common
+
     return RGBColor.from_string(DEFAULT_FONT_COLOR)
\ No newline at end of file